@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-message overhead of TuyaCipher.
+
+Compares creating a fresh encryptor/decryptor and PKCS7 padder for every
+message (the previous behaviour) with the reused ECB contexts, and with the
+batched encrypt_many/decrypt_many calls.
+"""
+
+import os
+import sys
+import timeit
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives.padding import PKCS7
+
+from custom_components.robovacl60.tuyalocalapi import Message, TuyaCipher
+
+LOCAL_KEY = "0123456789abcdef"
+BATCH = 32
+NUMBER = 200
+REPEAT = 5
+
+
+def legacy_encrypt(cipher: TuyaCipher, data: bytes) -> bytes:
+    """Encrypt with a new context and padder, as TuyaCipher used to."""
+    padder = PKCS7(128).padder()
+    padded_data = padder.update(data) + padder.finalize()
+    encryptor = cipher.cipher.encryptor()
+    return encryptor.update(padded_data) + encryptor.finalize()
+
+
+def legacy_decrypt(cipher: TuyaCipher, data: bytes) -> bytes:
+    """Decrypt with a new context and unpadder, as TuyaCipher used to."""
+    decryptor = cipher.cipher.decryptor()
+    decrypted_data = decryptor.update(data) + decryptor.finalize()
+    unpadder = PKCS7(128).unpadder()
+    return unpadder.update(decrypted_data) + unpadder.finalize()
+
+
+def _per_message_us(run_batch) -> float:
+    """Return the best time per message, in microseconds, for a batch runner."""
+    best = min(timeit.repeat(run_batch, number=NUMBER, repeat=REPEAT))
+    return best / (NUMBER * BATCH) * 1e6
+
+
+def bench_cipher() -> None:
+    """Print per-message encrypt and decrypt cost for each strategy."""
+    cipher = TuyaCipher(LOCAL_KEY, (3, 3))
+    command = Message.GET_COMMAND
+    print(f"{'bytes':>6} {'operation':>9} {'legacy':>9} {'reused':>9} {'batched':>9}  (us/msg)")
+    for size in (32, 256, 4096):
+        payloads = [bytes([i]) * size for i in range(BATCH)]
+        encrypted = cipher.encrypt_many(command, payloads)
+
+        rows = {
+            "encrypt": (
+                lambda: [legacy_encrypt(cipher, p) for p in payloads],
+                lambda: [cipher.encrypt(command, p) for p in payloads],
+                lambda: cipher.encrypt_many(command, payloads),
+            ),
+            "decrypt": (
+                lambda: [legacy_decrypt(cipher, e) for e in encrypted],
+                lambda: [cipher.decrypt(command, e) for e in encrypted],
+                lambda: cipher.decrypt_many(command, encrypted),
+            ),
+        }
+        for operation, (legacy, reused, batched) in rows.items():
+            print(
+                f"{size:>6} {operation:>9} {_per_message_us(legacy):>9.2f}"
+                f" {_per_message_us(reused):>9.2f} {_per_message_us(batched):>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    bench_cipher()
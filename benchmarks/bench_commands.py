@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark encoding of outgoing mode commands in commands per second.
+
+Compares the cached encoder with encoding every command from scratch, and
+with the JSON and base64 payload the room clean command used to build on
+every call.
+"""
+
+import base64
+import json
+import os
+import sys
+import time
+import timeit
+from typing import Callable
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.commands import (
+    auto_clean_command,
+    encode_mode_command,
+    room_clean_command,
+    zone_clean_command,
+)
+from custom_components.robovacl60.proto import (
+    ModeCommand,
+    ModeMethod,
+    decode_mode_command,
+)
+
+NUMBER = 20000
+REPEAT = 7
+ROOM_IDS = [3, 5, 8]
+ZONES = [(-1500, 200, 0, -2000), (400, 400, 1200, 1600)]
+
+
+def legacy_room_clean(room_ids: list[int], count: int) -> str:
+    """Build the room clean payload the way the entity used to."""
+    method_call = {
+        "method": "selectRoomsClean",
+        "data": {"roomIds": room_ids, "cleanTimes": count},
+        "timestamp": round(time.time() * 1000),
+    }
+    json_str = json.dumps(method_call, separators=(",", ":"))
+    return base64.b64encode(json_str.encode("utf8")).decode("utf8")
+
+
+def _per_second(encode: Callable[[], str]) -> float:
+    """Return how many times per second encode can be called."""
+    best = min(timeit.repeat(encode, number=NUMBER, repeat=REPEAT))
+    return NUMBER / best
+
+
+def bench_commands() -> None:
+    """Print encoding throughput for each kind of command."""
+    uncached = encode_mode_command.__wrapped__  # type: ignore[attr-defined]
+    room = ModeCommand(
+        method=ModeMethod.START_SELECT_ROOMS_CLEAN, clean_times=1, room_ids=tuple(ROOM_IDS)
+    )
+    zone = decode_mode_command(zone_clean_command(ZONES))
+    cases = {
+        "auto clean": (
+            lambda: uncached(ModeCommand(clean_times=1)),
+            auto_clean_command,
+        ),
+        "room clean": (
+            lambda: uncached(room),
+            lambda: room_clean_command(ROOM_IDS),
+        ),
+        "zone clean": (
+            lambda: uncached(zone),
+            lambda: zone_clean_command(ZONES),
+        ),
+    }
+
+    print(f"{'command':<12} {'uncached':>12} {'cached':>12}  (commands/s)")
+    for name, (encode, cached) in cases.items():
+        print(f"{name:<12} {_per_second(encode):>12,.0f} {_per_second(cached):>12,.0f}")
+    print(f"{'legacy room':<12} {_per_second(lambda: legacy_room_clean(ROOM_IDS, 1)):>12,.0f}")
+
+
+if __name__ == "__main__":
+    bench_commands()
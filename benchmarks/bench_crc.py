@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the Tuya frame CRC.
+
+Compares the zlib-backed crc() with the pure-Python reference implementation
+over frame sizes ranging from a ping up to a map-sized DPS payload.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.tuyalocalapi import crc, crc_python
+
+SIZES = [24, 128, 1024, 16384, 65536]
+
+
+def bench_crc() -> None:
+    """Time both CRC implementations and print the speed-up per frame size."""
+    rng = random.Random(0)
+    print(f"{'bytes':>8} {'python (us)':>12} {'zlib (us)':>10} {'speed-up':>9}")
+    for size in SIZES:
+        data = rng.randbytes(size)
+        assert crc(data) == crc_python(data)
+        number = max(10, 200000 // size)
+        python_time = timeit.timeit(lambda: crc_python(data), number=number) / number
+        zlib_time = timeit.timeit(lambda: crc(data), number=number * 100) / (number * 100)
+        print(
+            f"{size:>8} {python_time * 1e6:>12.2f} {zlib_time * 1e6:>10.3f}"
+            f" {python_time / zlib_time:>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    bench_crc()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark Message.from_bytes in frames per second.
+
+Compares the memoryview/struct.Struct decode path against the previous
+implementation, which sliced the frame into several intermediate bytes
+objects and called struct.calcsize for every field.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import sys
+import timeit
+from typing import Any, Callable
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.tuyalocalapi import (
+    MAGIC_PREFIX,
+    MAGIC_SUFFIX,
+    MESSAGE_PREFIX_FORMAT,
+    MESSAGE_SUFFIX_FORMAT,
+    InvalidMessage,
+    Message,
+    TuyaCipher,
+    crc,
+)
+
+NUMBER = 1000
+REPEAT = 30
+LOCAL_KEY = "0123456789abcdef"
+
+
+class _Device:
+    """Just enough of a TuyaDevice for encoding and decoding frames."""
+
+    _LOGGER = logging.getLogger(__name__)
+    version = (3, 3)
+    cipher = TuyaCipher(LOCAL_KEY, version)
+
+
+def legacy_from_bytes(
+    device: Any, data: bytes, cipher: TuyaCipher | None
+) -> Message:
+    """Decode a frame the way Message.from_bytes did before the rewrite."""
+    prefix, sequence, command, payload_size = struct.unpack_from(
+        MESSAGE_PREFIX_FORMAT, data
+    )
+    if prefix != MAGIC_PREFIX:
+        raise InvalidMessage("Magic prefix missing from message.")
+    header_size = struct.calcsize(MESSAGE_PREFIX_FORMAT)
+    (return_code,) = struct.unpack_from(">I", data, header_size)
+    if return_code >> 8:
+        payload_data = data[
+            header_size:header_size
+            + payload_size
+            - struct.calcsize(MESSAGE_SUFFIX_FORMAT)
+        ]
+    else:
+        payload_data = data[
+            header_size
+            + struct.calcsize(">I"):header_size
+            + payload_size
+            - struct.calcsize(MESSAGE_SUFFIX_FORMAT)
+        ]
+    expected_crc, suffix = struct.unpack_from(
+        MESSAGE_SUFFIX_FORMAT,
+        data,
+        header_size + payload_size - struct.calcsize(MESSAGE_SUFFIX_FORMAT),
+    )
+    if suffix != MAGIC_SUFFIX:
+        raise InvalidMessage("Magic suffix missing from message")
+    actual_crc = crc(
+        data[: header_size + payload_size - struct.calcsize(MESSAGE_SUFFIX_FORMAT)]
+    )
+    if expected_crc != actual_crc:
+        raise InvalidMessage("CRC check failed")
+    payload = None
+    if payload_data:
+        try:
+            if cipher is not None:
+                payload_data = cipher.decrypt(command, payload_data)
+        except ValueError:
+            pass
+        payload = json.loads(payload_data.decode("utf8"))
+    return Message(command, payload, sequence)
+
+
+def _frames_per_second(
+    legacy: Callable[[], Message], current: Callable[[], Message]
+) -> tuple[float, float]:
+    """Return the best decode rates of both decoders over REPEAT runs.
+
+    The runs alternate between the two so that drift in machine load affects
+    both rates alike instead of whichever happened to run second.
+    """
+    legacy_timer = timeit.Timer(legacy)
+    current_timer = timeit.Timer(current)
+    legacy_best = current_best = float("inf")
+    for _ in range(REPEAT):
+        legacy_best = min(legacy_best, legacy_timer.timeit(NUMBER))
+        current_best = min(current_best, current_timer.timeit(NUMBER))
+    return NUMBER / legacy_best, NUMBER / current_best
+
+
+async def bench_decode() -> None:
+    """Decode gratuitous updates of increasing size with both implementations."""
+    device = _Device()
+    print(
+        f"{'frames':>10} {'dps bytes':>10} {'legacy fps':>12} {'current fps':>12}"
+        f" {'speed-up':>9}"
+    )
+    for encrypt in (False, True):
+        cipher = device.cipher if encrypt else None
+        for size in (16, 256, 4096, 32768):
+            payload = {"devId": "bench", "dps": {"152": "A" * size, "163": 100}}
+            frame = Message(
+                Message.GRATUITOUS_UPDATE,
+                json.dumps(payload).encode("utf8"),
+                sequence=1,
+                encrypt=encrypt,
+                device=device,  # type: ignore[arg-type]
+                expect_response=False,
+            ).to_bytes()
+
+            legacy, current = _frames_per_second(
+                lambda: legacy_from_bytes(device, frame, cipher),
+                lambda: Message.from_bytes(device, frame, cipher),  # type: ignore[arg-type]
+            )
+            print(
+                f"{'encrypted' if encrypt else 'plain':>10} {size:>10} {legacy:>12.0f}"
+                f" {current:>12.0f} {current / legacy:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(bench_decode())
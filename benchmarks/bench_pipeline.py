@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark the time to deliver a burst of queued commands to a device.
+
+Starts a fake device server on localhost that counts the frames it receives,
+then queues N SET commands on a TuyaDevice connected to it and times how long
+it takes until the server has seen every frame. Each burst is sent once with
+one frame per write (the previous behaviour) and once with the default
+pipelined batches.
+
+Usage: bench_pipeline.py [commands per burst]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.tuyalocalapi import (
+    MAX_BATCH_FRAMES,
+    MESSAGE_PREFIX_STRUCT,
+    Message,
+    TuyaDevice,
+)
+
+DEFAULT_COMMANDS = 200
+REPEAT = 7
+LOCAL_KEY = "0123456789abcdef"
+
+
+class FakeDevice:
+    """A local TCP server that counts the Tuya frames it receives."""
+
+    def __init__(self) -> None:
+        """Initialize the server state."""
+        self.frames = 0
+        self.expected = 0
+        self.done = asyncio.Event()
+        self.server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> int:
+        """Start listening and return the port."""
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        assert self.server is not None
+        self.server.close()
+        await self.server.wait_closed()
+
+    def expect(self, frames: int) -> None:
+        """Reset the counter and wait for a number of frames."""
+        self.frames = 0
+        self.expected = frames
+        self.done.clear()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Read frames until the client disconnects."""
+        try:
+            while True:
+                header = await reader.readexactly(MESSAGE_PREFIX_STRUCT.size)
+                _, _, _, size = MESSAGE_PREFIX_STRUCT.unpack(header)
+                await reader.readexactly(size)
+                self.frames += 1
+                if self.frames >= self.expected:
+                    self.done.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _no_update() -> None:
+    """Ignore state updates from the device."""
+
+
+async def time_burst(device: TuyaDevice, server: FakeDevice, commands: int) -> float:
+    """Queue a burst of SETs and return the seconds until all were received."""
+    server.expect(commands)
+    start = time.perf_counter()
+    for index in range(commands):
+        device._enqueue(
+            Message(
+                Message.SET_COMMAND,
+                {"dps": {"158": index}},
+                sequence=index,
+                device=device,
+                expect_response=False,
+            )
+        )
+    await asyncio.wait_for(server.done.wait(), timeout=30)
+    return time.perf_counter() - start
+
+
+async def bench(commands: int, max_batch_frames: int) -> float:
+    """Return the median delivery time of a burst for one batch size."""
+    server = FakeDevice()
+    port = await server.start()
+    device = TuyaDevice(
+        None,
+        "bench_device_id",
+        "127.0.0.1",
+        timeout=5,
+        ping_interval=3600,
+        update_entity_state=_no_update,
+        local_key=LOCAL_KEY,
+        port=port,
+        max_batch_frames=max_batch_frames,
+        # The burst is larger than the default queue bound, which would drop
+        # most of it
+        max_queue_depth=None,
+    )
+    try:
+        await device.async_connect()
+        await time_burst(device, server, commands)
+        timings = [await time_burst(device, server, commands) for _ in range(REPEAT)]
+    finally:
+        await device.async_disable()
+        await server.stop()
+    return statistics.median(timings)
+
+
+def bench_pipeline(commands: int) -> None:
+    """Print the time to deliver a burst with and without batching."""
+    single = asyncio.run(bench(commands, 1))
+    batched = asyncio.run(bench(commands, MAX_BATCH_FRAMES))
+    print(f"Delivering {commands} queued commands (median of {REPEAT}):")
+    print(f"  one frame per write: {single * 1000:8.2f} ms")
+    print(f"  batched writes:      {batched * 1000:8.2f} ms")
+    print(f"  speedup:             {single / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    bench_pipeline(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COMMANDS)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark reads of the device state under a 10 Hz update stream.
+
+A writer task applies a state update every 100 ms, as a busy vacuum pushing
+its status would, while reader tasks keep reading the whole state and a few
+DPS from it. Reads are timed once with a full dict copy per read (the previous
+TuyaDevice.state) and once with the store's shared copy-on-write snapshot.
+
+Usage: bench_snapshot.py [seconds per run]
+"""
+
+import asyncio
+import base64
+import os
+import sys
+import time
+from typing import Any, Callable, Mapping
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.tuyastate import DpsStore
+
+UPDATE_INTERVAL = 0.1
+READERS = 4
+READS_PER_YIELD = 100
+DEFAULT_DURATION = 2.0
+
+# Roughly what an L60 reports: a few protobuf blobs, flags and counters.
+INITIAL_STATE: dict[str, Any] = {
+    **{str(code): base64.b64encode(bytes(range(code % 40 + 8))).decode()
+       for code in range(150, 170)},
+    **{str(code): code % 2 == 0 for code in range(100, 110)},
+    "163": 80,
+}
+
+
+async def soak(
+    read: Callable[[DpsStore], Mapping[str, Any]], duration: float
+) -> tuple[int, float]:
+    """Read the state as fast as possible while it is updated at 10 Hz.
+
+    Returns:
+        The number of reads, and the seconds spent inside them.
+    """
+    store = DpsStore(INITIAL_STATE)
+    stop = time.monotonic() + duration
+    reads = 0
+    spent = 0.0
+
+    async def writer() -> None:
+        battery = 80
+        while time.monotonic() < stop:
+            battery = battery - 1 if battery > 10 else 100
+            store.update({"163": battery, "153": base64.b64encode(bytes([battery])).decode()})
+            await asyncio.sleep(UPDATE_INTERVAL)
+
+    async def reader() -> None:
+        nonlocal reads, spent
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            for _ in range(READS_PER_YIELD):
+                state = read(store)
+                state.get("163")
+                state.get("153")
+                "152" in state
+            spent += time.perf_counter() - start
+            reads += READS_PER_YIELD
+            await asyncio.sleep(0)
+
+    await asyncio.gather(writer(), *(reader() for _ in range(READERS)))
+    return reads, spent
+
+
+def bench_snapshot(duration: float) -> None:
+    """Print the cost of a state read with copies and with snapshots."""
+    print(f"{READERS} readers, updates every {UPDATE_INTERVAL * 1000:.0f} ms, "
+          f"{len(INITIAL_STATE)} DPS")
+    results = {}
+    # The copy is taken from the underlying dict, as TuyaDevice.state used to
+    # copy a plain dict rather than go through the Mapping interface.
+    for name, read in (("dict copy", lambda store: dict(store._values)),
+                       ("snapshot", DpsStore.snapshot)):
+        reads, spent = asyncio.run(soak(read, duration))
+        results[name] = spent / reads
+        print(f"  {name:<10} {reads / duration:>12,.0f} reads/s"
+              f"  {spent / reads * 1e9:>8.0f} ns/read")
+    print(f"  speedup: {results['dict copy'] / results['snapshot']:.1f}x")
+
+
+if __name__ == "__main__":
+    bench_snapshot(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DURATION)
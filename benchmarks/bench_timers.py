@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Soak benchmark for per-device timers versus the shared timing wheel.
+
+Simulates a fleet of devices that each ping and poll on a fixed interval,
+started at random offsets as they would be after a restart. The fleet runs
+once with a sleeping task per timer (the per-device behaviour) and once on a
+single TimingWheel. For each fleet size it reports how often the event loop
+woke up.
+
+Wakeups are counted by wrapping the event loop's private _run_once method, so
+this only works with the default pure-Python asyncio loop.
+
+Usage: bench_timers.py [seconds per run]
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.robovacl60.tuyatimers import TimingWheel
+
+DEVICE_COUNTS = (10, 50, 200, 500)
+PING_INTERVAL = 1.0
+POLL_INTERVAL = 3.0
+DEFAULT_DURATION = 3.0
+
+
+def count_wakeups(loop: asyncio.AbstractEventLoop) -> list[int]:
+    """Count event loop iterations. Returns a one-element counter."""
+    counter = [0]
+    run_once = loop._run_once  # type: ignore[attr-defined]
+
+    def counted() -> None:
+        counter[0] += 1
+        run_once()
+
+    loop._run_once = counted  # type: ignore[attr-defined]
+    return counter
+
+
+async def soak_tasks(devices: int, duration: float) -> int:
+    """Run every device timer as its own sleeping task."""
+    fired = [0]
+
+    async def timer(interval: float) -> None:
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            fired[0] += 1
+            await asyncio.sleep(interval)
+
+    tasks = [
+        asyncio.create_task(timer(interval))
+        for _ in range(devices)
+        for interval in (PING_INTERVAL, POLL_INTERVAL)
+    ]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return fired[0]
+
+
+async def soak_wheel(devices: int, duration: float) -> int:
+    """Run every device timer on one shared timing wheel."""
+    wheel = TimingWheel()
+    fired = [0]
+
+    def timer(interval: float) -> None:
+        fired[0] += 1
+        wheel.call_later(interval, timer, interval)
+
+    for _ in range(devices):
+        for interval in (PING_INTERVAL, POLL_INTERVAL):
+            wheel.call_later(random.uniform(0, interval), timer, interval)
+    await asyncio.sleep(duration)
+    wheel.close()
+    return fired[0]
+
+
+def run(soak, devices: int, duration: float) -> tuple[float, int]:
+    """Run one soak and return loop wakeups per second and timers fired."""
+    loop = asyncio.new_event_loop()
+    try:
+        counter = count_wakeups(loop)
+        fired = loop.run_until_complete(soak(devices, duration))
+    finally:
+        loop.close()
+    return counter[0] / duration, fired
+
+
+def bench_timers(duration: float) -> None:
+    """Print loop wakeups per second for each fleet size."""
+    print(f"{'devices':>7} {'tasks':>9} {'wheel':>9}  (loop wakeups/s, timers fired)")
+    for devices in DEVICE_COUNTS:
+        task_rate, task_fired = run(soak_tasks, devices, duration)
+        wheel_rate, wheel_fired = run(soak_wheel, devices, duration)
+        print(
+            f"{devices:>7} {task_rate:>9.1f} {wheel_rate:>9.1f}"
+            f"  ({task_fired} / {wheel_fired})"
+        )
+
+
+if __name__ == "__main__":
+    bench_timers(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DURATION)
@@ -15,6 +15,7 @@
 """The Eufy Robovac integration."""
 
 from __future__ import annotations
+import asyncio
 import logging
 from typing import Any, Dict, Optional
 
@@ -22,8 +23,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform, CONF_IP_ADDRESS
 from homeassistant.core import HomeAssistant
 
-from .const import CONF_VACS, CONF_MODEL, DOMAIN
+from .const import CONF_VACS, CONF_MODEL, COORDINATORS, DOMAIN, SCHEDULER
+from .coordinator import RoboVacCoordinator
 from .tuyalocaldiscovery import TuyaLocalDiscovery
+from .tuyatimers import TimingWheel
 from .vacuum import async_setup_entry as vacuum_setup  # needed by HA forwarding
 from .sensor import async_setup_entry as sensor_setup  # needed by HA forwarding
 
@@ -89,7 +92,22 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         _LOGGER.warning("No supported L60 vacuums found in this config entry.")
         return False
 
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {CONF_VACS: valid_vacs}
+    # One timing wheel drives the timers of every device in the integration
+    scheduler = hass.data.setdefault(DOMAIN, {}).setdefault(SCHEDULER, TimingWheel())
+
+    # One coordinator per vacuum owns its connection and feeds every entity
+    coordinators = {
+        vac_id: RoboVacCoordinator(hass, entry, vac_data, scheduler)
+        for vac_id, vac_data in valid_vacs.items()
+    }
+    await asyncio.gather(
+        *(coordinator.async_refresh() for coordinator in coordinators.values())
+    )
+
+    hass.data[DOMAIN][entry.entry_id] = {
+        CONF_VACS: valid_vacs,
+        COORDINATORS: coordinators,
+    }
 
     # Forward setup to each platform
     await hass.config_entries.async_forward_entry_setups(entry, [Platform.SENSOR])
@@ -103,7 +121,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if DOMAIN in hass.data:
-        hass.data[DOMAIN].pop(entry.entry_id, None)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        if entry_data is not None:
+            for coordinator in entry_data[COORDINATORS].values():
+                await coordinator.async_shutdown()
 
     return unload_ok
 
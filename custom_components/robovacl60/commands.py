@@ -0,0 +1,184 @@
+"""Encoding of L60 SES mode commands.
+
+Mode commands are ModeCtrlRequest protobuf messages sent in DPS 152, as base64
+of the message preceded by its length as a varint; see proto.py for the
+decoding side. The entity only ever sends a handful of distinct commands, so
+the encoded value of each is cached and sending a command again costs a dict
+lookup.
+"""
+
+import base64
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from .proto import ModeCommand, ModeMethod, Point, Zone
+
+ENCODE_CACHE_SIZE = 128
+
+
+def write_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a varint."""
+    if value < 0:
+        raise ValueError("Varints cannot be negative: {}".format(value))
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def zigzag_encode(value: int) -> int:
+    """Encode a signed integer as a zigzag sint32."""
+    return (value << 1) ^ (value >> 31)
+
+
+def varint_field(number: int, value: int) -> bytes:
+    """Encode a varint field."""
+    return write_varint(number << 3) + write_varint(value)
+
+
+def message_field(number: int, payload: bytes) -> bytes:
+    """Encode a length-delimited field, such as an embedded message."""
+    return write_varint(number << 3 | 2) + write_varint(len(payload)) + payload
+
+
+def pack_dps(message: bytes) -> str:
+    """Wrap a serialised message as a DPS value.
+
+    Args:
+        message: The serialised message.
+
+    Returns:
+        Base64 of the message preceded by its length.
+    """
+    return base64.b64encode(write_varint(len(message)) + message).decode("ascii")
+
+
+def _encode_point(number: int, point: Point) -> bytes:
+    """Encode a map point with zigzag-encoded coordinates."""
+    return message_field(
+        number,
+        varint_field(1, zigzag_encode(point.x)) + varint_field(2, zigzag_encode(point.y)),
+    )
+
+
+def _encode_zone(zone: Zone) -> bytes:
+    """Encode a zone as a quadrangle and a clean count."""
+    if len(zone.corners) != 4:
+        raise ValueError("A zone needs four corners, not {}".format(len(zone.corners)))
+    quadrangle = b"".join(
+        _encode_point(number, corner) for number, corner in enumerate(zone.corners, start=1)
+    )
+    return message_field(1, quadrangle) + varint_field(2, zone.clean_times)
+
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def encode_mode_command(command: ModeCommand) -> str:
+    """Encode a mode command as a DPS 152 value.
+
+    Fields left at their defaults are omitted, as protobuf does, so that
+    encoding a decoded command gives back the value the device sent.
+
+    Args:
+        command: The command.
+
+    Returns:
+        The DPS value.
+    """
+    message = b""
+    if command.method:
+        message += varint_field(1, command.method)
+
+    if command.room_ids:
+        rooms = b"".join(
+            message_field(1, varint_field(1, room_id) + varint_field(2, order))
+            for order, room_id in enumerate(command.room_ids, start=1)
+        )
+        rooms += varint_field(2, command.clean_times or 1)
+        if command.map_id is not None:
+            rooms += varint_field(3, command.map_id)
+        message += message_field(4, rooms)
+    elif command.zones:
+        message += message_field(
+            5, b"".join(message_field(1, _encode_zone(zone)) for zone in command.zones)
+        )
+    elif command.clean_times is not None:
+        message += message_field(3, varint_field(1, command.clean_times))
+
+    return pack_dps(message)
+
+
+def auto_clean_command(clean_times: int = 1) -> str:
+    """Get the command that starts a clean of the whole home."""
+    return encode_mode_command(ModeCommand(clean_times=clean_times))
+
+
+def pause_command() -> str:
+    """Get the command that pauses the current task."""
+    return encode_mode_command(ModeCommand(method=ModeMethod.PAUSE_TASK))
+
+
+def resume_command() -> str:
+    """Get the command that resumes the paused task."""
+    return encode_mode_command(ModeCommand(method=ModeMethod.RESUME_TASK))
+
+
+def stop_command() -> str:
+    """Get the command that stops the current task."""
+    return encode_mode_command(ModeCommand(method=ModeMethod.STOP_TASK))
+
+
+def go_home_command() -> str:
+    """Get the command that sends the vacuum back to its dock."""
+    return encode_mode_command(ModeCommand(method=ModeMethod.START_GOHOME))
+
+
+def room_clean_command(
+    room_ids: Iterable[int], clean_times: int = 1, map_id: Optional[int] = None
+) -> str:
+    """Get the command that cleans some rooms.
+
+    Args:
+        room_ids: The rooms to clean, in order.
+        clean_times: How many times to clean each room.
+        map_id: The map the room ids belong to, if not the current one.
+
+    Returns:
+        The DPS value.
+    """
+    return encode_mode_command(
+        ModeCommand(
+            method=ModeMethod.START_SELECT_ROOMS_CLEAN,
+            clean_times=clean_times,
+            room_ids=tuple(int(room_id) for room_id in room_ids),
+            map_id=map_id,
+        )
+    )
+
+
+def zone_clean_command(
+    zones: Iterable[tuple[int, int, int, int]], clean_times: int = 1
+) -> str:
+    """Get the command that cleans some rectangular zones.
+
+    Args:
+        zones: Each zone as (x0, y0, x1, y1), the coordinates of two opposite
+            corners on the map.
+        clean_times: How many times to clean each zone.
+
+    Returns:
+        The DPS value.
+    """
+    return encode_mode_command(
+        ModeCommand(
+            method=ModeMethod.START_SELECT_ZONES_CLEAN,
+            zones=tuple(
+                Zone(
+                    corners=(Point(x0, y0), Point(x1, y0), Point(x1, y1), Point(x0, y1)),
+                    clean_times=clean_times,
+                )
+                for x0, y0, x1, y1 in zones
+            ),
+        )
+    )
@@ -4,6 +4,9 @@ DOMAIN = "robovacl60"
 CONF_VACS = "vacuums"
 CONF_AUTODISCOVERY = "autodiscovery"
 CONF_MODEL = "model"
+SCHEDULER = "scheduler"
+COORDINATORS = "coordinators"
 REFRESH_RATE = 60
 PING_RATE = 10
 TIMEOUT = 5
+WRITE_COALESCE_WINDOW = 0.05
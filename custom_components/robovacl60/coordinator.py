@@ -0,0 +1,114 @@
+"""Data update coordinator for Eufy RoboVac devices."""
+
+from __future__ import annotations
+from collections.abc import Mapping
+from datetime import timedelta
+import logging
+import time
+from typing import Any, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    CONF_ACCESS_TOKEN,
+    CONF_ID,
+    CONF_IP_ADDRESS,
+    CONF_MODEL,
+    CONF_NAME,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import PING_RATE, REFRESH_RATE, TIMEOUT, WRITE_COALESCE_WINDOW
+from .robovac import ModelNotSupportedException, RoboVac
+from .tuyalocalapi import TuyaException
+from .tuyatimers import TimingWheel
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RoboVacCoordinator(DataUpdateCoordinator[Mapping[str, Any]]):
+    """Coordinator that owns the connection to one RoboVac.
+
+    The vacuum pushes its state whenever it changes, and each push is fanned
+    out to every entity straight away. The device is only polled when nothing
+    has been pushed for `update_interval`, so every device costs at most one
+    GET per interval however many entities it has.
+
+    The data is the vacuum's immutable state snapshot, so every entity reads
+    the same consistent view without copying it.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        item: dict[str, Any],
+        scheduler: Optional[TimingWheel] = None,
+    ) -> None:
+        """Initialize the coordinator and create the device connection.
+
+        Args:
+            hass: The Home Assistant instance.
+            entry: The config entry the vacuum belongs to.
+            item: Dictionary containing the vacuum configuration.
+            scheduler: Optional timing wheel shared by all devices to drive
+                their timers.
+        """
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name=item[CONF_NAME],
+            update_interval=timedelta(seconds=REFRESH_RATE),
+        )
+        self.last_push = 0.0
+        self.vacuum: Optional[RoboVac] = None
+
+        try:
+            self.vacuum = RoboVac(
+                device_id=item[CONF_ID],
+                host=item[CONF_IP_ADDRESS],
+                local_key=item[CONF_ACCESS_TOKEN],
+                timeout=TIMEOUT,
+                ping_interval=PING_RATE,
+                model_code=(item[CONF_MODEL] or "")[0:5],
+                update_entity_state=self.async_pushed_update,
+                scheduler=scheduler,
+                write_coalesce_window=WRITE_COALESCE_WINDOW,
+            )
+        except ModelNotSupportedException:
+            _LOGGER.error("Model %s is not supported", item[CONF_MODEL])
+
+    async def _async_update_data(self) -> Mapping[str, Any]:
+        """Fetch the device state unless a recent push already provided it."""
+        if self.vacuum is None:
+            return {}
+
+        assert self.update_interval is not None
+        if time.monotonic() - self.last_push < self.update_interval.total_seconds():
+            _LOGGER.debug("Skipping poll of %s, state was pushed recently", self.name)
+            return self.vacuum.state
+
+        try:
+            await self.vacuum.async_get()
+        except TuyaException as e:
+            raise UpdateFailed(str(e)) from e
+        return self.vacuum.state
+
+    async def async_pushed_update(self) -> None:
+        """Handle a state update pushed by the vacuum.
+
+        Pushing the data to the entities also reschedules the next poll, so
+        the device is not polled while it keeps pushing.
+        """
+        if self.vacuum is None:
+            return
+
+        self.last_push = time.monotonic()
+        self.async_set_updated_data(self.vacuum.state)
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and disconnect from the vacuum."""
+        await super().async_shutdown()
+        if self.vacuum is not None:
+            await self.vacuum.async_disable()
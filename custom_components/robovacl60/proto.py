@@ -0,0 +1,418 @@
+"""Decoding of the protobuf payloads used by the L60 SES.
+
+Several DPS, notably 152 (mode commands) and 153 (work status), carry a small
+protobuf message rather than a plain value. Each is sent as base64 of the
+message preceded by its length as a varint.
+
+The device repeats the same few values over and over, so the decoders for
+known DPS are memoised on the raw string: after the first time, decoding a
+value is a cache hit.
+"""
+
+import base64
+import binascii
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from typing import Iterator, Optional, Union
+
+DECODE_CACHE_SIZE = 256
+
+WIRE_VARINT = 0
+WIRE_I64 = 1
+WIRE_LEN = 2
+WIRE_I32 = 5
+
+FieldValue = Union[int, bytes]
+
+
+class ProtobufDecodeError(ValueError):
+    """The payload is not a valid length-prefixed protobuf message."""
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """Read a varint.
+
+    Args:
+        data: The buffer to read from.
+        offset: Where the varint starts.
+
+    Returns:
+        The value, and the offset just after the varint.
+    """
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ProtobufDecodeError("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+        if shift >= 64:
+            raise ProtobufDecodeError("Varint is too long")
+
+
+def zigzag_decode(value: int) -> int:
+    """Decode a zigzag-encoded sint32 or sint64."""
+    return (value >> 1) ^ -(value & 1)
+
+
+def iter_fields(data: bytes) -> Iterator[tuple[int, int, FieldValue]]:
+    """Iterate over the fields of a protobuf message.
+
+    Args:
+        data: The serialised message, without a length prefix.
+
+    Yields:
+        The field number, wire type and value of each field in order.
+        Length-delimited values are returned as bytes, all others as ints.
+    """
+    offset = 0
+    while offset < len(data):
+        key, offset = read_varint(data, offset)
+        number, wire_type = key >> 3, key & 7
+        if number == 0:
+            raise ProtobufDecodeError("Invalid field number 0")
+        value: FieldValue
+        if wire_type == WIRE_VARINT:
+            value, offset = read_varint(data, offset)
+        elif wire_type == WIRE_LEN:
+            size, offset = read_varint(data, offset)
+            if offset + size > len(data):
+                raise ProtobufDecodeError("Truncated field {}".format(number))
+            value = bytes(data[offset:offset + size])
+            offset += size
+        elif wire_type in (WIRE_I64, WIRE_I32):
+            size = 8 if wire_type == WIRE_I64 else 4
+            if offset + size > len(data):
+                raise ProtobufDecodeError("Truncated field {}".format(number))
+            value = int.from_bytes(data[offset:offset + size], "little")
+            offset += size
+        else:
+            raise ProtobufDecodeError("Unsupported wire type {}".format(wire_type))
+        yield number, wire_type, value
+
+
+def decode_fields(data: bytes) -> dict[int, list[FieldValue]]:
+    """Decode a protobuf message into its fields.
+
+    Args:
+        data: The serialised message, without a length prefix.
+
+    Returns:
+        The values of each field number, in order. Repeated fields have
+        several values.
+    """
+    fields: dict[int, list[FieldValue]] = {}
+    for number, _, value in iter_fields(data):
+        fields.setdefault(number, []).append(value)
+    return fields
+
+
+def unpack_dps(raw: str) -> bytes:
+    """Extract the protobuf message from a DPS value.
+
+    Args:
+        raw: The DPS value: base64 of a varint length followed by a message.
+
+    Returns:
+        The serialised message.
+    """
+    try:
+        data = base64.b64decode(raw, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ProtobufDecodeError("Invalid base64: {}".format(e)) from e
+    size, offset = read_varint(data, 0)
+    if offset + size != len(data):
+        raise ProtobufDecodeError(
+            "Length prefix {} does not match the {} byte message".format(
+                size, len(data) - offset
+            )
+        )
+    return data[offset:]
+
+
+def _varint(fields: dict[int, list[FieldValue]], number: int, default: int = 0) -> int:
+    """Get the last value of a varint field."""
+    values = fields.get(number)
+    if not values or not isinstance(values[-1], int):
+        return default
+    return values[-1]
+
+
+def _optional_varint(fields: dict[int, list[FieldValue]], number: int) -> Optional[int]:
+    """Get the last value of a varint field, or None if it is absent."""
+    if number not in fields:
+        return None
+    return _varint(fields, number)
+
+
+def _message(
+    fields: dict[int, list[FieldValue]], number: int
+) -> Optional[dict[int, list[FieldValue]]]:
+    """Get an embedded message field, or None if it is absent."""
+    values = fields.get(number)
+    if not values or not isinstance(values[-1], bytes):
+        return None
+    return decode_fields(values[-1])
+
+
+def _messages(
+    fields: dict[int, list[FieldValue]], number: int
+) -> list[dict[int, list[FieldValue]]]:
+    """Get every value of a repeated embedded message field."""
+    return [
+        decode_fields(value) for value in fields.get(number, ()) if isinstance(value, bytes)
+    ]
+
+
+class CleanMode(IntEnum):
+    """What the vacuum is cleaning (WorkStatus.Mode)."""
+
+    AUTO = 0
+    ROOM = 1
+    ZONE = 2
+    SPOT = 3
+    FAST_MAPPING = 4
+    GLOBAL_CRUISE = 5
+    ZONES_CRUISE = 6
+    POINT_CRUISE = 7
+    SCENE = 8
+    SMART_FOLLOW = 9
+
+
+class WorkState(IntEnum):
+    """The vacuum's top-level state (WorkStatus.State)."""
+
+    STANDBY = 0
+    SLEEP = 1
+    FAULT = 2
+    CHARGING = 3
+    FAST_MAPPING = 4
+    CLEANING = 5
+    REMOTE_CTRL = 6
+    GO_HOME = 7
+    CRUISING = 8
+
+
+class ModeMethod(IntEnum):
+    """The action requested by a mode command (ModeCtrlRequest.Method)."""
+
+    START_AUTO_CLEAN = 0
+    START_SELECT_ROOMS_CLEAN = 1
+    START_SELECT_ZONES_CLEAN = 2
+    START_SPOT_CLEAN = 3
+    START_GOTO_CLEAN = 4
+    START_RC_CLEAN = 5
+    START_GOHOME = 6
+    START_SCHEDULE_AUTO_CLEAN = 7
+    START_SCHEDULE_ROOMS_CLEAN = 8
+    START_FAST_MAPPING = 9
+    START_GOWASH = 10
+    STOP_TASK = 12
+    PAUSE_TASK = 13
+    RESUME_TASK = 14
+    STOP_GOHOME = 15
+    STOP_RC_CLEAN = 16
+    STOP_GOWASH = 17
+    STOP_SMART_FOLLOW = 18
+    START_GLOBAL_CRUISE = 20
+    START_POINT_CRUISE = 21
+    START_ZONES_CRUISE = 22
+    START_SCHEDULE_CRUISE = 23
+    START_SCENE_CLEAN = 24
+    START_MAPPING_THEN_CLEAN = 25
+
+
+def _enum_name(enum: type[IntEnum], value: int) -> str:
+    """Get the lower case name of an enum value, or the number if unknown."""
+    try:
+        return enum(value).name.lower()
+    except ValueError:
+        return str(value)
+
+
+@dataclass(frozen=True)
+class WorkStatus:
+    """The vacuum's work status, as reported in DPS 153.
+
+    The sub-states are None when the device did not include the section they
+    come from.
+    """
+
+    mode: int = CleanMode.AUTO
+    state: int = WorkState.STANDBY
+    charging_state: Optional[int] = None
+    cleaning_state: Optional[int] = None
+    cleaning_mode: Optional[int] = None
+    go_home_state: Optional[int] = None
+    relocating: bool = False
+
+    @property
+    def charged(self) -> bool:
+        """Whether the vacuum is docked and has finished charging."""
+        return self.state == WorkState.CHARGING and self.charging_state == 1
+
+    @property
+    def paused(self) -> bool:
+        """Whether the current clean or trip home is paused."""
+        if self.state == WorkState.CLEANING:
+            return self.cleaning_state == 1
+        if self.state == WorkState.GO_HOME:
+            return self.go_home_state == 1
+        return False
+
+    @property
+    def label(self) -> str:
+        """Get the status as the integration's status string."""
+        if self.state == WorkState.CLEANING:
+            if self.relocating:
+                return "position"
+            return "paused" if self.paused else "cleaning"
+        if self.state == WorkState.CHARGING:
+            return "idle" if self.charged else "charging"
+        if self.state == WorkState.GO_HOME:
+            return "paused" if self.paused else "returning"
+        return _STATE_LABELS.get(self.state) or _enum_name(WorkState, self.state)
+
+
+_STATE_LABELS: dict[int, str] = {
+    WorkState.STANDBY: "standby",
+    WorkState.SLEEP: "sleeping",
+    WorkState.FAULT: "error",
+    WorkState.FAST_MAPPING: "mapping",
+    WorkState.REMOTE_CTRL: "start_manual",
+    WorkState.CRUISING: "cruising",
+}
+
+
+@dataclass(frozen=True)
+class Point:
+    """A point on the vacuum's map."""
+
+    x: int
+    y: int
+
+
+@dataclass(frozen=True)
+class Zone:
+    """A rectangular zone to clean, given by its four corners."""
+
+    corners: tuple[Point, ...]
+    clean_times: int = 1
+
+
+@dataclass(frozen=True)
+class ModeCommand:
+    """A mode command, as reported in DPS 152."""
+
+    method: int = ModeMethod.START_AUTO_CLEAN
+    clean_times: Optional[int] = None
+    room_ids: tuple[int, ...] = ()
+    map_id: Optional[int] = None
+    zones: tuple[Zone, ...] = ()
+
+    @property
+    def label(self) -> str:
+        """Get the command as the integration's mode string."""
+        return _METHOD_LABELS.get(self.method) or _enum_name(ModeMethod, self.method)
+
+
+_METHOD_LABELS: dict[int, str] = {
+    ModeMethod.START_AUTO_CLEAN: "auto",
+    ModeMethod.START_SELECT_ROOMS_CLEAN: "room",
+    ModeMethod.START_SELECT_ZONES_CLEAN: "zone",
+    ModeMethod.START_SPOT_CLEAN: "spot",
+    ModeMethod.START_GOHOME: "home",
+    # Stopping and resuming leave the vacuum in its normal automatic mode.
+    ModeMethod.STOP_TASK: "auto",
+    ModeMethod.PAUSE_TASK: "pause",
+    ModeMethod.RESUME_TASK: "auto",
+}
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_work_status(raw: str) -> Optional[WorkStatus]:
+    """Decode a DPS 153 work status.
+
+    Args:
+        raw: The DPS value.
+
+    Returns:
+        The status, or None if the value is not a valid message.
+    """
+    try:
+        fields = decode_fields(unpack_dps(raw))
+        mode = _message(fields, 1)
+        charging = _message(fields, 3)
+        cleaning = _message(fields, 6)
+        go_home = _message(fields, 8)
+        return WorkStatus(
+            mode=_varint(mode, 1) if mode is not None else CleanMode.AUTO,
+            state=_varint(fields, 2),
+            charging_state=_varint(charging, 1) if charging is not None else None,
+            cleaning_state=_varint(cleaning, 1) if cleaning is not None else None,
+            cleaning_mode=_varint(cleaning, 2) if cleaning is not None else None,
+            go_home_state=_varint(go_home, 1) if go_home is not None else None,
+            relocating=10 in fields,
+        )
+    except ProtobufDecodeError:
+        return None
+
+
+def _decode_point(fields: Optional[dict[int, list[FieldValue]]]) -> Point:
+    """Decode a map point with zigzag-encoded coordinates."""
+    if fields is None:
+        return Point(0, 0)
+    return Point(zigzag_decode(_varint(fields, 1)), zigzag_decode(_varint(fields, 2)))
+
+
+def _decode_zone(fields: dict[int, list[FieldValue]]) -> Zone:
+    """Decode a zone and the four corners of its quadrangle."""
+    quadrangle = _message(fields, 1)
+    corners: tuple[Point, ...] = ()
+    if quadrangle is not None:
+        corners = tuple(_decode_point(_message(quadrangle, number)) for number in (1, 2, 3, 4))
+    return Zone(corners=corners, clean_times=_varint(fields, 2, 1))
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_mode_command(raw: str) -> Optional[ModeCommand]:
+    """Decode a DPS 152 mode command.
+
+    Args:
+        raw: The DPS value.
+
+    Returns:
+        The command, or None if the value is not a valid message.
+    """
+    try:
+        fields = decode_fields(unpack_dps(raw))
+        auto_clean = _message(fields, 3)
+        rooms_clean = _message(fields, 4)
+        zones_clean = _message(fields, 5)
+
+        clean_times = None
+        room_ids: tuple[int, ...] = ()
+        map_id = None
+        zones: tuple[Zone, ...] = ()
+        if auto_clean is not None:
+            clean_times = _varint(auto_clean, 1)
+        if rooms_clean is not None:
+            room_ids = tuple(_varint(room, 1) for room in _messages(rooms_clean, 1))
+            clean_times = _varint(rooms_clean, 2)
+            map_id = _optional_varint(rooms_clean, 3)
+        if zones_clean is not None:
+            zones = tuple(_decode_zone(zone) for zone in _messages(zones_clean, 1))
+        return ModeCommand(
+            method=_varint(fields, 1),
+            clean_times=clean_times,
+            room_ids=room_ids,
+            map_id=map_id,
+            zones=zones,
+        )
+    except ProtobufDecodeError:
+        return None
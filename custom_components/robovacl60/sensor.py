@@ -1,5 +1,4 @@
 import logging
-from datetime import timedelta
 
 from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
 from homeassistant.config_entries import ConfigEntry
@@ -7,14 +6,14 @@ from homeassistant.const import PERCENTAGE, EntityCategory, CONF_NAME, CONF_ID
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import CONF_VACS, DOMAIN, REFRESH_RATE
+from .const import CONF_VACS, COORDINATORS, DOMAIN
+from .coordinator import RoboVacCoordinator
 from .vacuums.base import TuyaCodes
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=REFRESH_RATE)
-
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -23,26 +22,30 @@ async def async_setup_entry(
 ) -> None:
     """Set up battery sensors for each valid RoboVac."""
     vacuums = hass.data[DOMAIN][config_entry.entry_id][CONF_VACS]
+    coordinators = hass.data[DOMAIN][config_entry.entry_id][COORDINATORS]
     entities: list[RobovacBatterySensor] = []
 
     for vac_id, vac_data in vacuums.items():
-        entities.append(RobovacBatterySensor(config_entry.entry_id, vac_data))
+        entities.append(
+            RobovacBatterySensor(coordinators[vac_id], config_entry.entry_id, vac_data)
+        )
 
-    # Tell HA to poll right away before first update()
-    async_add_entities(entities, update_before_add=True)
+    async_add_entities(entities)
 
 
-class RobovacBatterySensor(SensorEntity):
+class RobovacBatterySensor(CoordinatorEntity[RoboVacCoordinator], SensorEntity):
     """Representation of a Eufy RoboVac Battery Sensor."""
 
     _attr_has_entity_name = True
     _attr_device_class = SensorDeviceClass.BATTERY
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_native_unit_of_measurement = PERCENTAGE
-    _attr_should_poll = True
 
-    def __init__(self, entry_id: str, item: dict) -> None:
-        """Initialize the sensor with its entry ID and config dict."""
+    def __init__(
+        self, coordinator: RoboVacCoordinator, entry_id: str, item: dict
+    ) -> None:
+        """Initialize the sensor with its coordinator, entry ID and config dict."""
+        super().__init__(coordinator)
         self.entry_id = entry_id
         self.robovac_id = item[CONF_ID]
         # e.g. “abc123_battery”
@@ -58,21 +61,18 @@ class RobovacBatterySensor(SensorEntity):
         )
 
     @property
-    def scan_interval(self) -> timedelta:
-        """Force HA to poll at our REFRESH_RATE interval."""
-        return SCAN_INTERVAL
+    def available(self) -> bool:
+        """Return whether the vacuum has reported its battery level."""
+        return (
+            super().available
+            and self.coordinator.data is not None
+            and TuyaCodes.BATTERY_LEVEL in self.coordinator.data
+        )
 
-    async def async_update(self) -> None:
-        """Fetch the latest battery level from the saved vacuum client."""
-        try:
-            vac_client = self.hass.data[DOMAIN][self.entry_id][CONF_VACS].get(self.robovac_id)
-            if vac_client and "tuyastatus" in vac_client:
-                level = vac_client["tuyastatus"].get(TuyaCodes.BATTERY_LEVEL)
-                self._attr_native_value = level
-                self._attr_available = True
-            else:
-                _LOGGER.debug("No status available for %s", self.robovac_id)
-                self._attr_available = False
-        except Exception as exc:
-            _LOGGER.error("Error updating battery sensor %s: %s", self.robovac_id, exc)
-            self._attr_available = False
+    @property
+    def native_value(self) -> int | None:
+        """Return the battery level last reported by the vacuum."""
+        if self.coordinator.data is None:
+            return None
+        battery_level = self.coordinator.data.get(TuyaCodes.BATTERY_LEVEL)
+        return None if battery_level is None else int(battery_level)
@@ -40,29 +40,65 @@
 
 import asyncio
 import base64
+import bisect
+import heapq
+import itertools
 import json
 import logging
 import socket
 import struct
 import time
 import traceback
-from typing import Any, Awaitable, Callable, Coroutine, Optional, Union
-from asyncio import Semaphore, StreamWriter
+import zlib
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    cast,
+)
+from asyncio import Future, StreamReader, StreamWriter
+from .tuyastate import DpsListener, DpsStore
+from .tuyatimers import TimerHandle, TimingWheel
 from .vacuums.base import RobovacCommand
 
 from cryptography.hazmat.backends.openssl import backend as openssl_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.hashes import Hash, MD5
-from cryptography.hazmat.primitives.padding import PKCS7
 
 INITIAL_BACKOFF = 5
 INITIAL_QUEUE_TIME = 0.1
+READ_CHUNK_SIZE = 4096
+MAX_PAYLOAD_SIZE = 0x40000
 BACKOFF_MULTIPLIER = 1.70224
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+PING_INTERVAL_GROWTH = 1.5
+MAX_BATCH_FRAMES = 16
+MAX_BATCH_BYTES = 4096
+MAX_QUEUE_DEPTH = 32
+ACK_RETRIES = 2
+ACK_RETRY_DELAY = 0.5
+MAX_PING_INTERVAL_FACTOR = 6
 _LOGGER = logging.getLogger(__name__)
 MESSAGE_PREFIX_FORMAT = ">IIII"
 MESSAGE_SUFFIX_FORMAT = ">II"
+MESSAGE_PREFIX_STRUCT = struct.Struct(MESSAGE_PREFIX_FORMAT)
+MESSAGE_SUFFIX_STRUCT = struct.Struct(MESSAGE_SUFFIX_FORMAT)
+RETURN_CODE_STRUCT = struct.Struct(">I")
+FRAME_OVERHEAD = MESSAGE_PREFIX_STRUCT.size + MESSAGE_SUFFIX_STRUCT.size
+AES_BLOCK_SIZE = 16
+PKCS7_PADDING = [bytes([size]) * size for size in range(AES_BLOCK_SIZE + 1)]
 MAGIC_PREFIX = 0x000055AA
 MAGIC_SUFFIX = 0x0000AA55
+MAGIC_PREFIX_BYTES = struct.pack(">I", MAGIC_PREFIX)
 MAGIC_SUFFIX_BYTES = struct.pack(">I", MAGIC_SUFFIX)
 CRC_32_TABLE = [
     0x00000000,
@@ -364,6 +400,38 @@ class BackoffException(TuyaException):
     """Backoff time not reached"""
 
 
+class MessageExpiredException(TuyaException):
+    """The message expired before it could be sent."""
+
+
+class QueueFullException(TuyaException):
+    """The message was rejected or dropped because the queue was full."""
+
+
+class AckTimeoutException(TuyaException):
+    """The device did not echo the values that were set."""
+
+
+def pkcs7_pad(data: bytes) -> bytes:
+    """Pad data to a whole number of AES blocks using PKCS#7."""
+    pad_size = AES_BLOCK_SIZE - len(data) % AES_BLOCK_SIZE
+    return data + PKCS7_PADDING[pad_size]
+
+
+def pkcs7_unpad(data: bytes) -> bytes:
+    """Strip PKCS#7 padding from decrypted data.
+
+    Raises:
+        ValueError: If the padding is malformed.
+    """
+    pad_size = data[-1] if data else 0
+    if not 0 < pad_size <= AES_BLOCK_SIZE or not data.endswith(
+        PKCS7_PADDING[pad_size]
+    ):
+        raise ValueError("Invalid padding bytes.")
+    return data[:-pad_size]
+
+
 class TuyaCipher:
     """Tuya cryptographic helpers."""
 
@@ -374,8 +442,17 @@ class TuyaCipher:
         self.cipher = Cipher(
             algorithms.AES(key.encode("ascii")), modes.ECB(), backend=openssl_backend
         )
-
-    def get_prefix_size_and_validate(self, command: int, encrypted_data: bytes) -> int:
+        self._version_string = ".".join(map(str, self.version))
+        self._version_prefix = self._version_string.encode("utf8")
+        # ECB carries no state from one block to the next, so a single context
+        # that is only ever fed whole blocks (and never finalized) can be
+        # reused for every message instead of creating one per call.
+        self._encryptor = self.cipher.encryptor()
+        self._decryptor = self.cipher.decryptor()
+
+    def get_prefix_size_and_validate(
+        self, command: int, encrypted_data: bytes | memoryview
+    ) -> int:
         """Get the prefix size and validate the encrypted data.
 
         Args:
@@ -385,25 +462,47 @@ class TuyaCipher:
         Returns:
             The prefix size.
         """
-        try:
-            version = tuple(map(int, encrypted_data[:3].decode("utf8").split(".")))
-        except ValueError:
-            version = (0, 0)
-        if version != self.version:
+        if encrypted_data[:3] != self._version_prefix:
             return 0
-        if version < (3, 3):
-            hash = encrypted_data[3:19].decode("ascii")
+        if self.version < (3, 3):
+            hash = str(encrypted_data[3:19], "ascii")
             expected_hash = self.hash(encrypted_data[19:])
             if hash != expected_hash:
                 return 0
             return 19
         else:
             if command in (Message.SET_COMMAND, Message.GRATUITOUS_UPDATE):
-                _, sequence, __, ___ = struct.unpack_from(">IIIH", encrypted_data, 3)
                 return 15
         return 0
 
-    def decrypt(self, command: int, data: bytes) -> bytes:
+    def _strip_prefix(
+        self, command: int, data: bytes | memoryview
+    ) -> bytes | memoryview:
+        """Remove the version prefix and return the raw ciphertext."""
+        data = data[self.get_prefix_size_and_validate(command, data):]
+        if self.version < (3, 3):
+            data = base64.b64decode(data)
+        if len(data) % AES_BLOCK_SIZE:
+            raise ValueError(
+                "The length of the provided data is not a multiple of the block length."
+            )
+        return data
+
+    def _add_prefix(self, command: int, encrypted_data: bytes) -> bytes:
+        """Add the version prefix expected by the device to ciphertext."""
+        prefix = self._version_prefix
+        if self.version < (3, 3):
+            payload = base64.b64encode(encrypted_data)
+            prefix += self.hash(payload).encode("utf8")
+        else:
+            payload = encrypted_data
+            if command in (Message.SET_COMMAND, Message.GRATUITOUS_UPDATE):
+                prefix += b"\x00" * 12
+            else:
+                prefix = b""
+        return prefix + payload
+
+    def decrypt(self, command: int, data: bytes | memoryview) -> bytes:
         """Decrypt the encrypted data.
 
         Args:
@@ -412,20 +511,39 @@ class TuyaCipher:
 
         Returns:
             The decrypted data.
+
+        Raises:
+            ValueError: If the data is not block aligned or badly padded.
         """
-        prefix_size = self.get_prefix_size_and_validate(command, data)
-        data = data[prefix_size:]
-        decryptor = self.cipher.decryptor()
-        if self.version < (3, 3):
-            data = base64.b64decode(data)
-        decrypted_data = decryptor.update(data)
-        decrypted_data += decryptor.finalize()
-        unpadder = PKCS7(128).unpadder()
-        unpadded_data = unpadder.update(decrypted_data)
-        unpadded_data += unpadder.finalize()
+        # update() reads any buffer, so a memoryview of the frame is passed
+        # through without copying even though it is only typed for bytes
+        ciphertext = cast(bytes, self._strip_prefix(command, data))
+        return pkcs7_unpad(self._decryptor.update(ciphertext))
+
+    def decrypt_many(
+        self, command: int, payloads: Iterable[bytes | memoryview]
+    ) -> list[bytes]:
+        """Decrypt several payloads of the same command in one cipher call.
+
+        Args:
+            command: The command the payloads belong to.
+            payloads: The encrypted payloads.
 
-        # Explicitly cast to bytes to satisfy mypy
-        return bytes(unpadded_data)
+        Returns:
+            The decrypted payloads, in the same order.
+
+        Raises:
+            ValueError: If any payload is not block aligned or badly padded.
+        """
+        ciphertexts = [self._strip_prefix(command, data) for data in payloads]
+        plaintext = self._decryptor.update(b"".join(ciphertexts))
+        decrypted = []
+        offset = 0
+        for ciphertext in ciphertexts:
+            end = offset + len(ciphertext)
+            decrypted.append(pkcs7_unpad(plaintext[offset:end]))
+            offset = end
+        return decrypted
 
     def encrypt(self, command: int, data: bytes) -> bytes:
         """Encrypt the data.
@@ -439,29 +557,30 @@ class TuyaCipher:
         """
         encrypted_data = b""
         if data:
-            padder = PKCS7(128).padder()
-            padded_data = padder.update(data)
-            padded_data += padder.finalize()
-            encryptor = self.cipher.encryptor()
-            encrypted_data = encryptor.update(padded_data)
-            encrypted_data += encryptor.finalize()
-
-        prefix = ".".join(map(str, self.version)).encode("utf8")
-        if self.version < (3, 3):
-            payload = base64.b64encode(encrypted_data)
-            hash_value = self.hash(payload)
-            prefix += hash_value.encode("utf8")
-        else:
-            payload = encrypted_data
-            if command in (Message.SET_COMMAND, Message.GRATUITOUS_UPDATE):
-                prefix += b"\x00" * 12
-            else:
-                prefix = b""
+            encrypted_data = self._encryptor.update(pkcs7_pad(data))
+        return self._add_prefix(command, encrypted_data)
 
-        # Ensure we're always returning bytes
-        return prefix + payload
+    def encrypt_many(self, command: int, payloads: Iterable[bytes]) -> list[bytes]:
+        """Encrypt several payloads of the same command in one cipher call.
+
+        Args:
+            command: The command the payloads belong to.
+            payloads: The plaintext payloads.
 
-    def hash(self, data: bytes) -> str:
+        Returns:
+            The encrypted payloads, in the same order.
+        """
+        padded = [pkcs7_pad(data) if data else b"" for data in payloads]
+        ciphertext = self._encryptor.update(b"".join(padded))
+        encrypted = []
+        offset = 0
+        for block in padded:
+            end = offset + len(block)
+            encrypted.append(self._add_prefix(command, ciphertext[offset:end]))
+            offset = end
+        return encrypted
+
+    def hash(self, data: bytes | memoryview) -> str:
         """Calculate the hash of the data.
 
         Args:
@@ -472,7 +591,7 @@ class TuyaCipher:
         """
         digest = Hash(MD5(), backend=openssl_backend)
         to_hash = "data={}||lpv={}||{}".format(
-            data.decode("ascii"), ".".join(map(str, self.version)), self.key
+            str(data, "ascii"), self._version_string, self.key
         )
         digest.update(to_hash.encode("utf8"))
         intermediate = digest.finalize().hex()
@@ -480,8 +599,22 @@ class TuyaCipher:
         return str(intermediate[8:24])
 
 
-def crc(data: bytes) -> int:
-    """Calculate the Tuya-flavored CRC of some data."""
+def crc(data: bytes | bytearray | memoryview) -> int:
+    """Calculate the Tuya-flavored CRC of some data.
+
+    Tuya uses the standard reflected CRC-32 (polynomial 0xEDB88320), so this
+    is delegated to zlib's C implementation. Any bytes-like object is accepted,
+    which lets callers checksum a memoryview of a frame without copying it.
+    """
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+def crc_python(data: bytes | bytearray | memoryview) -> int:
+    """Calculate the Tuya-flavored CRC of some data in pure Python.
+
+    This is the original table-driven implementation. It is kept only as a
+    reference to verify that crc() produces bit-identical results.
+    """
     c = 0xFFFFFFFF
     for b in data:
         c = (c >> 8) ^ CRC_32_TABLE[(c ^ b) & 255]
@@ -489,12 +622,25 @@ def crc(data: bytes) -> int:
     return c ^ 0xFFFFFFFF
 
 
+_SEQUENCE = itertools.count()
+
+
 class Message:
     PING_COMMAND = 0x09
     GET_COMMAND = 0x0A
     SET_COMMAND = 0x07
     GRATUITOUS_UPDATE = 0x08
 
+    # Lower values are sent first.
+    PRIORITY_COMMAND = 0
+    PRIORITY_STATE = 1
+    PRIORITY_PING = 2
+    PRIORITIES = {
+        SET_COMMAND: PRIORITY_COMMAND,
+        GET_COMMAND: PRIORITY_STATE,
+        PING_COMMAND: PRIORITY_PING,
+    }
+
     def __init__(
         self,
         command: int,
@@ -510,19 +656,22 @@ class Message:
         self.payload = payload
         self.command = command
         self.original_sequence = sequence
+        self.encrypt = encrypt
+        self.device = device
         if sequence is None:
             self.set_sequence()
         else:
             self.sequence = sequence
-        self.encrypt = encrypt
-        self.device = device
+        self.encoded_payload: bytes | None = None
+        self.priority = self.PRIORITIES.get(command, self.PRIORITY_STATE)
         self.expiry = int(time.time()) + ttl
         self.expect_response = expect_response
-        self.listener = None
-        if expect_response is True:
-            self.listener = asyncio.Semaphore(0)
-            if device is not None:
-                device._listeners[self.sequence] = self.listener
+        self.sent: Future[None] | None = None
+        self.listener: Future[Message] | None = None
+        if expect_response is True and device is not None:
+            self.listener = device._listeners.register(
+                self.sequence, time.monotonic() + ttl + device.timeout
+            )
 
     def __repr__(self) -> str:
         """Return a string representation of the message.
@@ -541,9 +690,14 @@ class Message:
     def set_sequence(self) -> None:
         """Set the sequence number for the message.
 
-        The sequence number is a unique identifier for the message.
+        The sequence number is a unique identifier for the message. It is
+        taken from the device's counter when there is one, so responses can
+        be matched to requests even when several are created at once.
         """
-        self.sequence = int(time.perf_counter() * 1000) & 0xFFFFFFFF
+        if self.device is not None:
+            self.sequence = self.device.next_sequence()
+        else:
+            self.sequence = next(_SEQUENCE) % 0xFFFFFFFF + 1
 
     def hex(self) -> str:
         """Return the message in hex format.
@@ -553,12 +707,15 @@ class Message:
         """
         return self.to_bytes().hex()
 
-    def to_bytes(self) -> bytes:
-        """Return the message in bytes format.
+    def encode_payload(self) -> bytes:
+        """Serialise and, if required, encrypt the message payload.
 
         Returns:
-            A bytes object containing the message.
+            The payload exactly as it is placed in the frame.
         """
+        if self.encoded_payload is not None:
+            return self.encoded_payload
+
         payload_data = self.payload
         if isinstance(payload_data, dict):
             payload_data = json.dumps(payload_data, separators=(",", ":"))
@@ -568,21 +725,56 @@ class Message:
         if self.encrypt and self.device is not None:
             payload_data = self.device.cipher.encrypt(self.command, payload_data)
 
-        payload_size = len(payload_data) + struct.calcsize(MESSAGE_SUFFIX_FORMAT)
+        return payload_data
+
+    def render_into(self, buffer: bytearray, offset: int, payload_data: bytes) -> int:
+        """Write the complete frame into a preallocated buffer.
 
-        header = struct.pack(
-            MESSAGE_PREFIX_FORMAT,
+        Args:
+            buffer: The buffer to write into. It must have room for
+                FRAME_OVERHEAD + len(payload_data) bytes from offset.
+            offset: The position in the buffer the frame starts at.
+            payload_data: The encoded payload, as returned by encode_payload().
+
+        Returns:
+            The offset just past the end of the frame.
+        """
+        payload_start = offset + MESSAGE_PREFIX_STRUCT.size
+        payload_end = payload_start + len(payload_data)
+        MESSAGE_PREFIX_STRUCT.pack_into(
+            buffer,
+            offset,
             MAGIC_PREFIX,
             self.sequence,
             self.command,
-            payload_size,
+            len(payload_data) + MESSAGE_SUFFIX_STRUCT.size,
         )
-        if self.device and self.device.version >= (3, 3):
-            checksum = crc(header + payload_data)
-        else:
-            checksum = crc(payload_data)
-        footer = struct.pack(MESSAGE_SUFFIX_FORMAT, checksum, MAGIC_SUFFIX)
-        return header + payload_data + footer
+        buffer[payload_start:payload_end] = payload_data
+
+        with memoryview(buffer) as view:
+            if self.device and self.device.version >= (3, 3):
+                checksum = crc(view[offset:payload_end])
+            else:
+                checksum = crc(view[payload_start:payload_end])
+
+        MESSAGE_SUFFIX_STRUCT.pack_into(buffer, payload_end, checksum, MAGIC_SUFFIX)
+        return payload_end + MESSAGE_SUFFIX_STRUCT.size
+
+    def to_frame(self) -> bytearray:
+        """Return the message as a frame in a single newly allocated buffer.
+
+        Returns:
+            A bytearray containing the message.
+        """
+        return build_frames((self,))
+
+    def to_bytes(self) -> bytes:
+        """Return the message in bytes format.
+
+        Returns:
+            A bytes object containing the message.
+        """
+        return bytes(self.to_frame())
 
     def __bytes__(self) -> bytes:
         """Convert the message to bytes.
@@ -607,12 +799,15 @@ class Message:
     def from_bytes(
         cls,
         device: "TuyaDevice",
-        data: bytes,
+        data: bytes | bytearray | memoryview,
         cipher: Optional[TuyaCipher] = None
     ) -> "Message":
         """Create a message from bytes.
 
         This method creates a message from bytes received from the device.
+        The frame is only read through memoryview slices. Encrypted payloads
+        are still copied twice, once by the decryptor and once more when the
+        padding is stripped.
 
         Args:
             device: The device the message is from.
@@ -622,58 +817,46 @@ class Message:
         Returns:
             A Message object created from the bytes.
         """
+        if data is None:
+            raise InvalidMessage("Data cannot be None")
+
+        view = memoryview(data)
         try:
-            prefix, sequence, command, payload_size = struct.unpack_from(
-                MESSAGE_PREFIX_FORMAT, data
+            prefix, sequence, command, payload_size = (
+                MESSAGE_PREFIX_STRUCT.unpack_from(view)
             )
         except struct.error as e:
             raise InvalidMessage("Invalid message header format.") from e
         if prefix != MAGIC_PREFIX:
             raise InvalidMessage("Magic prefix missing from message.")
+        if payload_size < MESSAGE_SUFFIX_STRUCT.size:
+            raise InvalidMessage("Invalid message payload size.")
+
+        header_size = MESSAGE_PREFIX_STRUCT.size
+        payload_end = header_size + payload_size - MESSAGE_SUFFIX_STRUCT.size
 
         # check for an optional return code
-        header_size = struct.calcsize(MESSAGE_PREFIX_FORMAT)
         try:
-            (return_code,) = struct.unpack_from(">I", data, header_size)
+            (return_code,) = RETURN_CODE_STRUCT.unpack_from(view, header_size)
         except struct.error as e:
             raise InvalidMessage("Unable to unpack return code.") from e
         if return_code >> 8:
-            payload_data = data[
-                header_size:header_size
-                + payload_size
-                - struct.calcsize(MESSAGE_SUFFIX_FORMAT)
-            ]
-            return_code = None
+            payload_start = header_size
         else:
-            payload_data = data[
-                header_size
-                + struct.calcsize(">I"):header_size
-                + payload_size
-                - struct.calcsize(MESSAGE_SUFFIX_FORMAT)
-            ]
+            payload_start = header_size + RETURN_CODE_STRUCT.size
 
         try:
-            expected_crc, suffix = struct.unpack_from(
-                MESSAGE_SUFFIX_FORMAT,
-                data,
-                header_size + payload_size - struct.calcsize(MESSAGE_SUFFIX_FORMAT),
-            )
+            expected_crc, suffix = MESSAGE_SUFFIX_STRUCT.unpack_from(view, payload_end)
         except struct.error as e:
             raise InvalidMessage("Invalid message suffix format.") from e
         if suffix != MAGIC_SUFFIX:
             raise InvalidMessage("Magic suffix missing from message")
 
-        # Ensure data is not None before indexing
-        if data is None:
-            raise InvalidMessage("Data cannot be None")
-
-        actual_crc = crc(
-            data[: header_size + payload_size - struct.calcsize(MESSAGE_SUFFIX_FORMAT)]
-        )
-        if expected_crc != actual_crc:
+        if expected_crc != crc(view[:payload_end]):
             raise InvalidMessage("CRC check failed")
 
         payload = None
+        payload_data: bytes | memoryview = view[payload_start:payload_end]
         if payload_data:
             try:
                 if cipher is not None:
@@ -681,7 +864,7 @@ class Message:
             except ValueError:
                 pass
             try:
-                payload_text = payload_data.decode("utf8")
+                payload_text = str(payload_data, "utf8")
             except UnicodeDecodeError as e:
                 device._LOGGER.debug(payload_data.hex())
                 device._LOGGER.error(e)
@@ -697,6 +880,596 @@ class Message:
         return cls(command, payload, sequence)
 
 
+class PendingResponses:
+    """Correlation table of requests waiting for a response.
+
+    Each request registers a future under its sequence number together with a
+    deadline. Responses resolve the matching future, and waiters whose
+    deadline has passed are failed with ResponseTimeoutException by sweep(),
+    so entries can never accumulate.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self._waiters: dict[int, tuple[float, Future[Message]]] = {}
+        self._deadlines: list[tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        """Return the number of requests waiting for a response."""
+        return len(self._waiters)
+
+    def __contains__(self, sequence: object) -> bool:
+        """Return whether a request with this sequence number is waiting."""
+        return sequence in self._waiters
+
+    def register(self, sequence: int, deadline: float) -> Future[Message]:
+        """Register a request and return the future its response resolves.
+
+        Args:
+            sequence: The sequence number of the request.
+            deadline: The time.monotonic() value after which to give up.
+
+        Returns:
+            A future resolved with the response Message.
+        """
+        self.sweep()
+        previous = self._waiters.get(sequence)
+        if previous is not None:
+            previous[1].cancel()
+        future: Future[Message] = asyncio.get_running_loop().create_future()
+        self._waiters[sequence] = (deadline, future)
+        heapq.heappush(self._deadlines, (deadline, sequence))
+        return future
+
+    def resolve(self, sequence: int, message: "Message") -> bool:
+        """Resolve the request waiting on a sequence number.
+
+        Args:
+            sequence: The sequence number of the response.
+            message: The response.
+
+        Returns:
+            True if a request was waiting for this response.
+        """
+        entry = self._waiters.pop(sequence, None)
+        if entry is None:
+            return False
+        if not entry[1].done():
+            entry[1].set_result(message)
+        return True
+
+    def discard(self, sequence: int) -> None:
+        """Stop waiting for a response to a sequence number.
+
+        Anyone else still awaiting the response gets a
+        ResponseTimeoutException.
+        """
+        entry = self._waiters.pop(sequence, None)
+        if entry is not None:
+            _fail_future(
+                entry[1],
+                ResponseTimeoutException(
+                    "No longer waiting for sequence number {}".format(sequence)
+                ),
+            )
+
+    def sweep(self, now: float | None = None) -> int:
+        """Fail every request whose deadline has passed.
+
+        Args:
+            now: The current time.monotonic() value.
+
+        Returns:
+            The number of requests that expired.
+        """
+        if now is None:
+            now = time.monotonic()
+        expired = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, sequence = heapq.heappop(self._deadlines)
+            entry = self._waiters.get(sequence)
+            # Skip heap entries of requests already answered or re-registered.
+            if entry is None or entry[0] != deadline:
+                continue
+            del self._waiters[sequence]
+            _fail_future(
+                entry[1],
+                ResponseTimeoutException(
+                    "Timed out waiting for response to sequence number {}".format(
+                        sequence
+                    )
+                ),
+            )
+            expired += 1
+        return expired
+
+    def fail_all(self, exception: Exception) -> None:
+        """Fail every waiting request, e.g. when the device is disabled."""
+        for _, future in self._waiters.values():
+            _fail_future(future, exception)
+        self._waiters.clear()
+        self._deadlines.clear()
+
+
+class LatencyHistogram:
+    """Counts of latencies in fixed buckets."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, bounds: Iterable[float] = BUCKETS) -> None:
+        """Initialize an empty histogram.
+
+        Args:
+            bounds: The upper bound of each bucket in seconds, in ascending
+                order. Larger latencies are counted in a final unbounded
+                bucket.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, latency: float) -> None:
+        """Record a latency in seconds."""
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Get the mean latency in seconds, or None if nothing was recorded."""
+        return self.total / self.count if self.count else None
+
+    @property
+    def buckets(self) -> list[tuple[float, int]]:
+        """Get each bucket's upper bound and count, ending with infinity."""
+        return list(zip(self.bounds + (float("inf"),), self.counts))
+
+
+def _resolve_future(future: Future[None]) -> None:
+    """Resolve a future unless it is already done."""
+    if not future.done():
+        future.set_result(None)
+
+
+def _chain_future(source: Future[None], destination: Future[None]) -> None:
+    """Complete one future with the outcome of another once it is done."""
+    def copy_outcome(_: Future[None]) -> None:
+        if destination.done():
+            return
+        if source.cancelled():
+            destination.cancel()
+            return
+        exception = source.exception()
+        if exception is None:
+            destination.set_result(None)
+        elif isinstance(exception, Exception):
+            _fail_future(destination, exception)
+        else:
+            destination.set_exception(exception)
+
+    source.add_done_callback(copy_outcome)
+
+
+def _fail_future(future: Future[Any] | None, exception: Exception) -> None:
+    """Fail a future without logging an error if nobody awaits it."""
+    if future is not None and not future.done():
+        future.set_exception(exception)
+        # Mark the exception as retrieved; awaiters still receive it.
+        future.exception()
+
+
+class OverflowPolicy(StrEnum):
+    """What a full MessageQueue does with a new message."""
+
+    # Drop the oldest queued message that is no more important than the new one.
+    DROP_OLDEST = "drop_oldest"
+    # Drop a queued message of the same kind, e.g. a SET of the same DPS.
+    DROP_DUPLICATE_KIND = "drop_duplicate_kind"
+    # Refuse the new message.
+    REJECT_NEW = "reject_new"
+
+
+@dataclass(order=True, slots=True)
+class _QueueEntry:
+    """A message in the queue's heap, ordered by priority, expiry, then age.
+
+    The message is set to None when the entry is removed, and the entry is
+    dropped when it reaches the top of the heap.
+    """
+
+    priority: int
+    expiry: int
+    order: int
+    message: Optional[Message] = field(compare=False)
+    timer: Optional[TimerHandle] = field(default=None, compare=False)
+
+
+class MessageQueue:
+    """Outgoing messages ordered by priority, then by deadline.
+
+    Commands are sent before state requests, and state requests before pings.
+    Expired messages are discarded lazily when they reach the front of the
+    queue. A ping or GET queued while an identical one is still pending is
+    collapsed into the pending one.
+
+    Every queued message gets a future in Message.sent. It resolves when the
+    message is sent, or fails if sending fails or the message expires.
+
+    With a scheduler, each message also gets a timer that fails it as soon as
+    it expires, instead of when it reaches the front of the queue.
+
+    With max_depth, expired messages are purged once the queue is full, and
+    if it is still full the overflow policy decides which message gives way.
+    A dropped message fails with QueueFullException; under REJECT_NEW, or if
+    no queued message can be dropped, push raises it instead.
+    """
+
+    COLLAPSIBLE_COMMANDS = (Message.PING_COMMAND, Message.GET_COMMAND)
+
+    def __init__(
+        self,
+        scheduler: Optional[TimingWheel] = None,
+        max_depth: Optional[int] = None,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> None:
+        """Initialize an empty queue.
+
+        Args:
+            scheduler: Optional timing wheel used to expire messages on time.
+            max_depth: The most messages that can be queued, or None for no
+                limit.
+            overflow_policy: What to do with a new message when the queue is
+                full.
+        """
+        self._scheduler = scheduler
+        self.max_depth = max_depth
+        self.overflow_policy = overflow_policy
+        self._heap: list[_QueueEntry] = []
+        self._collapsible: dict[int, _QueueEntry] = {}
+        self._counter = itertools.count()
+        self._size = 0
+        self.high_water = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        """Return the number of messages waiting to be sent."""
+        return self._size
+
+    @property
+    def metrics(self) -> dict[str, int]:
+        """Get the current depth, high-water mark and overflow counts."""
+        return {
+            "depth": self._size,
+            "high_water": self.high_water,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+    def push(self, message: Message) -> Message:
+        """Queue a message.
+
+        Args:
+            message: The message to queue.
+
+        Returns:
+            The message that will be sent: either the one given, or a pending
+            identical ping or GET it was collapsed into.
+
+        Raises:
+            QueueFullException: The queue is full and the message was not
+                accepted.
+        """
+        if message.command in self.COLLAPSIBLE_COMMANDS:
+            pending = self._collapsible.get(message.command)
+            if pending is not None and pending.message is not None:
+                if pending.message.expiry > int(time.time()):
+                    return pending.message
+                self._expire(pending)
+
+        if self.max_depth is not None and self._size >= self.max_depth:
+            self._make_room(message)
+
+        message.sent = asyncio.get_running_loop().create_future()
+        entry = _QueueEntry(
+            message.priority, message.expiry, next(self._counter), message
+        )
+        if self._scheduler is not None:
+            entry.timer = self._scheduler.call_later(
+                message.expiry - time.time(), self._on_expired, entry
+            )
+        heapq.heappush(self._heap, entry)
+        if message.command in self.COLLAPSIBLE_COMMANDS:
+            self._collapsible[message.command] = entry
+        self._size += 1
+        self.high_water = max(self.high_water, self._size)
+        return message
+
+    def _make_room(self, message: Message) -> None:
+        """Free a place in a full queue for a message, or refuse it."""
+        if self.purge_expired():
+            return
+
+        live = [
+            (entry, entry.message) for entry in self._heap if entry.message is not None
+        ]
+        if self.overflow_policy is OverflowPolicy.DROP_OLDEST:
+            candidates = [
+                (entry, queued) for entry, queued in live
+                if entry.priority >= message.priority
+            ]
+        elif self.overflow_policy is OverflowPolicy.DROP_DUPLICATE_KIND:
+            kind = _message_kind(message)
+            candidates = [
+                (entry, queued) for entry, queued in live
+                if _message_kind(queued) == kind
+            ]
+        else:
+            candidates = []
+        victim = min(candidates, key=lambda candidate: candidate[0].order, default=None)
+
+        if victim is None:
+            self.rejected += 1
+            raise QueueFullException(
+                "Queue is full, {!r} was not queued".format(message)
+            )
+
+        entry, dropped = victim
+        self._remove(entry)
+        self.dropped += 1
+        _fail_future(
+            dropped.sent,
+            QueueFullException(
+                "{!r} was dropped to make room for {!r}".format(dropped, message)
+            ),
+        )
+
+    def peek(self) -> Message | None:
+        """Return the next message to send without removing it.
+
+        Returns:
+            The message, or None if no unexpired message is queued.
+        """
+        now = int(time.time())
+        while self._heap:
+            entry = self._heap[0]
+            message = entry.message
+            if message is None:
+                heapq.heappop(self._heap)
+            elif message.expiry <= now:
+                heapq.heappop(self._heap)
+                self._expire(entry)
+            else:
+                return message
+        return None
+
+    def pop(self) -> Message | None:
+        """Remove and return the next message to send.
+
+        Returns:
+            The message, or None if no unexpired message is queued.
+        """
+        message = self.peek()
+        if message is not None:
+            self._remove(heapq.heappop(self._heap))
+        return message
+
+    def purge_expired(self) -> int:
+        """Remove every expired message now rather than when it is reached.
+
+        Returns:
+            The number of messages removed.
+        """
+        now = int(time.time())
+        expired = [
+            entry for entry in self._heap
+            if entry.message is not None and entry.message.expiry <= now
+        ]
+        for entry in expired:
+            self._expire(entry)
+        self._heap = [entry for entry in self._heap if entry.message is not None]
+        heapq.heapify(self._heap)
+        return len(expired)
+
+    def clear(self, exception: Exception) -> None:
+        """Remove every message, failing their futures with an exception."""
+        for entry in self._heap:
+            if entry.message is not None:
+                if entry.timer is not None:
+                    entry.timer.cancel()
+                _fail_future(entry.message.sent, exception)
+        self._heap.clear()
+        self._collapsible.clear()
+        self._size = 0
+
+    def _remove(self, entry: _QueueEntry) -> None:
+        """Mark a heap entry as removed."""
+        message = entry.message
+        if message is None:
+            return
+        entry.message = None
+        if entry.timer is not None:
+            entry.timer.cancel()
+            entry.timer = None
+        self._size -= 1
+        if self._collapsible.get(message.command) is entry:
+            del self._collapsible[message.command]
+
+    def _on_expired(self, entry: _QueueEntry) -> None:
+        """Expire a message whose timer fired while it was still queued."""
+        if entry.message is not None:
+            self._expire(entry)
+
+    def _expire(self, entry: _QueueEntry) -> None:
+        """Remove a heap entry and fail its message as expired."""
+        message = entry.message
+        if message is None:
+            return
+        self._remove(entry)
+        _fail_future(
+            message.sent,
+            MessageExpiredException("{!r} expired before it was sent".format(message)),
+        )
+
+
+def _message_kind(message: Message) -> tuple[Any, ...]:
+    """Describe what a message does, so queued duplicates can be found.
+
+    A SET's kind is the set of DPS it writes; any other message's kind is just
+    its command.
+    """
+    if message.command != Message.SET_COMMAND:
+        return (message.command,)
+
+    payload = message.payload
+    try:
+        if isinstance(payload, (bytes, str)):
+            payload = json.loads(payload)
+        dps = payload["dps"]
+    except (ValueError, TypeError, KeyError):
+        return (message.command,)
+    return (message.command, frozenset(str(code) for code in dps))
+
+
+def build_frames(messages: Iterable[Message]) -> bytearray:
+    """Render several messages back to back into one buffer.
+
+    The total size is computed up front so the frames are written into a
+    single allocation, ready for one writer.write() call.
+
+    Args:
+        messages: The messages to render, in sending order.
+
+    Returns:
+        A bytearray containing every frame.
+    """
+    encoded = [(message, message.encode_payload()) for message in messages]
+    buffer = bytearray(
+        sum(FRAME_OVERHEAD + len(payload_data) for _, payload_data in encoded)
+    )
+    offset = 0
+    for message, payload_data in encoded:
+        offset = message.render_into(buffer, offset, payload_data)
+    return buffer
+
+
+class FrameDecoder:
+    """Incremental, I/O-free splitter for a stream of Tuya frames.
+
+    Bytes are appended with feed() and complete frames are pulled out by
+    iterating over the decoder. Frames are located from the length in their
+    16-byte header rather than by scanning for the magic suffix, so payloads
+    that happen to contain the suffix bytes are not split. When a header or
+    suffix is corrupt the decoder skips ahead to the next magic prefix.
+
+    Frames are returned as memoryview slices of the internal buffer and are
+    only guaranteed to be valid until the next call to feed().
+    """
+
+    HEADER_SIZE = MESSAGE_PREFIX_STRUCT.size
+    SUFFIX_SIZE = MESSAGE_SUFFIX_STRUCT.size
+
+    def __init__(self) -> None:
+        """Initialize the decoder with an empty buffer."""
+        self._buffer = bytearray()
+        self._offset = 0
+        self.discarded = 0
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """Iterate over the complete frames currently buffered."""
+        return self
+
+    def __next__(self) -> memoryview:
+        """Return the next complete frame."""
+        frame = self.next_frame()
+        if frame is None:
+            raise StopIteration
+        return frame
+
+    def __len__(self) -> int:
+        """Return the number of buffered bytes not yet returned as frames."""
+        return len(self._buffer) - self._offset
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        """Append received bytes to the buffer.
+
+        Args:
+            data: The bytes read from the connection.
+        """
+        if self._offset:
+            # Rebinding rather than resizing in place keeps any views of
+            # previously returned frames valid.
+            self._buffer = self._buffer[self._offset:]
+            self._offset = 0
+        self._buffer += data
+
+    def reset(self) -> None:
+        """Discard all buffered data, e.g. after a reconnect."""
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def next_frame(self) -> memoryview | None:
+        """Return the next complete frame, or None if more data is needed.
+
+        Returns:
+            A memoryview over the complete frame, header and suffix included.
+        """
+        buffer = self._buffer
+        while len(buffer) - self._offset >= self.HEADER_SIZE:
+            prefix, _, __, payload_size = MESSAGE_PREFIX_STRUCT.unpack_from(
+                buffer, self._offset
+            )
+            if prefix != MAGIC_PREFIX or not (
+                self.SUFFIX_SIZE <= payload_size <= MAX_PAYLOAD_SIZE
+            ):
+                self._resync()
+                continue
+
+            end = self._offset + self.HEADER_SIZE + payload_size
+            if len(buffer) < end:
+                return None
+
+            if buffer[end - len(MAGIC_SUFFIX_BYTES):end] != MAGIC_SUFFIX_BYTES:
+                self._resync()
+                continue
+
+            frame = memoryview(buffer)[self._offset:end]
+            self._offset = end
+            return frame
+
+        return None
+
+    def _resync(self) -> None:
+        """Skip to the next magic prefix after a corrupt frame."""
+        start = self._offset + 1
+        index = self._buffer.find(MAGIC_PREFIX_BYTES, start)
+        if index == -1:
+            # Keep a possible partial prefix at the end of the buffer.
+            index = max(start, len(self._buffer) - len(MAGIC_PREFIX_BYTES) + 1)
+        self.discarded += index - self._offset
+        self._offset = index
+
+
+def _configure_socket(sock: socket.socket) -> None:
+    """Disable Nagle's algorithm and enable TCP keepalive on a device socket.
+
+    Frames are small and latency sensitive, so they should not be held back
+    waiting for more data. Keepalive probes detect a vacuum that dropped off
+    the network while the connection was idle.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # The tuning options are not available on every platform.
+    for option, value in (
+        ("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+        ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+        ("TCP_KEEPCNT", KEEPALIVE_COUNT),
+    ):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
 class TuyaDevice:
     """Represents a generic Tuya device."""
 
@@ -712,8 +1485,39 @@ class TuyaDevice:
         port: int = 6668,
         gateway_id: Optional[str] = None,
         version: tuple[int, int] = (3, 3),
+        scheduler: Optional[TimingWheel] = None,
+        poll_interval: Optional[float] = None,
+        max_ping_interval: Optional[float] = None,
+        write_coalesce_window: float = 0.0,
+        max_batch_frames: int = MAX_BATCH_FRAMES,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        max_queue_depth: Optional[int] = MAX_QUEUE_DEPTH,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
     ) -> None:
-        """Initialize the device."""
+        """Initialize the device.
+
+        The device is pinged once the connection has been idle for
+        ping_interval seconds. While pings keep being answered the idle period
+        grows towards max_ping_interval (by default MAX_PING_INTERVAL_FACTOR
+        times ping_interval), and it drops back to ping_interval when one is
+        not.
+
+        Writes made within write_coalesce_window seconds of each other are
+        sent as a single command. With the default of 0, only writes made
+        without yielding to the event loop in between are merged.
+
+        Messages that are ready at the same time are written back to back in
+        a single write, up to max_batch_frames frames or max_batch_bytes
+        bytes.
+
+        At most max_queue_depth messages wait to be sent. Once that many are
+        queued, overflow_policy decides whether a queued message is dropped
+        or the new one is rejected with QueueFullException.
+
+        If a scheduler is given, the device's pings, backoff delays, message
+        expiry and polling (if poll_interval is set) run on its timers
+        rather than on per-device sleeps.
+        """
         self._LOGGER = _LOGGER.getChild(device_id)
         self.model_details = model_details
         self.device_id = device_id
@@ -726,33 +1530,90 @@ class TuyaDevice:
         self.timeout = timeout
         self.last_pong: float = 0.0
         self.ping_interval = ping_interval
+        if max_ping_interval is None:
+            max_ping_interval = ping_interval * MAX_PING_INTERVAL_FACTOR
+        self.max_ping_interval = max(max_ping_interval, ping_interval)
+        self.keepalive_interval = ping_interval
+        self.last_received = 0.0
+        self.pings_sent = 0
+        self._ping_sent_at: Optional[float] = None
+        self.poll_interval = poll_interval
+        self.write_coalesce_window = write_coalesce_window
+        self.max_batch_frames = max_batch_frames
+        self.max_batch_bytes = max_batch_bytes
         self.update_entity_state_cb = update_entity_state
+        self._scheduler = scheduler
+        self._ping_timer: Optional[TimerHandle] = None
+        self._poll_timer: Optional[TimerHandle] = None
 
-        if local_key is None:
-            raise InvalidKey("Local key cannot be None")
-
-        if len(local_key) != 16:
-            raise InvalidKey("Local key should be a 16-character string")
-
-        self.cipher = TuyaCipher(local_key, self.version)
+        self._payload_cache: dict[int, bytes] = {}
+        self.set_local_key(local_key)
+        self.reader: Optional[StreamReader] = None
         self.writer: Optional[StreamWriter] = None
-        self._response_task: Optional[asyncio.Task[Any]] = None
-        self._recieve_task: Optional[asyncio.Task[Any]] = None
+        self._decoder = FrameDecoder()
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._read_task: Optional[asyncio.Task[Any]] = None
         self._ping_task: Optional[asyncio.Task[Any]] = None
         self._handlers: dict[int, Callable[[Message], Coroutine]] = {
             Message.GRATUITOUS_UPDATE: self.async_gratuitous_update_state,
             Message.PING_COMMAND: self._async_pong_received,
         }
-        self._dps: dict[str, Any] = {}
+        self._dps = DpsStore()
         self._connected = False
         self._enabled = True
-        self._queue: list[Message] = []
-        self._listeners: dict[int, Union[Message, Exception, Semaphore]] = {}
+        self._queue = MessageQueue(scheduler, max_queue_depth, overflow_policy)
+        self._queue_event = asyncio.Event()
+        self.queue_wakeups = 0
+        self._listeners = PendingResponses()
+        self._sequence = 0
         self._backoff = False
         self._queue_interval = INITIAL_QUEUE_TIME
         self._failures = 0
+        self._connect_task: Optional[asyncio.Task[None]] = None
+        self._get_task: Optional[asyncio.Task[None]] = None
+        self._pending_writes: Optional[dict[str, Any]] = None
+        self._pending_writes_sent: Optional[Future[None]] = None
+        self._write_timer: Optional[TimerHandle | asyncio.TimerHandle] = None
+        self.last_state_at: Optional[float] = None
+        self.connect_latency: Optional[float] = None
+        # Acknowledged writes, with when they were made and the values they
+        # are still waiting to see echoed.
+        self._pending_acks: dict[Future[None], tuple[float, dict[str, Any]]] = {}
+        self.ack_latency = LatencyHistogram()
+
+        self._queue_task = self._start_task(self.process_queue(), "queue")
 
-        asyncio.create_task(self.process_queue())
+    @property
+    def live_tasks(self) -> int:
+        """Get the number of background tasks currently running for the device."""
+        return sum(1 for task in self._tasks if not task.done())
+
+    @property
+    def queue_metrics(self) -> dict[str, int]:
+        """Get the send queue's depth, high-water mark and overflow counts."""
+        return self._queue.metrics
+
+    def _start_task(
+        self, coro: Coroutine[Any, Any, Any], name: str, log_errors: bool = True
+    ) -> asyncio.Task[Any]:
+        """Start a supervised background task.
+
+        The device keeps a reference to the task until it finishes, and logs
+        it if it fails. Tasks whose failures are raised to the callers that
+        await them pass log_errors=False so they are not reported twice.
+        """
+        task = asyncio.create_task(coro, name="{} {}".format(self.device_id, name))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done if log_errors else self._tasks.discard)
+        return task
+
+    def _task_done(self, task: asyncio.Task[Any]) -> None:
+        """Forget a finished background task and log any failure."""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._LOGGER.error(
+                "Task {} failed".format(task.get_name()), exc_info=task.exception()
+            )
 
     def __repr__(self) -> str:
         """Return a string representation of the device.
@@ -776,27 +1637,121 @@ class TuyaDevice:
         """
         return "{} ({}:{})".format(self.device_id, self.host, self.port)
 
+    def set_local_key(
+        self, local_key: Optional[str], version: Optional[tuple[int, int]] = None
+    ) -> None:
+        """Set the local key, and optionally the protocol version.
+
+        Any cached encoded payloads are dropped, as they were encrypted with
+        the previous key or for the previous protocol version.
+
+        Args:
+            local_key: The 16-character local key of the device.
+            version: The protocol version, if it has changed.
+
+        Raises:
+            InvalidKey: If the local key is missing or has the wrong length.
+        """
+        if local_key is None:
+            raise InvalidKey("Local key cannot be None")
+
+        if len(local_key) != 16:
+            raise InvalidKey("Local key should be a 16-character string")
+
+        if version is not None:
+            self.version = version
+        self.cipher = TuyaCipher(local_key, self.version)
+        self._payload_cache.clear()
+
+    def next_sequence(self) -> int:
+        """Return the next request sequence number.
+
+        The counter wraps at 32 bits and skips 0, which is used by pings.
+        """
+        self._sequence = self._sequence % 0xFFFFFFFF + 1
+        return self._sequence
+
+    @property
+    def pending_responses(self) -> int:
+        """Return the number of requests waiting for a response."""
+        return len(self._listeners)
+
+    def _constant_message(
+        self, command: int, payload: bytes | None, **kwargs: Any
+    ) -> Message:
+        """Create a message whose encoded payload never changes.
+
+        Pings and status requests are byte-identical every time for a given
+        key and protocol version, so their payload is serialised and encrypted
+        once and reused. Only the header sequence and CRC differ per frame.
+
+        Args:
+            command: The command of the message.
+            payload: The plaintext payload of the message.
+            **kwargs: Additional arguments for the Message.
+
+        Returns:
+            The message, with its encoded payload filled in from the cache.
+        """
+        encrypt = False if self.version < (3, 3) else True
+        message = Message(command, payload, encrypt=encrypt, device=self, **kwargs)
+        encoded_payload = self._payload_cache.get(command)
+        if encoded_payload is None:
+            encoded_payload = message.encode_payload()
+            self._payload_cache[command] = encoded_payload
+        message.encoded_payload = encoded_payload
+        return message
+
+    def _enqueue(self, message: Message) -> Message:
+        """Add a message to the send queue and wake the queue consumer.
+
+        Returns:
+            The message that will be sent, which may be an identical pending
+            message this one was collapsed into.
+
+        Raises:
+            QueueFullException: The queue is full and the message was not
+                accepted.
+        """
+        try:
+            queued = self._queue.push(message)
+        except QueueFullException:
+            self._listeners.discard(message.sequence)
+            raise
+        if queued is not message:
+            self._listeners.discard(message.sequence)
+        self._queue_event.set()
+        return queued
+
     async def process_queue(self) -> None:
         """Process the queue of messages.
 
-        This method processes the queue of messages and sends them to the device.
+        This is a single long-lived consumer that sends queued messages to the
+        device. It sleeps until a message is queued and only uses a timer to
+        wait out the delay after a failed send.
         """
-        if self._enabled is False:
-            return
+        while self._enabled:
+            batch = self._next_batch()
+            if not batch:
+                self._queue_event.clear()
+                await self._queue_event.wait()
+                self.queue_wakeups += 1
+                continue
 
-        self.clean_queue()
-
-        if len(self._queue) > 0:
             self._LOGGER.debug(
-                "Processing queue. Current length: {}".format(len(self._queue))
+                "Processing queue. Sending {}, {} left".format(len(batch), len(self._queue))
             )
             try:
-                message = self._queue.pop(0)
-                await message.async_send()
+                await self._async_send_many(batch)
+                for message in batch:
+                    if message.sent is not None:
+                        _resolve_future(message.sent)
                 self._failures = 0
                 self._queue_interval = INITIAL_QUEUE_TIME
                 self._backoff = False
             except Exception as e:
+                for message in batch:
+                    _fail_future(message.sent, e)
                 self._failures += 1
                 self._LOGGER.debug(
                     "{} failures. Most recent: {}".format(self._failures, e)
@@ -807,26 +1762,51 @@ class TuyaDevice:
                         INITIAL_BACKOFF * (BACKOFF_MULTIPLIER ** (self._failures - 4)),
                         600,
                     )
-                    self._LOGGER.warn(
+                    self._LOGGER.warning(
                         "{} failures, backing off for {} seconds".format(
                             self._failures, self._queue_interval
                         )
                     )
+                await self._async_sleep(self._queue_interval)
+                self.queue_wakeups += 1
 
-        await asyncio.sleep(self._queue_interval)
-        asyncio.create_task(self.process_queue())
-
-    def clean_queue(self) -> None:
-        """Clean the queue of messages.
+    def _next_batch(self) -> list[Message]:
+        """Take the messages to send in the next write from the queue.
 
-        This method removes expired messages from the queue.
+        Returns:
+            Up to max_batch_frames messages in sending order, totalling at
+            most max_batch_bytes once framed. A single message larger than
+            the byte budget is still returned on its own.
         """
-        cleaned_queue = []
-        now = int(time.time())
-        for item in self._queue:
-            if item.expiry > now:
-                cleaned_queue.append(item)
-        self._queue = cleaned_queue
+        batch: list[Message] = []
+        size = 0
+        while len(batch) < self.max_batch_frames:
+            message = self._queue.peek()
+            if message is None:
+                break
+            # Encode once here so the size is known and retries reuse it.
+            if message.encoded_payload is None:
+                message.encoded_payload = message.encode_payload()
+            frame_size = FRAME_OVERHEAD + len(message.encoded_payload)
+            if batch and size + frame_size > self.max_batch_bytes:
+                break
+            self._queue.pop()
+            batch.append(message)
+            size += frame_size
+        return batch
+
+    async def _async_sleep(self, delay: float) -> None:
+        """Sleep, using the shared scheduler if the device has one."""
+        if self._scheduler is None:
+            await asyncio.sleep(delay)
+            return
+
+        waiter: Future[None] = asyncio.get_running_loop().create_future()
+        timer = self._scheduler.call_later(delay, _resolve_future, waiter)
+        try:
+            await waiter
+        finally:
+            timer.cancel()
 
     async def async_connect(self) -> None:
         """Connect to the device.
@@ -836,23 +1816,69 @@ class TuyaDevice:
         if self._connected is True or self._enabled is False:
             return
 
-        sock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
-        sock.settimeout(self.timeout)
+        # Concurrent callers share a single connection attempt.
+        if self._connect_task is None:
+            self._connect_task = self._start_task(
+                self._async_open_connection(), "connect", log_errors=False
+            )
+            self._connect_task.add_done_callback(self._connect_task_done)
+        await asyncio.shield(self._connect_task)
+
+    def _connect_task_done(self, task: asyncio.Task[None]) -> None:
+        """Forget a finished connection attempt."""
+        if self._connect_task is task:
+            self._connect_task = None
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller gave up.
+            task.exception()
+
+    async def _async_open_connection(self) -> None:
+        """Open the connection to the device without blocking the event loop."""
         self._LOGGER.debug("Connecting to {}".format(self))
+        started = time.monotonic()
         try:
-            sock.connect((self.host, self.port))
-        except (socket.timeout, TimeoutError):
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self.timeout
+            )
+        except TimeoutError:
             self._dps[self.model_details.commands[RobovacCommand.ERROR]] = ("CONNECTION_FAILED")
             raise ConnectionTimeoutException("Connection timed out")
-        loop = asyncio.get_running_loop()
-        loop.create_connection
-        self.reader, self.writer = await asyncio.open_connection(sock=sock)
-        self._connected = True
+        except OSError as e:
+            raise ConnectionFailedException(
+                "Connection to {} failed: {}".format(self, e)
+            ) from e
+        self.connect_latency = time.monotonic() - started
+        self._LOGGER.debug(
+            "Connected to {} in {:.3f}s".format(self, self.connect_latency)
+        )
+
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            _configure_socket(sock)
+
+        if self._enabled is False:
+            writer.close()
+            return
 
-        if self._ping_task is None:
-            self._ping_task = asyncio.create_task(self.async_ping(self.ping_interval))
+        self.reader, self.writer = reader, writer
+        self._decoder.reset()
+        self._connected = True
+        self.last_received = time.monotonic()
+        self._ping_sent_at = None
+
+        if self._scheduler is not None:
+            if self._ping_timer is None:
+                self._on_ping_due()
+            if self._poll_timer is None and self.poll_interval is not None:
+                self._poll_timer = self._scheduler.call_later(
+                    self.poll_interval, self._on_poll_due
+                )
+        elif self._ping_task is None:
+            self._ping_task = self._start_task(
+                self.async_ping(self.ping_interval), "ping"
+            )
 
-        asyncio.create_task(self._async_handle_message())
+        self._read_task = self._start_task(self._async_handle_message(), "reader")
 
     async def async_disable(self) -> None:
         """Disable the device.
@@ -860,9 +1886,25 @@ class TuyaDevice:
         This method disables the device.
         """
         self._enabled = False
+        for task in (self._connect_task, self._get_task):
+            if task is not None:
+                task.cancel()
+        for timer in (self._ping_timer, self._poll_timer, self._write_timer):
+            if timer is not None:
+                timer.cancel()
+        _fail_future(
+            self._pending_writes_sent, TuyaException("{} was disabled".format(self))
+        )
+        self._queue.clear(TuyaException("{} was disabled".format(self)))
 
         await self.async_disconnect()
 
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     async def async_disconnect(self) -> None:
         """Disconnect from the device.
 
@@ -875,6 +1917,11 @@ class TuyaDevice:
         self._connected = False
         self.last_pong = 0
 
+        if self._read_task is not None:
+            if self._read_task is not asyncio.current_task():
+                self._read_task.cancel()
+            self._read_task = None
+
         if self.writer is not None:
             self.writer.close()
             await self.writer.wait_closed()
@@ -882,25 +1929,134 @@ class TuyaDevice:
         if self.reader is not None and not self.reader.at_eof():
             self.reader.feed_eof()
 
-    async def async_get(self) -> None:
+    async def async_get(self, max_age_ms: Optional[float] = None) -> Mapping[str, Any]:
         """Get the current state of the device.
 
-        This method retrieves the current state of the device.
+        Concurrent callers share a single request to the device and its
+        result.
+
+        Args:
+            max_age_ms: If given, state received from the device within this
+                many milliseconds is returned without sending a request.
+
+        Returns:
+            An immutable snapshot of the device state.
         """
+        if (
+            max_age_ms is not None
+            and self.last_state_at is not None
+            and (time.monotonic() - self.last_state_at) * 1000 <= max_age_ms
+        ):
+            return self.state
+
+        if self._get_task is None:
+            self._get_task = self._start_task(
+                self._async_request_state(), "get", log_errors=False
+            )
+            self._get_task.add_done_callback(self._get_task_done)
+        await asyncio.shield(self._get_task)
+        return self.state
+
+    def _get_task_done(self, task: asyncio.Task[None]) -> None:
+        """Forget a finished state request."""
+        if self._get_task is task:
+            self._get_task = None
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller gave up.
+            task.exception()
+
+    async def _async_request_state(self) -> None:
+        """Request the current state from the device and store it."""
         payload_dict = {"gwId": self.gateway_id, "devId": self.device_id}
         payload_bytes = json.dumps(payload_dict).encode('utf-8')
-        encrypt = False if self.version < (3, 3) else True
-        message = Message(Message.GET_COMMAND, payload_bytes, encrypt=encrypt, device=self)
-        self._queue.append(message)
+        message = self._enqueue(
+            self._constant_message(Message.GET_COMMAND, payload_bytes)
+        )
+        assert message.sent is not None
+        await asyncio.wait((message.sent,))
+        error = message.sent.exception()
+        if error is not None:
+            # The request was never sent, so no response is coming.
+            self._listeners.discard(message.sequence)
+            raise error
+        if self._connected is False:
+            self._listeners.discard(message.sequence)
+            raise ConnectionException(
+                "{} disconnected before replying to the state request".format(self)
+            )
         response = await self.async_receive(message)
         if response is not None:
             await self.async_update_state(response)
 
-    async def async_set(self, dps: dict[str, Any]) -> None:
+    async def async_set(
+        self, dps: dict[str, Any], acknowledged: bool = False
+    ) -> Future[None]:
         """Set the state of the device.
 
-        This method sets the state of the device.
+        This method queues the new state for the device. Writes made within
+        write_coalesce_window seconds of each other are merged into a single
+        command, with the last value written to each DPS winning. Commands are
+        sent ahead of any queued state requests and pings.
+
+        Args:
+            dps: The values to set, keyed by DPS code.
+            acknowledged: Wait for the device to echo the new values rather
+                than just for the command to be sent. Values that are not
+                echoed within the timeout are sent again, up to ACK_RETRIES
+                times with a growing delay in between.
+
+        Returns:
+            A future that resolves once the command carrying these values has
+            been sent, or in acknowledged mode once the device has echoed
+            them. It fails if sending fails or the command expires first, or
+            in acknowledged mode with AckTimeoutException if the values are
+            never echoed.
+        """
+        if not acknowledged:
+            return self._write(dps)
+
+        expected = {str(code): value for code, value in dps.items()}
+        acked: Future[None] = asyncio.get_running_loop().create_future()
+        self._pending_acks[acked] = (time.monotonic(), expected)
+        self._start_task(self._async_await_ack(expected, acked), "ack")
+        return acked
+
+    def _write(self, dps: dict[str, Any]) -> Future[None]:
+        """Add values to the pending coalesced write.
+
+        Returns:
+            The future of the command that will carry the values.
         """
+        if self._pending_writes is None:
+            loop = asyncio.get_running_loop()
+            self._pending_writes = {}
+            self._pending_writes_sent = loop.create_future()
+            # The wheel fires on its next tick, which for a window shorter
+            # than a tick would delay the flush by up to twice the window
+            if (
+                self._scheduler is not None
+                and self.write_coalesce_window >= self._scheduler.resolution
+            ):
+                self._write_timer = self._scheduler.call_later(
+                    self.write_coalesce_window, self._flush_writes
+                )
+            else:
+                self._write_timer = loop.call_later(
+                    self.write_coalesce_window, self._flush_writes
+                )
+
+        # Keys are sent as strings anyway, so 160 and "160" are the same DPS
+        self._pending_writes.update((str(code), value) for code, value in dps.items())
+        assert self._pending_writes_sent is not None
+        return self._pending_writes_sent
+
+    def _flush_writes(self) -> None:
+        """Queue one command carrying every write made during the window."""
+        dps, sent = self._pending_writes, self._pending_writes_sent
+        self._pending_writes = self._pending_writes_sent = self._write_timer = None
+        if dps is None or sent is None or sent.done():
+            return
+
         t = int(time.time())
         payload_dict = {"devId": self.device_id, "uid": "", "t": t, "dps": dps}
         payload_bytes = json.dumps(payload_dict).encode('utf-8')
@@ -911,35 +2067,169 @@ class TuyaDevice:
             device=self,
             expect_response=False,
         )
-        self._queue.append(message)
+        try:
+            queued = self._enqueue(message)
+        except QueueFullException as e:
+            _fail_future(sent, e)
+            return
+        assert queued.sent is not None
+        _chain_future(queued.sent, sent)
+
+    async def _async_await_ack(
+        self, expected: dict[str, Any], acked: Future[None]
+    ) -> None:
+        """Send values until the device echoes them or the retries run out.
+
+        Args:
+            expected: The values still waiting to be echoed. Values are
+                removed from it as they arrive, so retries only resend the
+                rest.
+            acked: The future resolved once every value has been echoed.
+        """
+        delay = ACK_RETRY_DELAY
+        error: Optional[Exception] = None
+        try:
+            for attempt in range(ACK_RETRIES + 1):
+                if attempt:
+                    await self._async_sleep(delay)
+                    delay *= BACKOFF_MULTIPLIER
+                    self._LOGGER.debug(
+                        "Resending unconfirmed values to {}: {}".format(self, expected)
+                    )
+                if acked.done():
+                    return
+                try:
+                    # Shielded, as the write may be shared with other callers.
+                    await asyncio.shield(self._write(dict(expected)))
+                    await asyncio.wait_for(asyncio.shield(acked), self.timeout)
+                except TimeoutError:
+                    error = None
+                    continue
+                except TuyaException as e:
+                    error = e
+                    continue
+                return
+            _fail_future(
+                acked,
+                error or AckTimeoutException(
+                    "{} did not confirm {}".format(self, expected)
+                ),
+            )
+        finally:
+            self._pending_acks.pop(acked, None)
+            _fail_future(acked, TuyaException("{} was disabled".format(self)))
+
+    def _match_acks(self, dps: dict[str, Any]) -> None:
+        """Resolve acknowledged writes whose values have all been echoed."""
+        now = time.monotonic()
+        for acked, (start, expected) in list(self._pending_acks.items()):
+            for code, value in dps.items():
+                if code in expected and expected[code] == value:
+                    del expected[code]
+            if not expected and not acked.done():
+                del self._pending_acks[acked]
+                self.ack_latency.observe(now - start)
+                _resolve_future(acked)
 
     async def async_ping(self, ping_interval: float) -> None:
-        """Send a ping to the device.
+        """Keep the connection to the device alive.
 
-        This method sends a ping to the device.
+        This method pings the device whenever the connection has been idle for
+        the keepalive interval, starting at ping_interval, until the device is
+        disabled.
         """
-        if self._enabled is False:
-            return
+        self.keepalive_interval = ping_interval
+        while self._enabled:
+            await asyncio.sleep(self._keepalive())
+
+    def _keepalive(self) -> float:
+        """Check the connection is alive and ping it if it has gone idle.
+
+        Any valid frame from the device counts as proof that the connection is
+        alive, so pings are only needed while nothing else is received. An
+        answered ping lengthens the keepalive interval; an unanswered one
+        disconnects and resets it to ping_interval.
 
+        Returns:
+            The delay in seconds until the connection should be checked again.
+        """
+        now = time.monotonic()
+        if self._ping_sent_at is not None:
+            if self.last_received >= self._ping_sent_at:
+                self.keepalive_interval = min(
+                    self.keepalive_interval * PING_INTERVAL_GROWTH,
+                    self.max_ping_interval,
+                )
+            else:
+                self._LOGGER.debug("Ping to {} was not answered".format(self))
+                self.keepalive_interval = self.ping_interval
+                if self._connected:
+                    self._start_task(self.async_disconnect(), "disconnect")
+            self._ping_sent_at = None
+
+        idle = now - self.last_received
+        if idle < self.keepalive_interval:
+            return self.keepalive_interval - idle
+
+        if self._send_ping():
+            self._ping_sent_at = now
+            return self.timeout
+        return self.keepalive_interval
+
+    def _send_ping(self) -> bool:
+        """Queue a ping unless the device is backing off.
+
+        Returns:
+            Whether a ping was queued.
+        """
         if self._backoff is True:
             self._LOGGER.debug("Currently in backoff, not adding ping to queue")
-        else:
-            self.last_ping = time.time()
-            encrypt = False if self.version < (3, 3) else True
-            message = Message(
-                Message.PING_COMMAND,
-                payload=None,
-                sequence=0,
-                encrypt=encrypt,
-                device=self,
-                expect_response=False,
-            )
-            self._queue.append(message)
+            return False
 
-        await asyncio.sleep(ping_interval)
-        self._ping_task = asyncio.create_task(self.async_ping(self.ping_interval))
-        if self.last_pong < self.last_ping:
-            await self.async_disconnect()
+        message = self._constant_message(
+            Message.PING_COMMAND, None, sequence=0, expect_response=False
+        )
+        try:
+            self._enqueue(message)
+        except QueueFullException:
+            self._LOGGER.debug("Queue is full, not adding ping")
+            return False
+        self.last_ping = time.time()
+        self.pings_sent += 1
+        return True
+
+    def _on_ping_due(self) -> None:
+        """Check the connection and schedule the next check.
+
+        This is the scheduler-driven equivalent of async_ping.
+        """
+        if self._enabled is False:
+            return
+
+        assert self._scheduler is not None
+        self._ping_timer = self._scheduler.call_later(
+            self._keepalive(), self._on_ping_due
+        )
+
+    def _on_poll_due(self) -> None:
+        """Poll the device for its state and schedule the next poll."""
+        if self._enabled is False:
+            return
+
+        self._start_task(self._async_poll(), "poll")
+        assert self._scheduler is not None and self.poll_interval is not None
+        self._poll_timer = self._scheduler.call_later(
+            self.poll_interval, self._on_poll_due
+        )
+
+    async def _async_poll(self) -> None:
+        """Fetch the device state and pass it on to the entity."""
+        try:
+            await self.async_get()
+        except TuyaException as e:
+            self._LOGGER.debug("Polling {} failed: {}".format(self, e))
+        else:
+            await self.update_entity_state_cb()
 
     async def _async_pong_received(self, message: Message) -> None:
         """Handle a received pong message.
@@ -967,17 +2257,25 @@ class TuyaDevice:
             and isinstance(state_message.payload, dict)
             and "dps" in state_message.payload
         ):
-            self._dps.update(state_message.payload["dps"])
-            self._LOGGER.debug("Received updated state {}: {}".format(self, self._dps))
+            changed = self._dps.update(state_message.payload["dps"])
+            self.last_state_at = time.monotonic()
+            if self._pending_acks:
+                self._match_acks(state_message.payload["dps"])
+            self._LOGGER.debug(
+                "Received updated state {}, changed {}: {}".format(
+                    self, sorted(changed), self._dps
+                )
+            )
 
     @property
-    def state(self) -> dict[str, Any]:
+    def state(self) -> Mapping[str, Any]:
         """Get the current state of the device.
 
         Returns:
-            A dictionary containing the current state of the device.
+            An immutable snapshot of the device's DPS values. It is shared
+            with every other reader until the state next changes.
         """
-        return dict(self._dps)
+        return self._dps.snapshot()
 
     @state.setter
     def state(self, new_values: dict[str, Any]) -> None:
@@ -990,61 +2288,108 @@ class TuyaDevice:
         """
         asyncio.create_task(self.async_set(new_values))
 
+    @property
+    def state_version(self) -> int:
+        """Get the version of the state, which goes up whenever it changes."""
+        return self._dps.version
+
+    def changed_since(self, version: int) -> frozenset[str]:
+        """Get the DPS codes that changed after a state version.
+
+        Args:
+            version: A version previously read from state_version.
+
+        Returns:
+            Every code changed since then.
+        """
+        return self._dps.changed_since(version)
+
+    def subscribe(
+        self, listener: DpsListener, codes: Optional[Iterable[Any]] = None
+    ) -> Callable[[], None]:
+        """Call a listener whenever some of the device's DPS change.
+
+        Args:
+            listener: Called with the DPS store and the codes that changed.
+            codes: The DPS codes to watch, or None for every change.
+
+        Returns:
+            A function that unsubscribes the listener.
+        """
+        return self._dps.subscribe(listener, codes)
+
     async def _async_handle_message(self) -> None:
         """Handle incoming messages.
 
-        This method handles incoming messages from the device.
+        This method reads and dispatches messages from the device for as long
+        as the connection stays open.
         """
-        if self._enabled is False or self._connected is False:
+        reader = self.reader
+        if reader is None:
             return
-
-        try:
-            self._response_task = asyncio.create_task(
-                self.reader.readuntil(MAGIC_SUFFIX_BYTES)
-            )
-            await self._response_task
-            response_data = self._response_task.result()
-            message = Message.from_bytes(self, response_data, self.cipher)
-        except Exception as e:
-            if isinstance(e, InvalidMessage):
-                self._LOGGER.debug("Invalid message from {}: {}".format(self, e))
-            elif isinstance(e, MessageDecodeFailed):
-                self._LOGGER.debug("Failed to decrypt message from {}".format(self))
-            elif isinstance(e, asyncio.IncompleteReadError):
-                if self._connected:
-                    self._LOGGER.debug("Incomplete read")
-            elif isinstance(e, ConnectionResetError):
-                self._LOGGER.debug(
-                    "Connection reset: {}\n{}".format(e, traceback.format_exc())
-                )
+        while self._enabled and self._connected and reader is self.reader:
+            try:
+                response_data = await reader.read(READ_CHUNK_SIZE)
+            except Exception as e:
+                if isinstance(e, ConnectionResetError):
+                    self._LOGGER.debug(
+                        "Connection reset: {}\n{}".format(e, traceback.format_exc())
+                    )
+                else:
+                    self._LOGGER.debug("Read from {} failed: {}".format(self, e))
                 await self.async_disconnect()
+                return
 
-        else:
-            self._LOGGER.debug("Received message from {}: {}".format(self, message))
-            if message.sequence in self._listeners:
-                sem = self._listeners[message.sequence]
-                if isinstance(sem, asyncio.Semaphore):
-                    self._listeners[message.sequence] = message
-                    sem.release()
-            else:
-                handler = self._handlers.get(message.command, None)
-                if handler is not None:
-                    asyncio.create_task(handler(message))
-
-        self._response_task = None
-        asyncio.create_task(self._async_handle_message())
+            if not response_data:
+                self._LOGGER.debug("Connection closed by {}".format(self))
+                await self.async_disconnect()
+                return
+
+            self._decoder.feed(response_data)
+            for frame in self._decoder:
+                try:
+                    message = Message.from_bytes(self, frame, self.cipher)
+                except InvalidMessage as e:
+                    self._LOGGER.debug("Invalid message from {}: {}".format(self, e))
+                except MessageDecodeFailed:
+                    self._LOGGER.debug("Failed to decrypt message from {}".format(self))
+                else:
+                    self.last_received = time.monotonic()
+                    await self._async_dispatch_message(message)
+
+    async def _async_dispatch_message(self, message: Message) -> None:
+        """Pass a received message to its listener or command handler."""
+        self._LOGGER.debug("Received message from {}: {}".format(self, message))
+        if not self._listeners.resolve(message.sequence, message):
+            handler = self._handlers.get(message.command, None)
+            if handler is not None:
+                try:
+                    await handler(message)
+                except Exception as e:
+                    self._LOGGER.error(
+                        "Failed to handle message from {}: {}".format(self, e)
+                    )
 
     async def _async_send(self, message: Message, retries: int = 2) -> None:
         """Send a message to the device.
 
         This method sends a message to the device.
         """
-        self._LOGGER.debug("Sending to {}: {}".format(self, message))
+        await self._async_send_many([message], retries=retries)
+
+    async def _async_send_many(self, messages: list[Message], retries: int = 2) -> None:
+        """Send several messages to the device in a single write.
+
+        The frames are rendered back to back into one buffer, written, and
+        drained once.
+        """
+        for message in messages:
+            self._LOGGER.debug("Sending to {}: {}".format(self, message))
         try:
             await self.async_connect()
             if self.writer is None:
                 raise ConnectionFailedException("Writer is not initialized")
-            self.writer.write(message.to_bytes())
+            self.writer.write(build_frames(messages))
             await self.writer.drain()
         except Exception as e:
             if retries == 0:
@@ -1079,48 +2424,36 @@ class TuyaDevice:
                     "Retrying send due to error. Failed to send data to {}".format(self)
                 )
             await asyncio.sleep(0.25)
-            await self._async_send(message, retries=retries - 1)
+            await self._async_send_many(messages, retries=retries - 1)
 
     async def async_receive(self, message: Message) -> Message | None:
         """Receive a message from the device.
 
         This method receives a message from the device.
         """
+        listener = message.listener
+        if message.expect_response is not True or listener is None:
+            return None
+
         if self._connected is False:
+            self._listeners.discard(message.sequence)
             return None
 
-        has_listener = (message.expect_response is True
-                        and hasattr(message, 'listener')
-                        and message.listener is not None)
-        if has_listener:
-            try:
-                # We've already checked that message.listener is not None
-                listener = message.listener  # This helps mypy understand it's not None
-                # Create and await the task directly without storing it in self._recieve_task
-                # This avoids type compatibility issues
-                if listener is not None:  # Extra check for mypy
-                    await asyncio.wait_for(listener.acquire(), timeout=self.timeout)
-                response = self._listeners.pop(message.sequence)
-
-                if isinstance(response, Exception):
-                    raise response
-
-                # Ensure we're returning the correct type
-                if isinstance(response, Message):
-                    return response
-                return None
-            except TimeoutError:
-                del self._listeners[message.sequence]
-                await self.async_disconnect()
-                raise ResponseTimeoutException(
-                    "Timed out waiting for response to sequence number {}".format(
-                        message.sequence
-                    )
+        try:
+            # Shield the future so a timeout here doesn't cancel it for any
+            # other caller waiting on the same response.
+            return await asyncio.wait_for(
+                asyncio.shield(listener), timeout=self.timeout
+            )
+        except TimeoutError:
+            await self.async_disconnect()
+            raise ResponseTimeoutException(
+                "Timed out waiting for response to sequence number {}".format(
+                    message.sequence
                 )
-            except Exception as e:
-                del self._listeners[message.sequence]
-                await self.async_disconnect()
-                raise e
-
-        # If we don't have a listener, return None
-        return None
+            )
+        except Exception as e:
+            await self.async_disconnect()
+            raise e
+        finally:
+            self._listeners.discard(message.sequence)
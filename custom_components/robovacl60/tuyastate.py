@@ -0,0 +1,197 @@
+"""Versioned storage for a Tuya device's DPS values.
+
+A device's state arrives as partial updates, each carrying some of its DPS.
+DpsStore merges them like a dict, but also records which keys each update
+actually changed, when every key last changed, and a version number that goes
+up with every update that changed something. Consumers can subscribe to the
+keys they care about instead of re-reading the whole state after every update.
+
+Readers that need the whole state take a snapshot: a read-only mapping that is
+shared by every reader until the next change, and is never modified, so it
+stays consistent however long a reader holds on to it.
+"""
+
+import logging
+import time
+from collections.abc import Iterator, Mapping, MutableMapping
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DpsListener = Callable[["DpsStore", frozenset[str]], None]
+
+
+class DpsStore(MutableMapping[str, Any]):
+    """A dict of DPS values that tracks what changed.
+
+    Keys are DPS codes as strings; integer codes are converted, so 160 and
+    "160" are the same key. Writing a value equal to the current one is not a
+    change: it does not bump the version or notify anyone.
+
+    Snapshots are copy-on-write: taking one shares the current values instead
+    of copying them, and the first change after that copies the values before
+    modifying them. There is therefore at most one copy per version, however
+    many snapshots are taken.
+    """
+
+    def __init__(self, values: Optional[Mapping[Any, Any]] = None) -> None:
+        """Initialize the store.
+
+        Args:
+            values: Optional initial values. They count as the first update.
+        """
+        self._values: dict[str, Any] = {}
+        self._changed_at: dict[str, float] = {}
+        self._changed_in: dict[str, int] = {}
+        self._listeners: dict[Optional[str], list[DpsListener]] = {}
+        self._snapshot: Optional[Mapping[str, Any]] = None
+        self.version = 0
+        self.last_changed: frozenset[str] = frozenset()
+        if values:
+            self.update(values)
+
+    def __getitem__(self, key: Any) -> Any:
+        """Return the value of a DPS."""
+        return self._values[str(key)]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set the value of a DPS."""
+        self.update({key: value})
+
+    def __delitem__(self, key: Any) -> None:
+        """Remove a DPS. Removing it counts as a change."""
+        key = str(key)
+        if key not in self._values:
+            raise KeyError(key)
+        self._unshare()
+        del self._values[key]
+        self._commit(frozenset((key,)))
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the DPS codes."""
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        """Return the number of DPS."""
+        return len(self._values)
+
+    def __contains__(self, key: object) -> bool:
+        """Return whether a DPS has a value."""
+        return str(key) in self._values
+
+    def __repr__(self) -> str:
+        """Return a string representation of the store."""
+        return "DpsStore(version={}, {!r})".format(self.version, self._values)
+
+    def update(self, values: Mapping[Any, Any]) -> frozenset[str]:  # type: ignore[override]
+        """Merge new values into the store.
+
+        Args:
+            values: The new values, keyed by DPS code.
+
+        Returns:
+            The codes whose value changed. The version is only bumped, and
+            listeners only called, if this is not empty.
+        """
+        changed = {}
+        for key, value in values.items():
+            key = str(key)
+            if key not in self._values or self._values[key] != value:
+                changed[key] = value
+        if not changed:
+            return frozenset()
+        self._unshare()
+        self._values.update(changed)
+        return self._commit(frozenset(changed))
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """Get an immutable view of the current values.
+
+        Returns:
+            A read-only mapping that never changes. The same one is returned
+            until the store changes, so taking a snapshot costs nothing.
+        """
+        if self._snapshot is None:
+            self._snapshot = MappingProxyType(self._values)
+        return self._snapshot
+
+    def changed_at(self, key: Any) -> Optional[float]:
+        """Get when a DPS last changed.
+
+        Returns:
+            The time.monotonic() value of the last change, or None if the DPS
+            never had a value.
+        """
+        return self._changed_at.get(str(key))
+
+    def changed_since(self, version: int) -> frozenset[str]:
+        """Get the codes that changed after a version.
+
+        This lets a consumer that skipped some updates catch up in one go.
+
+        Args:
+            version: A version previously read from the store.
+
+        Returns:
+            Every code changed, or removed, by a later update.
+        """
+        return frozenset(
+            key for key, changed_in in self._changed_in.items() if changed_in > version
+        )
+
+    def subscribe(
+        self, listener: DpsListener, keys: Optional[Iterable[Any]] = None
+    ) -> Callable[[], None]:
+        """Call a listener whenever some DPS change.
+
+        Args:
+            listener: Called with the store and the codes changed by the
+                update, once per update.
+            keys: The codes to watch. If None, every change is reported.
+
+        Returns:
+            A function that unsubscribes the listener.
+        """
+        watched: list[Optional[str]] = (
+            [None] if keys is None else list(dict.fromkeys(str(key) for key in keys))
+        )
+        for key in watched:
+            self._listeners.setdefault(key, []).append(listener)
+
+        def unsubscribe() -> None:
+            for key in watched:
+                listeners = self._listeners.get(key)
+                if listeners is not None and listener in listeners:
+                    listeners.remove(listener)
+                    if not listeners:
+                        del self._listeners[key]
+
+        return unsubscribe
+
+    def _unshare(self) -> None:
+        """Stop sharing the values with the snapshot, before changing them."""
+        if self._snapshot is not None:
+            self._values = dict(self._values)
+            self._snapshot = None
+
+    def _commit(self, changed: frozenset[str]) -> frozenset[str]:
+        """Record a change to some codes and notify their listeners."""
+        self.version += 1
+        self.last_changed = changed
+        now = time.monotonic()
+        for key in changed:
+            self._changed_at[key] = now
+            self._changed_in[key] = self.version
+
+        if self._listeners:
+            notified: dict[DpsListener, None] = {}
+            for watched in (None, *changed):
+                for listener in self._listeners.get(watched, ()):
+                    notified[listener] = None
+            for listener in notified:
+                try:
+                    listener(self, changed)
+                except Exception:
+                    _LOGGER.exception("DPS listener %r failed", listener)
+        return changed
@@ -0,0 +1,259 @@
+"""Shared timer scheduling for Tuya devices.
+
+Each TuyaDevice would otherwise keep its own timers for pings, backoff, message
+expiry and polling. With many devices that adds up to a lot of independent
+event loop wakeups. A TimingWheel holds all of those timers and wakes the loop
+only when one of them is due.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Any, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RESOLUTION = 0.1
+SLOT_BITS = 6
+LEVELS = 4
+
+
+class TimerHandle:
+    """A timer scheduled on a TimingWheel."""
+
+    __slots__ = ("tick", "callback", "args", "_slot", "_wheel")
+
+    def __init__(
+        self,
+        wheel: "TimingWheel",
+        tick: int,
+        callback: Callable[..., Any],
+        args: tuple[Any, ...],
+    ) -> None:
+        """Initialize the handle."""
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self._slot: Optional[dict["TimerHandle", None]] = None
+        self._wheel = wheel
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the timer was cancelled or has already fired."""
+        return self._slot is None
+
+    def cancel(self) -> None:
+        """Cancel the timer. Cancelling a timer that already fired is a no-op."""
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+
+class TimingWheel:
+    """A hierarchical timing wheel.
+
+    Time is divided into ticks of `resolution` seconds. Level 0 has one slot
+    per tick. Each slot of the next level covers a whole rotation of the level
+    below it, and so on. A timer is stored in the lowest level whose current
+    rotation contains its tick. It moves down a level each time the wheel
+    reaches the start of its slot. Inserting and cancelling a timer are O(1).
+
+    The wheel is driven by a single event loop timer, which is armed for the
+    earliest pending timer. Empty ticks are skipped, so the loop is not woken
+    at all while no timers are due.
+    """
+
+    def __init__(
+        self,
+        resolution: float = DEFAULT_RESOLUTION,
+        slot_bits: int = SLOT_BITS,
+        levels: int = LEVELS,
+    ) -> None:
+        """Initialize the wheel.
+
+        Args:
+            resolution: The length of a tick in seconds. Timers fire on the
+                first tick at or after their deadline.
+            slot_bits: log2 of the number of slots on each level.
+            levels: The number of levels. Timers beyond the range of the top
+                level wait in an overflow list.
+        """
+        self.resolution = resolution
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels: list[list[dict[TimerHandle, None]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._overflow: dict[TimerHandle, None] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._origin = 0.0
+        self._tick = 0
+        self._count = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_tick: Optional[int] = None
+        self._firing = False
+        self.wakeups = 0
+
+    def __len__(self) -> int:
+        """Return the number of pending timers."""
+        return self._count
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> TimerHandle:
+        """Call a callback after a delay.
+
+        Args:
+            delay: The delay in seconds.
+            callback: The function to call. Coroutines must be wrapped in a
+                task by the callback itself.
+            *args: Arguments to pass to the callback.
+
+        Returns:
+            A handle that can be used to cancel the timer.
+        """
+        loop = self._get_loop()
+        return self.call_at(loop.time() + delay, callback, *args)
+
+    def call_at(
+        self, when: float, callback: Callable[..., Any], *args: Any
+    ) -> TimerHandle:
+        """Call a callback at a time given in the event loop's clock.
+
+        Args:
+            when: The time, as returned by loop.time().
+            callback: The function to call.
+            *args: Arguments to pass to the callback.
+
+        Returns:
+            A handle that can be used to cancel the timer.
+        """
+        self._get_loop()
+        tick = max(math.ceil((when - self._origin) / self.resolution), self._tick + 1)
+        timer = TimerHandle(self, tick, callback, args)
+        self._insert(timer)
+        self._count += 1
+        if not self._firing and (self._wakeup_tick is None or tick < self._wakeup_tick):
+            self._arm()
+        return timer
+
+    def close(self) -> None:
+        """Cancel every pending timer and stop driving the wheel."""
+        for level in self._levels:
+            for slot in level:
+                for timer in list(slot):
+                    timer.cancel()
+        for timer in list(self._overflow):
+            timer.cancel()
+        self._disarm()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Bind the wheel to the running event loop on first use."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._origin = self._loop.time()
+        return self._loop
+
+    def _insert(self, timer: TimerHandle) -> None:
+        """Place a timer in the slot for its tick."""
+        # The highest group of bits in which the timer's tick differs from the
+        # current tick picks the level. Timers due now go on level 0.
+        level = max((timer.tick ^ self._tick).bit_length() - 1, 0) // self._bits
+        if level >= len(self._levels):
+            slot = self._overflow
+        else:
+            slot = self._levels[level][(timer.tick >> (level * self._bits)) & self._mask]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _next_slot(self) -> tuple[Optional[int], dict[TimerHandle, None]]:
+        """Find the next slot whose timers fire or move down a level.
+
+        Returns:
+            The tick at which the slot is reached, or None if the wheel is
+            empty, and the slot itself.
+        """
+        for level, slots in enumerate(self._levels):
+            shift = level * self._bits
+            current = (self._tick >> shift) & self._mask
+            for index in range(current + 1, self._mask + 1):
+                if slots[index]:
+                    block = self._tick >> (shift + self._bits) << (shift + self._bits)
+                    return block | (index << shift), slots[index]
+        if self._overflow:
+            shift = len(self._levels) * self._bits
+            return ((self._tick >> shift) + 1) << shift, self._overflow
+        return None, self._overflow
+
+    def _advance(self, tick: int) -> None:
+        """Move the wheel to a tick, cascading timers and firing due ones."""
+        self._tick = tick
+        if tick & ((1 << (len(self._levels) * self._bits)) - 1) == 0:
+            self._cascade(self._overflow)
+        for level in range(len(self._levels) - 1, 0, -1):
+            shift = level * self._bits
+            if tick & ((1 << shift) - 1) == 0:
+                self._cascade(self._levels[level][(tick >> shift) & self._mask])
+
+        slot = self._levels[0][tick & self._mask]
+        while slot:
+            timer = next(iter(slot))
+            timer.cancel()
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                _LOGGER.exception("Timer callback %r failed", timer.callback)
+
+    def _cascade(self, slot: dict[TimerHandle, None]) -> None:
+        """Move the timers in a slot to the levels below it."""
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            self._insert(timer)
+
+    def _arm(self) -> None:
+        """Arm the event loop timer for the next tick that has work."""
+        self._disarm()
+        _, slot = self._next_slot()
+        if not slot:
+            return
+        # Sleep straight through to the earliest timer. Any slots that need
+        # to move down a level on the way are handled on that wakeup.
+        tick = min(timer.tick for timer in slot)
+        assert self._loop is not None
+        self._wakeup_tick = tick
+        self._wakeup = self._loop.call_at(
+            self._origin + tick * self.resolution, self._on_wakeup
+        )
+
+    def _disarm(self) -> None:
+        """Cancel the event loop timer."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = None
+        self._wakeup_tick = None
+
+    def _on_wakeup(self) -> None:
+        """Process every tick that is due, then re-arm."""
+        assert self._loop is not None and self._wakeup_tick is not None
+        # The event loop runs timers up to its clock resolution early, so the
+        # tick we were armed for counts as due even if the clock says otherwise.
+        now = max(
+            math.floor((self._loop.time() - self._origin) / self.resolution),
+            self._wakeup_tick,
+        )
+        self._wakeup = None
+        self._wakeup_tick = None
+        self.wakeups += 1
+        self._firing = True
+        try:
+            while True:
+                tick, _ = self._next_slot()
+                if tick is None or tick > now:
+                    break
+                self._advance(tick)
+            self._tick = max(self._tick, now)
+        finally:
+            self._firing = False
+        self._arm()
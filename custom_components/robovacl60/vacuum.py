@@ -19,11 +19,9 @@ This module provides the vacuum entity integration for Eufy Robovac devices.
 from __future__ import annotations
 import ast
 import base64
-from datetime import timedelta
+from collections.abc import Callable, Mapping
 from enum import StrEnum
-import json
 import logging
-import time
 from typing import Any, Optional
 
 from homeassistant.components.vacuum import (
@@ -41,16 +39,25 @@ from homeassistant.const import (
     CONF_MODEL,
     CONF_NAME,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-
-from .const import CONF_VACS, DOMAIN, PING_RATE, REFRESH_RATE, TIMEOUT
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .commands import (
+    auto_clean_command,
+    encode_mode_command,
+    go_home_command,
+    pause_command,
+    room_clean_command,
+)
+from .const import CONF_VACS, COORDINATORS, DOMAIN
+from .coordinator import RoboVacCoordinator
 from .errors import getErrorMessage
+from .proto import ModeCommand, decode_mode_command, decode_work_status
 from .vacuums.base import RobovacCommand, RoboVacEntityFeature, TuyaCodes, TUYA_CONSUMABLES_CODES
-from .robovac import ModelNotSupportedException, RoboVac
-from .tuyalocalapi import TuyaException
+from .robovac import RoboVac
 
 ATTR_BATTERY_ICON = "battery_icon"
 ATTR_ERROR = "error"
@@ -68,41 +75,17 @@ ATTR_CONSUMABLES = "consumables"
 ATTR_MODE = "mode"
 
 _LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(seconds=REFRESH_RATE)
 UPDATE_RETRIES = 3
 
 def decode_mode_string(mode_raw: str) -> str:
-    lookup = {
-         "BBoCCAE=": "auto",
-         "AggN": "pause",
-         "AA==": "auto",
-         "AggG": "home",
-         "AggO": "auto",
-         "AggB": "room",
-         "AggC": "zone",
-         "AggM": "auto",
-    }
-    return lookup.get(mode_raw, f"unknown ({mode_raw})")
+    """Decode a DPS [152] mode command to the mode it puts the vacuum in."""
+    command = decode_mode_command(mode_raw)
+    return command.label if command is not None else f"unknown ({mode_raw})"
 
 def decode_status_string(status_raw: str) -> str:
-    lookup = {
-        "BgoAEAUyAA==": "cleaning", # auto_cleaning
-        "BgoAEAVSAA==": "position", # auto_positioning
-        "CAoAEAUyAggB": "paused", # auto_paused
-        "CAoCCAEQBTIA": "cleaning", # room_cleaning
-        "CAoCCAEQBVIA": "position", # room_positioning
-        "CgoCCAEQBTICCAE=": "paused", # room_paused
-        "CAoCCAIQBTIA": "cleaning", # zone_cleaning
-        "CAoCCAIQBVIA": "position", # zone_positioning
-        "CgoCCAIQBTICCAE=": "paused", # zone_paused
-        "BAoAEAY=": "start_manual",
-        "BBAHQgA=": "returning",
-        "BBADGgA=": "charging",
-        "BhADGgIIAQ==": "idle",
-        "AA==": "standby",
-        "AhAB": "sleeping",
-    }
-    return lookup.get(status_raw, f"unknown ({status_raw})")
+    """Decode a DPS [153] work status to the integration's status string."""
+    status = decode_work_status(status_raw)
+    return status.label if status is not None else f"unknown ({status_raw})"
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -112,27 +95,25 @@ async def async_setup_entry(
     """Set up Eufy RoboVac vacuum entities for this config entry."""
     # Pull your filtered list out of hass.data instead of entry.data
     vacuums_data = hass.data[DOMAIN][entry.entry_id][CONF_VACS]
+    coordinators = hass.data[DOMAIN][entry.entry_id][COORDINATORS]
     entities: list[RoboVacEntity] = []
 
     for vac_id, vac_cfg in vacuums_data.items():
-        entity = RoboVacEntity(vac_cfg)
-        entities.append(entity)
-        # Replace the raw dict with your entity so sensors can find it later
-        hass.data[DOMAIN][entry.entry_id][CONF_VACS][vac_id] = entity
+        entities.append(RoboVacEntity(coordinators[vac_id], vac_cfg))
 
-    # Register all vacuums at once, polling immediately before the first interval
-    async_add_entities(entities, update_before_add=True)
+    # The coordinators have already fetched the initial state
+    async_add_entities(entities)
 
 
-class RoboVacEntity(StateVacuumEntity):
+class RoboVacEntity(CoordinatorEntity[RoboVacCoordinator], StateVacuumEntity):
     """Eufy Robovac vacuum entity.
 
     This class represents a Eufy Robovac vacuum cleaner in Home Assistant.
-    It handles the communication with the vacuum via the Tuya local API and
-    provides the necessary functionality to control and monitor the vacuum.
+    It sends commands to the vacuum via the Tuya local API, and receives its
+    state from the device's coordinator as soon as the vacuum pushes it.
     """
 
-    _attr_should_poll = True
+    _attr_should_poll = False
 
     _attr_access_token: str | None = None
     # _attr_mac_address: str | None = None
@@ -388,17 +369,18 @@ class RoboVacEntity(StateVacuumEntity):
 
         return data
 
-    def __init__(self, item: dict[str, Any]) -> None:
+    def __init__(self, coordinator: RoboVacCoordinator, item: dict[str, Any]) -> None:
         """Initialize Eufy Robovac entity.
 
         This method initializes the vacuum entity with the configuration provided
-        and establishes a connection to the physical device via the Tuya local API.
+        and the coordinator that owns the connection to the physical device.
 
         Args:
+            coordinator: The coordinator for the vacuum.
             item: Dictionary containing vacuum configuration including name, ID,
                   model, IP address, access token, and other required parameters.
         """
-        super().__init__()
+        super().__init__(coordinator)
 
         # Initialize basic attributes
         self._attr_battery_level = 0
@@ -407,38 +389,18 @@ class RoboVacEntity(StateVacuumEntity):
         self._attr_model_code = item[CONF_MODEL]
         self._attr_ip_address = item[CONF_IP_ADDRESS]
         self._attr_access_token = item[CONF_ACCESS_TOKEN]
-        self.vacuum: Optional[RoboVac] = None
+        self.vacuum: Optional[RoboVac] = coordinator.vacuum
         self.update_failures = 0
+        self.suppressed_writes = 0
+        self._last_fingerprint: Optional[tuple[Any, ...]] = None
         self._attr_stat_dps_raw = None
-        self.tuyastatus: dict[str, Any] | None = None
-
-        # Initialize the RoboVac connection
-        try:
-            # Extract model code prefix for device identification
-            model_code_prefix = ""
-            if self.model_code is not None:
-                model_code_prefix = self.model_code[0:5]
-
-            # Create the RoboVac instance
-            self.vacuum = RoboVac(
-                device_id=self.unique_id,
-                host=self.ip_address,
-                local_key=self.access_token,
-                timeout=TIMEOUT,
-                ping_interval=PING_RATE,
-                model_code=model_code_prefix,
-                update_entity_state=self.pushed_update_handler,
-            )
-            _LOGGER.debug(
-                "Initialized RoboVac connection for %s (model: %s)",
-                self._attr_name,
-                self._attr_model_code
-            )
-        except ModelNotSupportedException:
-            _LOGGER.error(
-                "Model %s is not supported",
-                self._attr_model_code
-            )
+        self.tuyastatus: Mapping[str, Any] | None = None
+        self._state_version: Optional[int] = None
+        self._update_handlers: Optional[
+            list[tuple[frozenset[str], Callable[[], None]]]
+        ] = None
+
+        if self.vacuum is None:
             self._attr_error_code = "UNSUPPORTED_MODEL"
 
         # Set supported features if vacuum was initialized successfully
@@ -479,16 +441,24 @@ class RoboVacEntity(StateVacuumEntity):
             },
         )
 
-    async def async_update(self) -> None:
-        """Synchronize state from the vacuum.
-
-        This method is called periodically by Home Assistant to update the entity state.
-        It retrieves the current state from the vacuum via the Tuya API and updates
-        the entity attributes accordingly.
-
-        If the vacuum is not supported or the IP address is not set, the method returns
-        early. If the update fails, it increments a failure counter and sets an error
-        code after a certain number of retries.
+    @property
+    def available(self) -> bool:
+        """Stay available and report connection problems through the error code."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Load the state the coordinator already has when the entity is added."""
+        await super().async_added_to_hass()
+        self._last_fingerprint = None
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update the entity from the coordinator.
+
+        This is called as soon as the vacuum pushes new state, and after every
+        poll. If polling fails, it increments a failure counter and sets an
+        error code after a certain number of retries.
         """
         # Skip update if the model is not supported
         if self._attr_error_code == "UNSUPPORTED_MODEL":
@@ -501,43 +471,67 @@ class RoboVacEntity(StateVacuumEntity):
             self._attr_error_code = "IP_ADDRESS"
             return
 
-        # Skip update if vacuum object is not initialized
-        if self.vacuum is None:
-            _LOGGER.warning("Cannot update %s: vacuum not initialized", self._attr_name)
-            self._attr_error_code = "INITIALIZATION_FAILED"
-            return
-
-        # Try to update the vacuum state
-        try:
-            await self.vacuum.async_get()
+        if self.coordinator.last_update_success:
             self.update_failures = 0
             self.update_entity_values()
             _LOGGER.debug("Successfully updated vacuum %s", self._attr_name)
-        except TuyaException as e:
+        else:
             self.update_failures += 1
             _LOGGER.warning(
                 "Failed to update vacuum %s. Failure count: %d/%d. Error: %s",
                 self._attr_name,
                 self.update_failures,
                 UPDATE_RETRIES,
-                str(e)
+                str(self.coordinator.last_exception)
             )
 
             # Set error code after maximum retries
             if self.update_failures >= UPDATE_RETRIES:
                 self._attr_error_code = "CONNECTION_FAILED"
+                # Recompute everything once the vacuum is back, so the error
+                # code is cleared even if DPS [177] did not change
+                self._state_version = None
                 _LOGGER.error(
                     "Maximum update retries reached for vacuum %s. Marking as unavailable",
                     self._attr_name
                 )
 
-    async def pushed_update_handler(self) -> None:
-        """Handle updates pushed from the vacuum.
+        self._async_write_ha_state_if_changed()
+
+    def _state_fingerprint(self) -> tuple[Any, ...]:
+        """Get everything about the entity that changes and that Home Assistant records.
+
+        Returns:
+            A tuple that is equal for two updates exactly when they would write
+            the same state and attributes.
+        """
+        return (
+            self.available,
+            self.activity,
+            self._attr_battery_level,
+            self.fan_speed,
+            self.extra_state_attributes,
+        )
+
+    @callback
+    def _async_write_ha_state_if_changed(self) -> None:
+        """Write the entity's state, unless it is the same as the last one written.
 
-        This method is called when the vacuum sends an update via the Tuya API.
-        It updates the entity values and writes the state to Home Assistant.
+        Most pushed updates only change data points that the entity does not
+        show, and writing the same state again would still fire a state changed
+        event and add a row to the recorder.
         """
-        self.update_entity_values()
+        fingerprint = self._state_fingerprint()
+        if fingerprint == self._last_fingerprint:
+            self.suppressed_writes += 1
+            _LOGGER.debug(
+                "State of vacuum %s unchanged, not writing it (%d writes suppressed)",
+                self._attr_name,
+                self.suppressed_writes,
+            )
+            return
+
+        self._last_fingerprint = fingerprint
         self.async_write_ha_state()
 
     def update_entity_values(self) -> None:
@@ -555,26 +549,74 @@ class RoboVacEntity(StateVacuumEntity):
             _LOGGER.warning("Cannot update entity values: vacuum not initialized")
             return
 
-        # Get the current data points from the vacuum
-        self.tuyastatus = self.vacuum._dps
+        # Take a snapshot of the data points, so a concurrent update cannot
+        # change them part way through
+        self.tuyastatus = self.vacuum.state
 
         if self.tuyastatus is None:
             _LOGGER.warning("Cannot update entity values: no data points available")
             return
 
-        _LOGGER.debug("Updating entity values from data points: %s", self.tuyastatus)
+        # Only recompute the attributes whose data points changed since the
+        # last update; the first update, or one after the entity lost track of
+        # the state, recomputes everything
+        version = self.vacuum.state_version
+        if self._state_version is None:
+            changed = None
+        elif version == self._state_version:
+            return
+        else:
+            changed = self.vacuum.changed_since(self._state_version)
+        self._state_version = version
 
-        # Preserve cmd_dps_raw if 152 is present
-        if "152" in self.tuyastatus:
-            self._attr_cmd_dps_raw = "152"
+        if changed is None:
+            _LOGGER.debug("Updating entity values from data points: %s", self.tuyastatus)
+        elif _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Updating entity values from changed data points: %s",
+                {code: self.tuyastatus.get(code) for code in sorted(changed)},
+            )
+
+        for codes, handler in self._get_update_handlers():
+            if changed is None or not codes.isdisjoint(changed):
+                handler()
 
-        # Update common attributes for all models
-        self._update_battery_level()
-        self._update_state_and_error()
-        self._update_mode_and_fan_speed()
+    def _get_update_handlers(self) -> list[tuple[frozenset[str], Callable[[], None]]]:
+        """Get the attribute update methods and the DPS codes each one reads.
 
-        # Update model-specific attributes
-        self._update_cleaning_stats()
+        The codes depend only on the model, so they are looked up once. Each
+        set names the same codes its method reads, which are the L60 SES
+        codes from TuyaCodes unless the method looks them up per model.
+
+        Returns:
+            A list of (codes, method) pairs.
+        """
+        if self._update_handlers is None:
+            self._update_handlers = [
+                (frozenset((TuyaCodes.BATTERY_LEVEL,)), self._update_battery_level),
+                (
+                    frozenset((TuyaCodes.STATUS, TuyaCodes.ERROR_CODE)),
+                    self._update_state_and_error,
+                ),
+                (
+                    frozenset((TuyaCodes.MODE, TuyaCodes.FAN_SPEED)),
+                    self._update_mode_and_fan_speed,
+                ),
+                (
+                    frozenset(
+                        (
+                            self._get_dps_code("CLEANING_AREA"),
+                            self._get_dps_code("CLEANING_TIME"),
+                            self._get_dps_code("AUTO_RETURN"),
+                            TuyaCodes.DO_NOT_DISTURB,
+                            TuyaCodes.BOOST_IQ,
+                        )
+                    ),
+                    self._update_cleaning_stats,
+                ),
+                (frozenset((TuyaCodes.CONSUMABLES,)), self._update_consumables),
+            ]
+        return self._update_handlers
 
     def _get_dps_code(self, code_name: str) -> str:
         """Get the DPS code for a specific function.
@@ -673,6 +715,10 @@ class RoboVacEntity(StateVacuumEntity):
             _LOGGER.warning("No tuyastatus available in _update_mode_and_fan_speed")
             return
 
+        # Preserve cmd_dps_raw if 152 is present
+        if "152" in self.tuyastatus:
+            self._attr_cmd_dps_raw = "152"
+
         # Get mode and fan speed from data points using hardcoded DPS
         mode = self.tuyastatus.get("152")
         fan_speed = self.tuyastatus.get("158")
@@ -711,8 +757,6 @@ class RoboVacEntity(StateVacuumEntity):
         """Update cleaning statistics (area and time)."""
         if self.tuyastatus is None:
             return
-            
-        self._log_all_dps_codes()  # Logs all DPS codes received from the vacuum
 
         # Keep dynamic lookup for unknown codes
         cleaning_area = self.tuyastatus.get(self._get_dps_code("CLEANING_AREA"))
@@ -733,6 +777,8 @@ class RoboVacEntity(StateVacuumEntity):
             boost_iq = self.tuyastatus.get(159)
             self._attr_boost_iq = str(boost_iq) if boost_iq is not None else None
 
+    def _update_consumables(self) -> None:
+        """Update the consumables attribute."""
         # Handle consumables with hardcoded DPS
         if (
             isinstance(self.robovac_supported, int)
@@ -757,15 +803,6 @@ class RoboVacEntity(StateVacuumEntity):
                                 self._attr_consumables = consumables["consumable"]["duration"]
                         except Exception as e:
                             _LOGGER.warning("Failed to decode consumable data: %s", str(e))
-                            
-    def _log_all_dps_codes(self) -> None:
-        """Log all DPS codes and values for inspection."""
-        if self.tuyastatus is None:
-            _LOGGER.warning("No tuyastatus available to log.")
-            return
-
-        for dps_code, value in self.tuyastatus.items():
-            _LOGGER.debug(f"DPS code {dps_code}: {value}")
 
     async def async_locate(self, **kwargs: Any) -> None:
         """Locate the vacuum cleaner.
@@ -795,7 +832,7 @@ class RoboVacEntity(StateVacuumEntity):
             return
 
         await self.vacuum.async_set({
-            152: "AggG"  # Send 'return to dock' as a MODE command
+            TuyaCodes.MODE: go_home_command()
         })
 
     async def async_start(self, **kwargs: Any) -> None:
@@ -809,9 +846,9 @@ class RoboVacEntity(StateVacuumEntity):
         dps_key = self._get_dps_code("MODE")
         self._attr_cmd_dps_raw = dps_key
 
-        _LOGGER.debug("Sending hardcoded L60 SES start command")
+        _LOGGER.debug("Sending L60 SES start command")
         await self.vacuum.async_set({
-            dps_key: "BBoCCAE="
+            dps_key: auto_clean_command()
         })
 
     async def async_pause(self, **kwargs: Any) -> None:
@@ -822,7 +859,7 @@ class RoboVacEntity(StateVacuumEntity):
 
         _LOGGER.debug("Sending pause command to vacuum")
         await self.vacuum.async_set({
-            "152": "AggN"
+            TuyaCodes.MODE: pause_command()
         })
 
     async def async_stop(self, **kwargs: Any) -> None:
@@ -832,9 +869,10 @@ class RoboVacEntity(StateVacuumEntity):
             _LOGGER.error("Cannot stop vacuum: vacuum not initialized")
             return
 
+        # The L60 SES stops by pausing the current task
         _LOGGER.debug("Sending stop command to vacuum")
         await self.vacuum.async_set({
-           "152": "AggN"
+            TuyaCodes.MODE: pause_command()
         })
 
     async def async_clean_spot(self, **kwargs: Any) -> None:
@@ -846,7 +884,7 @@ class RoboVacEntity(StateVacuumEntity):
 
         _LOGGER.debug("Sending spot clean command to vacuum")
         await self.vacuum.async_set({
-            "152": "AA=="
+            TuyaCodes.MODE: encode_mode_command(ModeCommand())
         })
 
     async def async_set_fan_speed(self, fan_speed: str, **kwargs: Any) -> None:
@@ -930,21 +968,7 @@ class RoboVacEntity(StateVacuumEntity):
         elif command == "roomClean" and params is not None and isinstance(params, dict):
             room_ids = params.get("roomIds", [1])
             count = params.get("count", 1)
-            clean_request = {"roomIds": room_ids, "cleanTimes": count}
-            method_call = {
-                "method": "selectRoomsClean",
-                "data": clean_request,
-                "timestamp": round(time.time() * 1000),
-            }
-            json_str = json.dumps(method_call, separators=(",", ":"))
-            base64_str = base64.b64encode(json_str.encode("utf8")).decode("utf8")
-            _LOGGER.info("roomClean call %s", json_str)
-            await self.vacuum.async_set({TuyaCodes.ROOM_CLEAN: base64_str})
-
-    async def async_will_remove_from_hass(self) -> None:
-        """Handle removal from Home Assistant."""
-        if self.vacuum is None:
-            _LOGGER.debug("Cannot disable vacuum: vacuum not initialized")
-            return
-
-        await self.vacuum.async_disable()
+            _LOGGER.info("roomClean call for rooms %s, %s times", room_ids, count)
+            await self.vacuum.async_set({
+                TuyaCodes.MODE: room_clean_command(room_ids, count)
+            })
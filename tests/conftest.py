@@ -2,8 +2,9 @@
 
 import os
 import sys
+from types import MappingProxyType
 import pytest
-from unittest.mock import MagicMock, patch, AsyncMock
+from unittest.mock import MagicMock, patch, AsyncMock, PropertyMock
 
 # Add the project root directory to the Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -25,6 +26,18 @@ from homeassistant.const import (
 from custom_components.robovac.vacuums.base import RoboVacEntityFeature
 
 
+def _track_dps(mock):
+    """Serve a mock device's state from whatever dict is in its _dps.
+
+    Tests replace _dps wholesale, so the snapshot is taken on every read. The
+    device reports no state version, so entities recompute every attribute on
+    every update.
+    """
+    mock._dps = {}
+    type(mock).state = PropertyMock(side_effect=lambda: MappingProxyType(mock._dps))
+    mock.state_version = None
+
+
 # This fixture is required for testing custom components
 @pytest.fixture(autouse=True)
 def auto_enable_custom_integrations(enable_custom_integrations):
@@ -53,7 +66,7 @@ def mock_robovac():
         RoboVacEntityFeature.EDGE | RoboVacEntityFeature.SMALL_ROOM
     )
     mock.getFanSpeeds.return_value = ["No Suction", "Standard", "Boost IQ", "Max"]
-    mock._dps = {}
+    _track_dps(mock)
 
     # Set up async methods with AsyncMock
     mock.async_get = AsyncMock(return_value=mock._dps)
@@ -63,6 +76,16 @@ def mock_robovac():
     return mock
 
 
+@pytest.fixture
+def mock_coordinator(mock_robovac):
+    """Create a mock coordinator that owns the mock RoboVac device."""
+    coordinator = MagicMock()
+    coordinator.vacuum = mock_robovac
+    coordinator.data = mock_robovac.state
+    coordinator.last_update_success = True
+    return coordinator
+
+
 @pytest.fixture
 def mock_g30():
     """Create a mock G30 RoboVac device."""
@@ -84,7 +107,7 @@ def mock_g30():
         RoboVacEntityFeature.EDGE | RoboVacEntityFeature.SMALL_ROOM
     )
     mock.getFanSpeeds.return_value = ["No Suction", "Standard", "Boost IQ", "Max"]
-    mock._dps = {}
+    _track_dps(mock)
 
     # Set up async methods with AsyncMock
     mock.async_get = AsyncMock(return_value=mock._dps)
@@ -142,7 +165,7 @@ def mock_l60():
         RoboVacEntityFeature.DO_NOT_DISTURB | RoboVacEntityFeature.BOOST_IQ
     )
     mock.getFanSpeeds.return_value = ["No Suction", "Standard", "Boost IQ", "Max"]
-    mock._dps = {}
+    _track_dps(mock)
 
     # Set up model-specific DPS codes for L60 (T2278)
     mock.getDpsCodes.return_value = {
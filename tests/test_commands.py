@@ -0,0 +1,99 @@
+"""Tests for the L60 SES mode command encoder."""
+
+import pytest
+
+from custom_components.robovacl60.commands import (
+    auto_clean_command,
+    encode_mode_command,
+    go_home_command,
+    pause_command,
+    resume_command,
+    room_clean_command,
+    stop_command,
+    write_varint,
+    zone_clean_command,
+)
+from custom_components.robovacl60.proto import (
+    ModeCommand,
+    ModeMethod,
+    Point,
+    Zone,
+    decode_mode_command,
+    read_varint,
+)
+
+
+def test_commands_match_known_device_values():
+    """Test the encoder produces the values the vacuum is known to accept."""
+    assert auto_clean_command() == "BBoCCAE="
+    assert pause_command() == "AggN"
+    assert resume_command() == "AggO"
+    assert stop_command() == "AggM"
+    assert go_home_command() == "AggG"
+    assert encode_mode_command(ModeCommand()) == "AA=="
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        ModeCommand(),
+        ModeCommand(clean_times=2),
+        ModeCommand(method=ModeMethod.PAUSE_TASK),
+        ModeCommand(method=ModeMethod.START_SELECT_ROOMS_CLEAN, clean_times=1, room_ids=(4,)),
+        ModeCommand(
+            method=ModeMethod.START_SELECT_ROOMS_CLEAN,
+            clean_times=3,
+            room_ids=(300, 2, 17),
+            map_id=9,
+        ),
+        ModeCommand(
+            method=ModeMethod.START_SELECT_ZONES_CLEAN,
+            zones=(
+                Zone((Point(-1500, 200), Point(0, 200), Point(0, -70000), Point(-1500, -70000))),
+                Zone((Point(1, 1), Point(2, 1), Point(2, 2), Point(1, 2)), clean_times=2),
+            ),
+        ),
+    ],
+)
+def test_round_trip(command):
+    """Test decoding an encoded command gives back the same command."""
+    assert decode_mode_command(encode_mode_command(command)) == command
+
+
+def test_room_and_zone_intents():
+    """Test the intent helpers build the expected commands."""
+    rooms = decode_mode_command(room_clean_command(["3", 5], clean_times=2))
+    assert rooms.method == ModeMethod.START_SELECT_ROOMS_CLEAN
+    assert rooms.room_ids == (3, 5)
+    assert rooms.clean_times == 2
+
+    [zone] = decode_mode_command(zone_clean_command([(-10, 20, 30, -40)])).zones
+    assert zone.corners == (Point(-10, 20), Point(30, 20), Point(30, -40), Point(-10, -40))
+
+
+def test_zone_needs_four_corners():
+    """Test a malformed zone is rejected rather than sent."""
+    with pytest.raises(ValueError):
+        encode_mode_command(
+            ModeCommand(
+                method=ModeMethod.START_SELECT_ZONES_CLEAN,
+                zones=(Zone((Point(0, 0),)),),
+            )
+        )
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**32 - 1, 2**63])
+def test_varint_round_trip(value):
+    """Test varints decode to the value they were encoded from."""
+    assert read_varint(write_varint(value), 0) == (value, len(write_varint(value)))
+
+
+def test_encoding_is_cached():
+    """Test each distinct command is only encoded once."""
+    encode_mode_command.cache_clear()
+
+    first = room_clean_command([1, 2])
+    second = room_clean_command((1, 2))
+
+    assert first is second
+    assert encode_mode_command.cache_info().hits == 1
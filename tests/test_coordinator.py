@@ -0,0 +1,97 @@
+"""Tests for the RoboVac data update coordinator."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_MODEL
+
+from custom_components.robovacl60.const import DOMAIN
+from custom_components.robovacl60.coordinator import RoboVacCoordinator
+from custom_components.robovacl60.tuyalocalapi import TuyaException
+
+
+@pytest.fixture
+async def coordinator(hass, mock_robovac, mock_vacuum_data):
+    """Create a coordinator around a mock RoboVac, and shut it down afterwards."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    with patch(
+        "custom_components.robovacl60.coordinator.RoboVac", return_value=mock_robovac
+    ):
+        coordinator = RoboVacCoordinator(hass, entry, mock_vacuum_data)
+    yield coordinator
+    await coordinator.async_shutdown()
+
+
+async def test_push_updates_listeners_immediately(coordinator, mock_robovac):
+    """Test pushed state reaches every listener without a poll."""
+    listeners = [MagicMock(), MagicMock()]
+    unsubscribes = [coordinator.async_add_listener(listener) for listener in listeners]
+    mock_robovac._dps["163"] = 80
+
+    await coordinator.async_pushed_update()
+
+    for unsubscribe in unsubscribes:
+        unsubscribe()
+    for listener in listeners:
+        listener.assert_called_once()
+    assert coordinator.data == {"163": 80}
+    mock_robovac.async_get.assert_not_called()
+
+
+async def test_poll_skipped_while_pushes_are_fresh(coordinator, mock_robovac):
+    """Test a refresh right after a push does not send a GET."""
+    await coordinator.async_pushed_update()
+
+    await coordinator.async_refresh()
+
+    mock_robovac.async_get.assert_not_called()
+
+
+async def test_polls_when_no_push_arrived(coordinator, mock_robovac):
+    """Test the device is polled once when it has not pushed anything."""
+    mock_robovac._dps["163"] = 55
+
+    await coordinator.async_refresh()
+
+    mock_robovac.async_get.assert_awaited_once()
+    assert coordinator.data == {"163": 55}
+
+
+async def test_poll_failure_is_reported(coordinator, mock_robovac):
+    """Test a failed poll marks the update as failed."""
+    mock_robovac.async_get.side_effect = TuyaException("timed out")
+
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success is False
+
+
+async def test_shutdown_disables_vacuum(coordinator, mock_robovac):
+    """Test shutting down the coordinator disconnects the vacuum."""
+    await coordinator.async_shutdown()
+
+    mock_robovac.async_disable.assert_awaited_once()
+
+
+async def test_offline_vacuum_fails_the_update(hass, mock_vacuum_data):
+    """Test a poll of an unreachable vacuum marks the update as failed."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    item = {
+        **mock_vacuum_data,
+        CONF_MODEL: "T2277",
+        CONF_ACCESS_TOKEN: "0123456789abcdef",
+    }
+    coordinator = RoboVacCoordinator(hass, entry, item)
+    coordinator.vacuum._async_sleep = AsyncMock()
+
+    try:
+        with patch("asyncio.open_connection", side_effect=OSError("unreachable")):
+            await coordinator.async_refresh()
+
+        assert coordinator.last_update_success is False
+    finally:
+        await coordinator.async_shutdown()
@@ -0,0 +1,142 @@
+"""Tests for the L60 SES protobuf decoders."""
+
+import base64
+
+import pytest
+
+from custom_components.robovacl60.proto import (
+    ModeMethod,
+    Point,
+    ProtobufDecodeError,
+    WorkState,
+    decode_mode_command,
+    decode_work_status,
+    read_varint,
+    unpack_dps,
+)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Encode a length-delimited field with a short payload."""
+    return bytes([number << 3 | 2, len(payload)]) + payload
+
+
+def _dps(message: bytes) -> str:
+    """Encode a message as a length-prefixed base64 DPS value."""
+    return base64.b64encode(bytes([len(message)]) + message).decode()
+
+
+@pytest.mark.parametrize(
+    "raw,label",
+    [
+        ("BgoAEAUyAA==", "cleaning"),
+        ("BgoAEAVSAA==", "position"),
+        ("CAoAEAUyAggB", "paused"),
+        ("CAoCCAEQBTIA", "cleaning"),
+        ("CAoCCAEQBVIA", "position"),
+        ("CgoCCAEQBTICCAE=", "paused"),
+        ("CAoCCAIQBTIA", "cleaning"),
+        ("CAoCCAIQBVIA", "position"),
+        ("CgoCCAIQBTICCAE=", "paused"),
+        ("BAoAEAY=", "start_manual"),
+        ("BBAHQgA=", "returning"),
+        ("BBADGgA=", "charging"),
+        ("BhADGgIIAQ==", "idle"),
+        ("AA==", "standby"),
+        ("AhAB", "sleeping"),
+    ],
+)
+def test_known_work_statuses(raw, label):
+    """Test every status the integration used to look up decodes the same."""
+    assert decode_work_status(raw).label == label
+
+
+def test_work_status_fields():
+    """Test the structured fields of a paused room clean."""
+    status = decode_work_status("CgoCCAEQBTICCAE=")
+
+    assert status.mode == 1
+    assert status.state == WorkState.CLEANING
+    assert status.cleaning_state == 1
+    assert status.paused is True
+    assert status.relocating is False
+
+
+def test_unseen_work_statuses_decode():
+    """Test states missing from the old lookup table no longer fall to unknown."""
+    assert decode_work_status(_dps(b"\x10\x02")).label == "error"
+    assert decode_work_status(_dps(b"\x10\x08")).label == "cruising"
+    assert decode_work_status(_dps(b"\x10\x07" + _field(8, b"\x08\x01"))).label == "paused"
+    assert decode_work_status(_dps(b"\x10\x63")).label == "99"
+
+
+@pytest.mark.parametrize(
+    "raw,label,method",
+    [
+        ("BBoCCAE=", "auto", ModeMethod.START_AUTO_CLEAN),
+        ("AggN", "pause", ModeMethod.PAUSE_TASK),
+        ("AA==", "auto", ModeMethod.START_AUTO_CLEAN),
+        ("AggG", "home", ModeMethod.START_GOHOME),
+        ("AggO", "auto", ModeMethod.RESUME_TASK),
+        ("AggB", "room", ModeMethod.START_SELECT_ROOMS_CLEAN),
+        ("AggC", "zone", ModeMethod.START_SELECT_ZONES_CLEAN),
+        ("AggM", "auto", ModeMethod.STOP_TASK),
+    ],
+)
+def test_known_mode_commands(raw, label, method):
+    """Test every mode the integration used to look up decodes the same."""
+    command = decode_mode_command(raw)
+    assert command.label == label
+    assert command.method == method
+
+
+def test_room_clean_command():
+    """Test room ids, clean count and map id are decoded."""
+    rooms = _field(1, b"\x08\x03") + _field(1, b"\x08\x05") + b"\x10\x02\x18\x07"
+    command = decode_mode_command(_dps(b"\x08\x01" + _field(4, rooms)))
+
+    assert command.room_ids == (3, 5)
+    assert command.clean_times == 2
+    assert command.map_id == 7
+
+
+def test_zone_clean_command():
+    """Test zone corners, including negative coordinates, are decoded."""
+    corners = [(-10, 20), (30, 20), (30, -40), (-10, -40)]
+    zigzag = lambda value: (value << 1) ^ (value >> 31)  # noqa: E731
+    quadrangle = b"".join(
+        _field(number, bytes([8, zigzag(x), 16, zigzag(y)]))
+        for number, (x, y) in enumerate(corners, start=1)
+    )
+    zone = _field(1, quadrangle) + b"\x10\x02"
+    command = decode_mode_command(_dps(b"\x08\x02" + _field(5, _field(1, zone))))
+
+    [decoded] = command.zones
+    assert decoded.corners == tuple(Point(x, y) for x, y in corners)
+    assert decoded.clean_times == 2
+
+
+@pytest.mark.parametrize("raw", ["not base64!", "BAoA", "/w==", "AgoF"])
+def test_invalid_values_decode_to_none(raw):
+    """Test malformed payloads are reported as undecodable, not raised."""
+    assert decode_work_status(raw) is None
+    assert decode_mode_command(raw) is None
+
+
+def test_truncated_varint_raises():
+    """Test reading a varint past the end of the buffer fails."""
+    with pytest.raises(ProtobufDecodeError):
+        read_varint(b"\x80", 0)
+    with pytest.raises(ProtobufDecodeError):
+        unpack_dps("")
+
+
+def test_decoding_is_memoised():
+    """Test repeated values are served from the cache."""
+    decode_work_status.cache_clear()
+
+    first = decode_work_status("BBADGgA=")
+    second = decode_work_status("BBADGgA=")
+
+    assert first is second
+    assert decode_work_status.cache_info().hits == 1
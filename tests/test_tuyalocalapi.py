@@ -0,0 +1,968 @@
+"""Tests for the Tuya local API protocol helpers."""
+
+import asyncio
+import gc
+import json
+import random
+import socket
+import struct
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.padding import PKCS7
+
+from custom_components.robovacl60.tuyalocalapi import (
+    AckTimeoutException,
+    MAGIC_PREFIX,
+    MAGIC_SUFFIX,
+    MAGIC_SUFFIX_BYTES,
+    MESSAGE_PREFIX_FORMAT,
+    MESSAGE_SUFFIX_FORMAT,
+    ConnectionException,
+    FrameDecoder,
+    InvalidMessage,
+    Message,
+    MessageExpiredException,
+    MessageQueue,
+    OverflowPolicy,
+    PendingResponses,
+    QueueFullException,
+    ResponseTimeoutException,
+    TuyaCipher,
+    TuyaDevice,
+    TuyaException,
+    build_frames,
+    crc,
+    crc_python,
+)
+from custom_components.robovacl60.tuyatimers import TimingWheel
+
+
+def _frame(sequence: int, payload: bytes, command: int = 0x08) -> bytes:
+    """Build a raw frame with a valid header, CRC and suffix."""
+    header = struct.pack(
+        MESSAGE_PREFIX_FORMAT, MAGIC_PREFIX, sequence, command, len(payload) + 8
+    )
+    checksum = crc(header + payload)
+    return header + payload + struct.pack(MESSAGE_SUFFIX_FORMAT, checksum, MAGIC_SUFFIX)
+
+
+@pytest.fixture
+async def tuya_device():
+    """Create a TuyaDevice that is never connected to a real vacuum."""
+    device = TuyaDevice(
+        MagicMock(),
+        "test_device_id",
+        "192.0.2.1",
+        timeout=1,
+        ping_interval=10,
+        update_entity_state=AsyncMock(),
+        local_key="0123456789abcdef",
+    )
+    yield device
+    await device.async_disable()
+
+
+async def _run_pending_callbacks(rounds: int) -> None:
+    """Let other tasks run without relying on asyncio.sleep, which may be patched."""
+    loop = asyncio.get_running_loop()
+    for _ in range(rounds):
+        future = loop.create_future()
+        loop.call_soon(future.set_result, None)
+        await future
+
+
+def _crc_corpus() -> list[bytes]:
+    """Build a deterministic corpus of inputs covering typical frame shapes."""
+    rng = random.Random(0x55AA)
+    corpus = [b"", b"123456789", bytes(range(256)), b"\x00" * 1024, b"\xff" * 1024]
+    corpus.extend(bytes([value]) for value in range(256))
+    for size in (1, 2, 3, 4, 15, 16, 17, 31, 32, 33, 255, 256, 4096, 65535):
+        corpus.append(rng.randbytes(size))
+    for payload_size in (0, 16, 128, 1024, 16384):
+        header = struct.pack(
+            MESSAGE_PREFIX_FORMAT, MAGIC_PREFIX, rng.getrandbits(32), 0x08,
+            payload_size + 8,
+        )
+        corpus.append(header + rng.randbytes(payload_size))
+    return corpus
+
+
+@pytest.mark.parametrize("data", _crc_corpus())
+def test_crc_matches_reference_implementation(data):
+    """Test the zlib-backed CRC is bit-identical to the table-driven one."""
+    assert crc(data) == crc_python(data)
+
+
+def test_crc_known_check_value():
+    """Test the CRC against the standard CRC-32 check value."""
+    assert crc(b"123456789") == 0xCBF43926
+    assert crc_python(b"123456789") == 0xCBF43926
+
+
+def test_crc_accepts_buffer_views():
+    """Test the CRC accepts bytearray and memoryview slices without copying."""
+    data = bytearray(range(64))
+    view = memoryview(data)
+
+    assert crc(view[8:40]) == crc(bytes(data[8:40]))
+    assert crc(data) == crc(bytes(data))
+
+
+def test_frame_decoder_reassembles_byte_by_byte():
+    """Test frames split at every possible byte boundary are reassembled."""
+    frames = [_frame(1, b"first"), _frame(2, b""), _frame(3, b"x" * 300)]
+    decoder = FrameDecoder()
+    decoded = []
+
+    for byte in b"".join(frames):
+        decoder.feed(bytes([byte]))
+        decoded.extend(bytes(frame) for frame in decoder)
+
+    assert decoded == frames
+    assert len(decoder) == 0
+
+
+def test_frame_decoder_does_not_split_on_suffix_in_payload():
+    """Test a payload containing the magic suffix is kept in one frame."""
+    frame = _frame(7, b"abc" + MAGIC_SUFFIX_BYTES + b"def")
+    decoder = FrameDecoder()
+
+    decoder.feed(frame + frame)
+
+    assert [bytes(f) for f in decoder] == [frame, frame]
+
+
+def test_frame_decoder_resynchronises_after_garbage():
+    """Test the decoder skips junk and corrupt frames to the next prefix."""
+    good = _frame(9, b"payload")
+    corrupt = bytearray(_frame(8, b"broken"))
+    corrupt[-1] ^= 0xFF
+    decoder = FrameDecoder()
+
+    decoder.feed(b"\x01\x02\x03" + bytes(corrupt) + good)
+
+    assert [bytes(f) for f in decoder] == [good]
+    assert decoder.discarded == 3 + len(corrupt)
+
+
+def test_frame_decoder_returns_views_without_copying():
+    """Test frames are views that survive the next feed()."""
+    first, second = _frame(1, b"one"), _frame(2, b"two")
+    decoder = FrameDecoder()
+
+    decoder.feed(first + second[:10])
+    frame = decoder.next_frame()
+    decoder.feed(second[10:])
+
+    assert isinstance(frame, memoryview)
+    assert bytes(frame) == first
+    assert bytes(decoder.next_frame()) == second
+    assert decoder.next_frame() is None
+
+
+async def test_message_from_bytes_round_trip(tuya_device):
+    """Test an encrypted frame decodes back to the original payload."""
+    payload = {"devId": "test_device_id", "dps": {"152": "AggN", "163": 80}}
+    message = Message(
+        Message.GRATUITOUS_UPDATE, json.dumps(payload).encode("utf8"),
+        sequence=42, encrypt=True, device=tuya_device, expect_response=False,
+    )
+    data = message.to_bytes()
+
+    for buffer in (data, bytearray(data), memoryview(data)):
+        decoded = Message.from_bytes(tuya_device, buffer, tuya_device.cipher)
+        assert decoded.command == Message.GRATUITOUS_UPDATE
+        assert decoded.sequence == 42
+        assert decoded.payload == payload
+
+
+async def test_message_from_bytes_rejects_bad_crc(tuya_device):
+    """Test a frame with a corrupted payload fails the CRC check."""
+    message = Message(
+        Message.GET_COMMAND, b"{}", sequence=1, device=tuya_device,
+        expect_response=False,
+    )
+    data = bytearray(message.to_bytes())
+    data[20] ^= 0xFF
+
+    with pytest.raises(InvalidMessage):
+        Message.from_bytes(tuya_device, data, tuya_device.cipher)
+
+
+async def test_message_from_bytes_rejects_truncated_frame(tuya_device):
+    """Test a truncated frame raises InvalidMessage instead of struct.error."""
+    data = Message(Message.PING_COMMAND, sequence=0).to_bytes()
+
+    with pytest.raises(InvalidMessage):
+        Message.from_bytes(tuya_device, data[:18], tuya_device.cipher)
+
+
+async def test_message_to_bytes_matches_reference_layout(tuya_device):
+    """Test the single-buffer builder produces the documented frame layout."""
+    message = Message(
+        Message.SET_COMMAND, b'{"dps":{"158":"Max"}}', sequence=5,
+        encrypt=True, device=tuya_device, expect_response=False,
+    )
+    payload_data = message.encode_payload()
+
+    assert message.to_bytes() == _frame(5, payload_data, Message.SET_COMMAND)
+
+
+async def test_build_frames_renders_messages_back_to_back(tuya_device):
+    """Test several messages are rendered into one buffer in order."""
+    messages = [
+        Message(Message.PING_COMMAND, sequence=0, encrypt=True, device=tuya_device,
+                expect_response=False),
+        Message(Message.SET_COMMAND, b'{"dps":{"152":"AggN"}}', sequence=7,
+                encrypt=True, device=tuya_device, expect_response=False),
+    ]
+
+    buffer = build_frames(messages)
+    decoder = FrameDecoder()
+    decoder.feed(buffer)
+
+    assert isinstance(buffer, bytearray)
+    assert buffer == b"".join(message.to_bytes() for message in messages)
+    assert [
+        Message.from_bytes(tuya_device, frame, tuya_device.cipher).sequence
+        for frame in decoder
+    ] == [0, 7]
+
+
+LOCAL_KEY = "0123456789abcdef"
+
+
+def _reference_encrypt(data: bytes) -> bytes:
+    """Encrypt with a fresh context and padder, as the cipher used to."""
+    padder = PKCS7(128).padder()
+    padded = padder.update(data) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(LOCAL_KEY.encode("ascii")), modes.ECB()).encryptor()
+    return encryptor.update(padded) + encryptor.finalize()
+
+
+@pytest.mark.parametrize("size", [1, 15, 16, 17, 100, 4096])
+def test_cipher_matches_reference_encryption(size):
+    """Test the reused ECB context produces the same ciphertext every time."""
+    cipher = TuyaCipher(LOCAL_KEY, (3, 3))
+    data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+
+    for _ in range(3):
+        assert cipher.encrypt(Message.GET_COMMAND, data) == _reference_encrypt(data)
+        assert cipher.decrypt(Message.GET_COMMAND, _reference_encrypt(data)) == data
+
+
+@pytest.mark.parametrize("version", [(3, 1), (3, 3)])
+def test_cipher_round_trip_with_prefix(version):
+    """Test SET payloads round trip through the version prefix and hash."""
+    cipher = TuyaCipher(LOCAL_KEY, version)
+    data = b'{"dps":{"152":"AggN"}}'
+
+    encrypted = cipher.encrypt(Message.SET_COMMAND, data)
+
+    assert encrypted.startswith(b".".join(str(v).encode() for v in version))
+    assert cipher.decrypt(Message.SET_COMMAND, encrypted) == data
+
+
+def test_cipher_rejects_bad_input_without_corrupting_context():
+    """Test unaligned or badly padded data raises and leaves the cipher usable."""
+    cipher = TuyaCipher(LOCAL_KEY, (3, 3))
+    valid = cipher.encrypt(Message.GET_COMMAND, b"hello")
+
+    with pytest.raises(ValueError):
+        cipher.decrypt(Message.GET_COMMAND, valid[:-1])
+    with pytest.raises(ValueError):
+        cipher.decrypt(Message.GET_COMMAND, cipher._encryptor.update(b"\x00" * 16))
+
+    assert cipher.decrypt(Message.GET_COMMAND, valid) == b"hello"
+
+
+def test_cipher_batch_matches_single_messages():
+    """Test encrypt_many/decrypt_many agree with the per-message methods."""
+    cipher = TuyaCipher(LOCAL_KEY, (3, 3))
+    payloads = [b"a", b"", b"x" * 16, b'{"dps":{"163":100}}']
+
+    encrypted = cipher.encrypt_many(Message.SET_COMMAND, payloads)
+
+    assert encrypted == [cipher.encrypt(Message.SET_COMMAND, p) for p in payloads]
+    non_empty = [e for e, p in zip(encrypted, payloads) if p]
+    assert cipher.decrypt_many(Message.SET_COMMAND, non_empty) == [
+        p for p in payloads if p
+    ]
+
+
+async def test_constant_payloads_are_encrypted_once(tuya_device):
+    """Test ping and GET payloads are encoded once and reused per frame."""
+    with patch.object(
+        tuya_device.cipher, "encrypt", wraps=tuya_device.cipher.encrypt
+    ) as encrypt:
+        first = tuya_device._constant_message(Message.GET_COMMAND, b'{"gwId":"x"}')
+        second = tuya_device._constant_message(Message.GET_COMMAND, b'{"gwId":"x"}')
+        first_frame, second_frame = first.to_bytes(), second.to_bytes()
+
+    assert encrypt.call_count == 1
+    assert first_frame[16:-8] == second_frame[16:-8]
+    decoded = Message.from_bytes(tuya_device, second_frame, tuya_device.cipher)
+    assert decoded.sequence == second.sequence
+
+
+async def test_constant_payload_cache_follows_local_key(tuya_device):
+    """Test changing the local key drops payloads encrypted with the old key."""
+    before = tuya_device._constant_message(Message.GET_COMMAND, b"{}").encoded_payload
+
+    tuya_device.set_local_key("fedcba9876543210")
+    after = tuya_device._constant_message(Message.GET_COMMAND, b"{}").encoded_payload
+
+    assert before != after
+    assert tuya_device.cipher.decrypt(Message.GET_COMMAND, after) == b"{}"
+
+
+async def test_sequences_are_unique_within_the_same_millisecond(tuya_device):
+    """Test GETs created back to back get distinct sequence numbers."""
+    messages = [Message(Message.GET_COMMAND, device=tuya_device) for _ in range(100)]
+
+    assert len({message.sequence for message in messages}) == 100
+    assert tuya_device.pending_responses == 100
+
+
+async def test_sequence_counter_wraps_and_skips_zero(tuya_device):
+    """Test the per-device counter wraps at 32 bits without reusing 0."""
+    tuya_device._sequence = 0xFFFFFFFE
+
+    assert [tuya_device.next_sequence() for _ in range(3)] == [0xFFFFFFFF, 1, 2]
+
+
+async def test_pending_responses_resolve_and_sweep():
+    """Test responses resolve their future and expired waiters are swept."""
+    pending = PendingResponses()
+    now = time.monotonic()
+    answered = pending.register(1, deadline=now + 100)
+    expired = pending.register(2, deadline=now + 50)
+    response = Message(Message.GET_COMMAND, sequence=1)
+
+    assert pending.resolve(1, response) is True
+    assert pending.resolve(1, response) is False
+    assert answered.result() is response
+
+    assert pending.sweep(now=now + 60) == 1
+    assert len(pending) == 0
+    with pytest.raises(ResponseTimeoutException):
+        expired.result()
+
+
+async def test_async_receive_removes_waiter_on_timeout(tuya_device):
+    """Test a GET that times out doesn't leave its waiter behind."""
+    tuya_device._connected = True
+    tuya_device.timeout = 0.01
+    message = Message(Message.GET_COMMAND, device=tuya_device)
+
+    with pytest.raises(ResponseTimeoutException):
+        await tuya_device.async_receive(message)
+
+    assert tuya_device.pending_responses == 0
+
+
+async def test_dispatch_resolves_waiting_request(tuya_device):
+    """Test a received response is handed to the matching request."""
+    tuya_device._connected = True
+    request = Message(Message.GET_COMMAND, device=tuya_device)
+    response = Message(Message.GET_COMMAND, {"dps": {}}, sequence=request.sequence)
+
+    receive = asyncio.create_task(tuya_device.async_receive(request))
+    await asyncio.sleep(0)
+    await tuya_device._async_dispatch_message(response)
+
+    assert await receive is response
+    assert tuya_device.pending_responses == 0
+
+
+async def test_queue_consumer_does_not_wake_while_idle(tuya_device):
+    """Test the queue consumer sleeps until a message is queued."""
+    await asyncio.sleep(0)
+    wakeups = tuya_device.queue_wakeups
+
+    await asyncio.sleep(0.35)
+
+    assert tuya_device.queue_wakeups == wakeups
+
+
+async def test_queue_consumer_sends_as_soon_as_message_is_queued(tuya_device):
+    """Test queued messages are sent without waiting for a polling tick."""
+    sent = asyncio.Event()
+    tuya_device._async_send_many = AsyncMock(side_effect=lambda messages: sent.set())
+    await asyncio.sleep(0)
+
+    tuya_device._enqueue(
+        Message(Message.SET_COMMAND, b"{}", device=tuya_device, expect_response=False)
+    )
+
+    await asyncio.wait_for(sent.wait(), timeout=0.05)
+    assert tuya_device.queue_wakeups == 1
+
+
+async def test_queue_consumer_backs_off_after_repeated_failures(tuya_device):
+    """Test the backoff semantics survive the move to an event-driven queue."""
+    tuya_device._async_send_many = AsyncMock(side_effect=OSError("unreachable"))
+    tuya_device.max_batch_frames = 1
+
+    with patch("asyncio.sleep", AsyncMock()) as sleep:
+        for _ in range(5):
+            tuya_device._enqueue(
+                Message(Message.SET_COMMAND, b"{}", device=tuya_device,
+                        expect_response=False)
+            )
+        await _run_pending_callbacks(20)
+
+    assert tuya_device._failures == 5
+    assert tuya_device._backoff is True
+    assert [call.args[0] for call in sleep.await_args_list] == [
+        0.1, 0.1, 0.1, 5, pytest.approx(5 * 1.70224)
+    ]
+
+
+async def test_message_queue_sends_commands_before_state_requests_and_pings():
+    """Test a queued SET jumps ahead of queued GETs and pings."""
+    queue = MessageQueue()
+    ping = queue.push(Message(Message.PING_COMMAND))
+    get = queue.push(Message(Message.GET_COMMAND))
+    first_set = queue.push(Message(Message.SET_COMMAND, b"1"))
+    second_set = queue.push(Message(Message.SET_COMMAND, b"2"))
+
+    assert [queue.pop() for _ in range(4)] == [first_set, second_set, get, ping]
+    assert queue.pop() is None
+    assert len(queue) == 0
+
+
+async def test_message_queue_collapses_duplicate_pings_and_gets():
+    """Test identical pending pings and GETs are only sent once."""
+    queue = MessageQueue()
+    ping = queue.push(Message(Message.PING_COMMAND))
+    get = queue.push(Message(Message.GET_COMMAND))
+
+    assert queue.push(Message(Message.PING_COMMAND)) is ping
+    assert queue.push(Message(Message.GET_COMMAND)) is get
+    assert len(queue) == 2
+
+    assert queue.pop() is get
+    assert queue.push(Message(Message.GET_COMMAND)) is not get
+
+
+async def test_message_queue_fails_expired_messages():
+    """Test expired messages are skipped and their send handles fail."""
+    queue = MessageQueue()
+    expired = queue.push(Message(Message.SET_COMMAND, b"1", ttl=0))
+    live = queue.push(Message(Message.SET_COMMAND, b"2"))
+
+    assert queue.pop() is live
+    with pytest.raises(MessageExpiredException):
+        await expired.sent
+
+    expired = queue.push(Message(Message.GET_COMMAND, ttl=0))
+    assert queue.purge_expired() == 1
+    assert len(queue) == 0
+    with pytest.raises(MessageExpiredException):
+        await expired.sent
+
+
+def _set(*codes, value=0):
+    """Build a SET message writing the given DPS."""
+    return Message(
+        Message.SET_COMMAND, {"dps": {code: value for code in codes}}, encrypt=True
+    )
+
+
+async def test_full_queue_drops_oldest_message():
+    """Test DROP_OLDEST makes room by failing the oldest droppable message."""
+    queue = MessageQueue(max_depth=2)
+    oldest = queue.push(_set("158"))
+    newer = queue.push(_set("159"))
+    newest = queue.push(_set("160"))
+
+    with pytest.raises(QueueFullException):
+        await oldest.sent
+    assert [queue.pop(), queue.pop()] == [newer, newest]
+
+    # A ping never pushes out a more important command.
+    queue.push(_set("158"))
+    queue.push(_set("159"))
+    with pytest.raises(QueueFullException):
+        queue.push(Message(Message.PING_COMMAND))
+    assert queue.metrics == {"depth": 2, "high_water": 2, "dropped": 1, "rejected": 1}
+
+
+async def test_full_queue_drops_duplicate_kind():
+    """Test DROP_DUPLICATE_KIND replaces a queued SET of the same DPS."""
+    queue = MessageQueue(max_depth=2, overflow_policy=OverflowPolicy.DROP_DUPLICATE_KIND)
+    stale = queue.push(_set("158", value=1))
+    other = queue.push(_set("152", "153"))
+    fresh = queue.push(_set("158", value=2))
+
+    with pytest.raises(QueueFullException):
+        await stale.sent
+    assert [queue.pop(), queue.pop()] == [other, fresh]
+
+    queue.push(_set("158"))
+    queue.push(_set("152", "153"))
+    with pytest.raises(QueueFullException):
+        queue.push(_set("152"))
+    assert queue.dropped == 1
+    assert queue.rejected == 1
+
+
+async def test_full_queue_rejects_new_messages_after_purging_expired():
+    """Test REJECT_NEW keeps queued messages, but expired ones still make room."""
+    queue = MessageQueue(max_depth=1, overflow_policy=OverflowPolicy.REJECT_NEW)
+    queue.push(Message(Message.SET_COMMAND, b"1", ttl=0))
+    kept = queue.push(Message(Message.SET_COMMAND, b"2"))
+
+    with pytest.raises(QueueFullException):
+        queue.push(Message(Message.SET_COMMAND, b"3"))
+    assert queue.pop() is kept
+    assert queue.metrics == {"depth": 0, "high_water": 1, "dropped": 0, "rejected": 1}
+
+
+async def test_messages_rejected_by_full_queue_fail_their_callers(tuya_device):
+    """Test SETs, GETs and pings that do not fit in the queue fail cleanly."""
+    tuya_device._queue_event.set = MagicMock()
+    tuya_device._queue.max_depth = 0
+    tuya_device._queue.overflow_policy = OverflowPolicy.REJECT_NEW
+
+    sent = await tuya_device.async_set({"158": "Max"})
+    await _run_pending_callbacks(2)
+
+    with pytest.raises(QueueFullException):
+        await sent
+    with pytest.raises(QueueFullException):
+        await tuya_device.async_get()
+    assert tuya_device._send_ping() is False
+    assert tuya_device.queue_metrics["rejected"] == 3
+    assert tuya_device.pending_responses == 0
+
+
+async def test_rejected_set_with_discarded_handle_is_not_logged(tuya_device):
+    """Test a rejected SET nobody awaits does not log an unretrieved exception."""
+    loop = asyncio.get_running_loop()
+    handler = MagicMock()
+    loop.set_exception_handler(handler)
+    tuya_device._queue_event.set = MagicMock()
+    tuya_device._queue.max_depth = 0
+    tuya_device._queue.overflow_policy = OverflowPolicy.REJECT_NEW
+
+    try:
+        await tuya_device.async_set({"158": "Max"})
+        await _run_pending_callbacks(2)
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    handler.assert_not_called()
+
+
+async def test_async_set_returns_handle_resolved_on_send(tuya_device):
+    """Test the SET handle resolves once the consumer has sent it."""
+    tuya_device._async_send_many = AsyncMock()
+    await asyncio.sleep(0)
+
+    sent = await tuya_device.async_set({"152": "AA=="})
+
+    await asyncio.wait_for(sent, timeout=0.05)
+    tuya_device._async_send_many.assert_awaited_once()
+
+
+def _mock_streams() -> tuple[asyncio.StreamReader, MagicMock]:
+    """Create the streams of a connection that is open but never sends data."""
+    writer = MagicMock()
+    writer.wait_closed = AsyncMock()
+    return asyncio.StreamReader(), writer
+
+
+async def test_connect_does_not_block_event_loop(tuya_device):
+    """Test a connection attempt that never completes leaves the loop responsive."""
+    lag = 0.0
+    connecting = True
+
+    async def measure_lag() -> None:
+        nonlocal lag
+        while connecting:
+            started = time.monotonic()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.monotonic() - started - 0.01)
+
+    async def never_connect(host, port):
+        await asyncio.Event().wait()
+
+    tuya_device.timeout = 0.1
+    monitor = asyncio.create_task(measure_lag())
+    try:
+        with patch("asyncio.open_connection", side_effect=never_connect):
+            with pytest.raises(ConnectionException):
+                await tuya_device.async_connect()
+    finally:
+        connecting = False
+        await monitor
+
+    # a blocking connect would stall the loop for the whole 0.1s timeout
+    assert lag < 0.05
+    assert tuya_device._connected is False
+
+
+async def test_concurrent_connects_open_one_connection(tuya_device):
+    """Test concurrent callers share a single connection attempt."""
+    reader, writer = _mock_streams()
+    sock = writer.get_extra_info.return_value
+    tuya_device._ping_task = MagicMock()
+
+    with patch(
+        "asyncio.open_connection", AsyncMock(return_value=(reader, writer))
+    ) as opener:
+        await asyncio.gather(*(tuya_device.async_connect() for _ in range(5)))
+    await _run_pending_callbacks(5)
+
+    try:
+        assert opener.await_count == 1
+        assert tuya_device._connected is True
+        assert tuya_device.connect_latency is not None
+        writer.get_extra_info.assert_called_with("socket")
+        sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    finally:
+        await tuya_device.async_disconnect()
+
+
+async def test_device_runs_fixed_set_of_supervised_tasks(tuya_device):
+    """Test the device keeps one task per role and cancels them all on disable."""
+    reader, writer = _mock_streams()
+    assert tuya_device.live_tasks == 1
+
+    with patch("asyncio.open_connection", AsyncMock(return_value=(reader, writer))):
+        await tuya_device.async_connect()
+    await _run_pending_callbacks(5)
+    assert tuya_device.live_tasks == 3
+
+    await tuya_device.async_disconnect()
+    await _run_pending_callbacks(5)
+    assert tuya_device.live_tasks == 2
+    writer.close.assert_called_once()
+
+    await tuya_device.async_disable()
+    assert tuya_device.live_tasks == 0
+
+
+async def test_connect_and_get_run_as_supervised_tasks(tuya_device, caplog):
+    """Test shared connect and GET attempts are counted and cancelled on disable."""
+    async def never_connect(host, port):
+        await asyncio.Event().wait()
+
+    with patch("asyncio.open_connection", side_effect=never_connect):
+        connect = asyncio.create_task(tuya_device.async_connect())
+        get = asyncio.create_task(tuya_device.async_get())
+        await _run_pending_callbacks(5)
+        assert tuya_device.live_tasks == 3
+
+        await tuya_device.async_disable()
+
+    assert tuya_device.live_tasks == 0
+    for caller in (connect, get):
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+    assert "failed" not in caplog.text
+
+
+async def test_keepalive_does_not_ping_while_traffic_flows(tuya_device):
+    """Test inbound frames count as proof of liveness."""
+    tuya_device.last_received = time.monotonic()
+
+    delay = tuya_device._keepalive()
+
+    assert 0 < delay <= tuya_device.ping_interval
+    assert tuya_device.pings_sent == 0
+    assert len(tuya_device._queue) == 0
+
+
+async def test_keepalive_interval_grows_while_pings_are_answered(tuya_device):
+    """Test an idle but stable link is pinged less and less often."""
+    tuya_device._async_send_many = AsyncMock()
+
+    assert tuya_device._keepalive() == tuya_device.timeout
+    assert tuya_device.pings_sent == 1
+
+    tuya_device.last_received = time.monotonic()
+    tuya_device._keepalive()
+
+    assert tuya_device.keepalive_interval == 15
+    for _ in range(10):
+        tuya_device._ping_sent_at = tuya_device.last_received
+        tuya_device._keepalive()
+    assert tuya_device.keepalive_interval == tuya_device.max_ping_interval == 60
+
+
+async def test_unanswered_ping_disconnects_and_resets_interval(tuya_device):
+    """Test a ping with no traffic after it drops the connection."""
+    tuya_device._async_send_many = AsyncMock()
+    tuya_device._connected = True
+    tuya_device.async_disconnect = AsyncMock()
+    tuya_device.keepalive_interval = 40
+
+    tuya_device._keepalive()
+    tuya_device._keepalive()
+    await _run_pending_callbacks(2)
+
+    tuya_device.async_disconnect.assert_awaited_once()
+    assert tuya_device.keepalive_interval == tuya_device.ping_interval
+
+
+async def test_received_frames_update_liveness(tuya_device):
+    """Test the reader records when a valid frame last arrived."""
+    reader = asyncio.StreamReader()
+    reader.feed_data(_frame(0, b"", command=Message.PING_COMMAND))
+    reader.feed_eof()
+    tuya_device.reader = reader
+    tuya_device._connected = True
+    before = time.monotonic()
+
+    await tuya_device._async_handle_message()
+
+    assert tuya_device.last_received >= before
+
+
+async def test_concurrent_gets_share_one_request(tuya_device):
+    """Test concurrent callers are answered by a single GET."""
+    tuya_device._connected = True
+    sent = []
+
+    async def answer(messages):
+        [message] = messages
+        sent.append(message)
+        await tuya_device._async_dispatch_message(
+            Message(Message.GET_COMMAND, {"dps": {"163": 90}}, sequence=message.sequence)
+        )
+
+    tuya_device._async_send_many = answer
+    results = await asyncio.gather(*(tuya_device.async_get() for _ in range(3)))
+
+    assert len(sent) == 1
+    assert results == [{"163": 90}] * 3
+    assert tuya_device.pending_responses == 0
+
+
+async def test_get_returns_fresh_state_without_request(tuya_device):
+    """Test max_age_ms accepts recently received state."""
+    tuya_device._async_send_many = AsyncMock()
+    await tuya_device.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 70}})
+    )
+
+    assert await tuya_device.async_get(max_age_ms=1000) == {"163": 70}
+    tuya_device._async_send_many.assert_not_called()
+
+    tuya_device.last_state_at -= 1
+    tuya_device._connected = False
+    with pytest.raises(ConnectionException):
+        await tuya_device.async_get(max_age_ms=500)
+    tuya_device._async_send_many.assert_awaited_once()
+
+
+async def test_get_from_offline_device_fails(tuya_device):
+    """Test a GET that cannot reach the device raises instead of returning stale state."""
+    tuya_device._async_sleep = AsyncMock()
+
+    with patch("asyncio.open_connection", side_effect=OSError("unreachable")):
+        with pytest.raises(TuyaException):
+            await tuya_device.async_get()
+
+    assert tuya_device.pending_responses == 0
+
+
+async def test_writes_in_window_are_merged_into_one_set(tuya_device):
+    """Test a burst of writes is sent as one SET, last write per DPS winning."""
+    tuya_device.write_coalesce_window = 0.02
+    tuya_device._async_send_many = AsyncMock()
+
+    first = await tuya_device.async_set({"158": "Standard"})
+    await asyncio.sleep(0)
+    second = await tuya_device.async_set({"152": "AA==", 157: True})
+    third = await tuya_device.async_set({"158": "Max"})
+
+    assert first is second is third
+    await asyncio.wait_for(first, timeout=0.1)
+
+    tuya_device._async_send_many.assert_awaited_once()
+    [message] = tuya_device._async_send_many.await_args.args[0]
+    assert json.loads(message.payload)["dps"] == {
+        "158": "Max", "152": "AA==", "157": True
+    }
+
+
+async def test_short_window_is_not_rounded_up_to_a_scheduler_tick(tuya_device):
+    """Test a window shorter than a wheel tick still flushes on time."""
+    tuya_device._scheduler = TimingWheel(resolution=0.1)
+    tuya_device.write_coalesce_window = 0.02
+    tuya_device._async_send_many = AsyncMock()
+
+    started = time.monotonic()
+    sent = await tuya_device.async_set({"158": "Max"})
+    await asyncio.wait_for(sent, timeout=0.5)
+
+    assert time.monotonic() - started < 0.08
+    tuya_device._async_send_many.assert_awaited_once()
+
+
+async def test_writes_after_flush_start_a_new_set(tuya_device):
+    """Test writes made after the window closed go in a separate SET."""
+    tuya_device._async_send_many = AsyncMock()
+
+    first = await tuya_device.async_set({"158": "Standard"})
+    await asyncio.wait_for(first, timeout=0.1)
+    second = await tuya_device.async_set({"158": "Max"})
+    await asyncio.wait_for(second, timeout=0.1)
+
+    assert first is not second
+    assert tuya_device._async_send_many.await_count == 2
+
+
+async def test_pending_writes_fail_when_device_is_disabled(tuya_device):
+    """Test callers are not left waiting for writes that will never be sent."""
+    tuya_device.write_coalesce_window = 10
+
+    sent = await tuya_device.async_set({"158": "Max"})
+    await tuya_device.async_disable()
+
+    with pytest.raises(TuyaException):
+        await sent
+
+
+async def test_queued_messages_are_written_in_one_batch(tuya_device):
+    """Test messages queued together are sent with one write and one drain."""
+    tuya_device._connected = True
+    tuya_device.writer = MagicMock()
+    tuya_device.writer.drain = AsyncMock()
+    tuya_device.writer.wait_closed = AsyncMock()
+    messages = [
+        tuya_device._enqueue(
+            Message(Message.SET_COMMAND, {"dps": {"158": index}}, sequence=index,
+                    device=tuya_device, expect_response=False)
+        )
+        for index in range(3)
+    ]
+
+    await asyncio.wait_for(asyncio.gather(*(m.sent for m in messages)), timeout=0.1)
+
+    tuya_device.writer.write.assert_called_once_with(build_frames(messages))
+    tuya_device.writer.drain.assert_awaited_once()
+
+
+async def test_batches_respect_frame_and_byte_budgets(tuya_device):
+    """Test a batch stops at either budget but always takes one message."""
+    tuya_device._queue_event.set = MagicMock()
+    for index in range(5):
+        tuya_device._queue.push(
+            Message(Message.SET_COMMAND, {"dps": {"158": index}}, sequence=index,
+                    device=tuya_device)
+        )
+    frame_size = len(build_frames([tuya_device._queue.peek()]))
+
+    tuya_device.max_batch_frames = 2
+    assert [m.sequence for m in tuya_device._next_batch()] == [0, 1]
+
+    tuya_device.max_batch_frames = 16
+    tuya_device.max_batch_bytes = frame_size * 2 - 1
+    assert [m.sequence for m in tuya_device._next_batch()] == [2]
+
+    tuya_device.max_batch_bytes = 1
+    assert [m.sequence for m in tuya_device._next_batch()] == [3]
+    assert len(tuya_device._queue) == 1
+
+
+def _echo(tuya_device, unechoed=0, only=None):
+    """Mock sending so that the device echoes SETs after some are ignored."""
+    writes = []
+
+    async def send(messages):
+        for message in messages:
+            dps = json.loads(message.payload)["dps"]
+            writes.append(dps)
+            if len(writes) > unechoed:
+                echoed = {code: dps[code] for code in only or dps if code in dps}
+                await tuya_device._async_dispatch_message(
+                    Message(Message.GRATUITOUS_UPDATE, {"dps": echoed})
+                )
+
+    tuya_device._async_send_many = send
+    return writes
+
+
+async def test_acknowledged_set_resolves_on_echo(tuya_device):
+    """Test an acknowledged SET resolves once the device echoes its values."""
+    writes = _echo(tuya_device)
+
+    acked = await tuya_device.async_set({158: "Max", "160": True}, acknowledged=True)
+    await asyncio.wait_for(acked, timeout=0.1)
+
+    assert writes == [{"158": "Max", "160": True}]
+    assert tuya_device.ack_latency.count == 1
+    assert sum(count for _, count in tuya_device.ack_latency.buckets) == 1
+    assert not tuya_device._pending_acks
+
+
+async def test_acknowledged_set_resends_unconfirmed_values(tuya_device):
+    """Test values missing from the echo are sent again after a delay."""
+    tuya_device.timeout = 0.02
+    writes = _echo(tuya_device, only=["158"])
+
+    with patch("custom_components.robovacl60.tuyalocalapi.ACK_RETRY_DELAY", 0.01):
+        acked = await tuya_device.async_set({158: "Max", 160: True}, acknowledged=True)
+        await asyncio.sleep(0.05)
+        await tuya_device._async_dispatch_message(
+            Message(Message.GRATUITOUS_UPDATE, {"dps": {"160": True}})
+        )
+        await asyncio.wait_for(acked, timeout=0.1)
+
+    assert writes[:2] == [{"158": "Max", "160": True}, {"160": True}]
+
+
+async def test_acknowledged_set_fails_when_never_echoed(tuya_device):
+    """Test an acknowledged SET gives up after its retries."""
+    tuya_device.timeout = 0.01
+    writes = _echo(tuya_device, unechoed=10)
+
+    with patch("custom_components.robovacl60.tuyalocalapi.ACK_RETRY_DELAY", 0.01):
+        acked = await tuya_device.async_set({158: "Max"}, acknowledged=True)
+        with pytest.raises(AckTimeoutException):
+            await asyncio.wait_for(acked, timeout=0.5)
+
+    assert len(writes) == 3
+    assert tuya_device.ack_latency.count == 0
+    assert not tuya_device._pending_acks
+
+
+async def test_state_updates_notify_dps_subscribers(tuya_device):
+    """Test state messages are versioned and reach subscribers of changed DPS."""
+    listener = MagicMock()
+    tuya_device.subscribe(listener, codes=["163"])
+
+    await tuya_device.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 70, "15": "cleaning"}})
+    )
+    await tuya_device.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 70}})
+    )
+
+    assert tuya_device.state_version == 1
+    listener.assert_called_once_with(tuya_device._dps, frozenset({"163", "15"}))
+
+
+async def test_state_is_a_shared_snapshot(tuya_device):
+    """Test state readers get the same immutable view until the state changes."""
+    await tuya_device.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 70}})
+    )
+    state = tuya_device.state
+
+    assert tuya_device.state is state
+    await tuya_device.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 60}})
+    )
+    assert state == {"163": 70}
+    assert tuya_device.state == {"163": 60}
@@ -0,0 +1,104 @@
+"""Tests for the versioned DPS store."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.robovacl60.tuyastate import DpsStore
+
+
+def test_update_reports_only_changed_keys():
+    """Test updates report what changed and bump the version only then."""
+    store = DpsStore({"163": 80, "15": "standby"})
+    assert store.version == 1
+
+    assert store.update({163: 80, "15": "cleaning", "5": "auto"}) == {"15", "5"}
+    assert store.version == 2
+    assert store.last_changed == {"15", "5"}
+    assert dict(store) == {"163": 80, "15": "cleaning", "5": "auto"}
+
+    assert store.update({"163": 80}) == frozenset()
+    assert store.version == 2
+
+
+def test_changed_at_and_changed_since():
+    """Test per-key change times and catching up across several updates."""
+    store = DpsStore({"163": 80})
+    first = store.changed_at(163)
+    version = store.version
+
+    store.update({"15": "cleaning"})
+    store.update({"5": "auto"})
+    store["163"] = 80
+    del store["5"]
+
+    assert store.changed_at("163") == first
+    assert store.changed_at("404") is None
+    assert store.changed_since(version) == {"15", "5"}
+    assert store.changed_since(store.version) == frozenset()
+    assert "5" not in store
+
+
+def test_subscribers_are_called_for_their_keys():
+    """Test listeners only hear about the DPS they subscribed to, once each."""
+    store = DpsStore()
+    battery = MagicMock()
+    everything = MagicMock()
+    unsubscribe = store.subscribe(battery, keys=[163, "163", "15"])
+    store.subscribe(everything)
+
+    store.update({"5": "auto"})
+    battery.assert_not_called()
+    everything.assert_called_once_with(store, frozenset({"5"}))
+
+    store.update({"163": 50, "15": "charging"})
+    battery.assert_called_once_with(store, frozenset({"163", "15"}))
+
+    unsubscribe()
+    store.update({"163": 40})
+    battery.assert_called_once()
+    assert everything.call_count == 3
+
+
+def test_failing_subscriber_does_not_stop_others():
+    """Test an exception in one listener does not affect the others."""
+    store = DpsStore()
+    listener = MagicMock()
+    store.subscribe(MagicMock(side_effect=RuntimeError("boom")))
+    store.subscribe(listener)
+
+    store.update({"163": 40})
+
+    listener.assert_called_once()
+    assert store["163"] == 40
+
+
+def test_snapshots_are_shared_and_immutable():
+    """Test readers share one snapshot per version, unaffected by later changes."""
+    store = DpsStore({"163": 80, "15": "standby"})
+    snapshot = store.snapshot()
+
+    assert store.snapshot() is snapshot
+    with pytest.raises(TypeError):
+        snapshot["163"] = 10  # type: ignore[index]
+
+    store.update({"163": 80})
+    assert store.snapshot() is snapshot
+
+    store.update({"163": 70})
+    assert snapshot == {"163": 80, "15": "standby"}
+    assert store.snapshot() == {"163": 70, "15": "standby"}
+    assert store.snapshot() is not snapshot
+
+
+def test_changes_without_snapshots_do_not_copy():
+    """Test the values are only copied when a snapshot shares them."""
+    store = DpsStore({"163": 80})
+    values = store._values
+
+    store.update({"163": 70})
+    assert store._values is values
+
+    store.snapshot()
+    store.update({"163": 60})
+    assert store._values is not values
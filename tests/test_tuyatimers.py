@@ -0,0 +1,161 @@
+"""Tests for the shared timing wheel."""
+
+import asyncio
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.robovacl60.tuyalocalapi import TuyaDevice
+from custom_components.robovacl60.tuyatimers import TimingWheel
+
+
+async def test_timers_fire_in_order_and_not_early():
+    """Test timers spread over every level fire in order after their deadline."""
+    # Four slots per level, so timers cascade through every level and overflow.
+    wheel = TimingWheel(resolution=0.002, slot_bits=2, levels=3)
+    loop = asyncio.get_running_loop()
+    fired = []
+    done = asyncio.Event()
+    timers = []
+
+    def fire(index: int, deadline: float) -> None:
+        fired.append(index)
+        # The event loop may run timers up to its clock resolution early.
+        assert loop.time() >= deadline - 0.001
+        if len(fired) == len(timers):
+            done.set()
+
+    for index in range(100):
+        delay = random.uniform(0, 0.3)
+        timers.append(wheel.call_later(delay, fire, index, loop.time() + delay))
+    await asyncio.wait_for(done.wait(), timeout=2)
+
+    ticks = [timers[index].tick for index in fired]
+    assert ticks == sorted(ticks)
+    assert len(wheel) == 0
+
+
+async def test_cancelled_timers_do_not_fire():
+    """Test cancelling a timer removes it from the wheel."""
+    wheel = TimingWheel(resolution=0.01)
+    callback = MagicMock()
+
+    timer = wheel.call_later(0.02, callback)
+    assert len(wheel) == 1
+    timer.cancel()
+    timer.cancel()
+    assert len(wheel) == 0
+
+    await asyncio.sleep(0.05)
+    callback.assert_not_called()
+
+
+async def test_wheel_only_wakes_when_timers_are_due():
+    """Test empty ticks are skipped rather than polled."""
+    wheel = TimingWheel(resolution=0.001)
+    fired = asyncio.Event()
+
+    wheel.call_later(0.1, fired.set)
+    await asyncio.wait_for(fired.wait(), timeout=1)
+    await asyncio.sleep(0.05)
+
+    assert wheel.wakeups == 1
+
+
+async def test_timers_due_together_share_a_wakeup():
+    """Test timers for many devices in the same tick cost one wakeup."""
+    wheel = TimingWheel(resolution=0.05)
+    callback = MagicMock()
+
+    for _ in range(200):
+        wheel.call_later(0.01, callback)
+    await asyncio.sleep(0.1)
+
+    assert callback.call_count == 200
+    assert wheel.wakeups == 1
+
+
+async def test_failing_callback_does_not_stop_wheel():
+    """Test an exception in one callback does not affect other timers."""
+    wheel = TimingWheel(resolution=0.01)
+    callback = MagicMock()
+
+    wheel.call_later(0.01, MagicMock(side_effect=RuntimeError("boom")))
+    wheel.call_later(0.01, callback)
+    await asyncio.sleep(0.05)
+
+    callback.assert_called_once()
+
+
+async def test_close_cancels_pending_timers():
+    """Test closing the wheel cancels every timer."""
+    wheel = TimingWheel(resolution=0.01)
+    callback = MagicMock()
+
+    for delay in (0.01, 1, 1000, 10**7):
+        wheel.call_later(delay, callback)
+    wheel.close()
+
+    assert len(wheel) == 0
+    await asyncio.sleep(0.03)
+    callback.assert_not_called()
+
+
+@pytest.fixture
+async def scheduled_device():
+    """Create a device driven by a shared timing wheel."""
+    wheel = TimingWheel(resolution=0.01)
+    device = TuyaDevice(
+        MagicMock(),
+        "test_device_id",
+        "192.0.2.1",
+        timeout=1,
+        ping_interval=0.05,
+        update_entity_state=AsyncMock(),
+        local_key="0123456789abcdef",
+        scheduler=wheel,
+    )
+    yield device, wheel
+    await device.async_disable()
+    wheel.close()
+
+
+async def test_device_pings_from_wheel(scheduled_device):
+    """Test a scheduled device pings from the wheel instead of a ping task."""
+    device, wheel = scheduled_device
+    device._async_send_many = AsyncMock()
+    device.timeout = 0.02
+
+    device._on_ping_due()
+    await asyncio.sleep(0.12)
+
+    assert device._ping_task is None
+    assert device.live_tasks == 1
+    assert device._async_send_many.await_count >= 2
+
+
+async def test_device_expires_queued_messages_from_wheel(scheduled_device):
+    """Test queued messages are failed as soon as they expire."""
+    device, wheel = scheduled_device
+    device._queue_event.set = MagicMock()
+    message = device._queue.push(
+        device._constant_message(0x0A, b"{}", ttl=0.02)
+    )
+
+    await asyncio.sleep(0.05)
+
+    assert message.sent.done()
+    assert len(device._queue) == 0
+
+
+async def test_device_backoff_sleeps_on_wheel(scheduled_device):
+    """Test backoff delays are timed by the wheel."""
+    device, wheel = scheduled_device
+
+    sleep = asyncio.create_task(device._async_sleep(0.02))
+    await asyncio.sleep(0)
+    assert len(wheel) == 1
+
+    await asyncio.wait_for(sleep, timeout=0.1)
+    assert len(wheel) == 0
@@ -158,14 +158,18 @@ async def test_vacuum_update_uses_correct_dps_codes() -> None:
         "102": "Standard"  # Fan speed
     }
 
+    mock_robovac.state = mock_robovac._dps
+    mock_robovac.state_version = None
+    coordinator = MagicMock()
+    coordinator.vacuum = mock_robovac
+
     # Initialize the vacuum entity
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
-        entity.update_entity_values()
-
-        # Check that the correct values were extracted
-        assert entity._attr_battery_level == 75
-        assert entity._attr_tuya_state == "Cleaning"
-        assert entity._attr_error_code == 0
-        assert entity._attr_mode == "auto"
-        assert entity._attr_fan_speed == "Standard"
+    entity = RoboVacEntity(coordinator, mock_vacuum_data)
+    entity.update_entity_values()
+
+    # Check that the correct values were extracted
+    assert entity._attr_battery_level == 75
+    assert entity._attr_tuya_state == "Cleaning"
+    assert entity._attr_error_code == 0
+    assert entity._attr_mode == "auto"
+    assert entity._attr_fan_speed == "Standard"
@@ -0,0 +1,119 @@
+"""Tests for recomputing the vacuum entity from changed data points only."""
+
+import cProfile
+import pstats
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.robovacl60.robovac import RoboVac
+from custom_components.robovacl60.tuyalocalapi import Message
+from custom_components.robovacl60.vacuum import RoboVacEntity
+
+ITEM = {
+    "name": "Test Vacuum",
+    "id": "test_device_id",
+    "model": "T2277",
+    "ip_address": "192.0.2.1",
+    "access_token": "0123456789abcdef",
+    "description": "L60 SES",
+    "mac": "aa:bb:cc:dd:ee:ff",
+}
+
+INITIAL_DPS = {
+    "152": "BBoCCAE=",
+    "153": "AA==",
+    "158": "Standard",
+    "163": 80,
+    "177": 0,
+}
+
+
+@pytest.fixture
+async def entity():
+    """Create an entity backed by a real, never connected, L60 SES device."""
+    vacuum = RoboVac(
+        model_code="T2277",
+        device_id=ITEM["id"],
+        host=ITEM["ip_address"],
+        local_key=ITEM["access_token"],
+        timeout=1,
+        ping_interval=10,
+        update_entity_state=AsyncMock(),
+    )
+    coordinator = MagicMock()
+    coordinator.vacuum = vacuum
+    entity = RoboVacEntity(coordinator, ITEM)
+    await vacuum.async_update_state(Message(Message.GRATUITOUS_UPDATE, {"dps": INITIAL_DPS}))
+    entity.update_entity_values()
+    yield entity
+    await vacuum.async_disable()
+
+
+def _profiled_update(entity: RoboVacEntity) -> set[str]:
+    """Update the entity and return the names of the functions it called."""
+    profiler = cProfile.Profile()
+    profiler.runcall(entity.update_entity_values)
+    return {name for _, _, name in pstats.Stats(profiler).stats}
+
+
+async def test_battery_push_only_updates_battery(entity):
+    """Test a push that only changes the battery level skips everything else."""
+    await entity.vacuum.async_update_state(
+        Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 50}})
+    )
+
+    called = _profiled_update(entity)
+
+    assert entity._attr_battery_level == 50
+    assert "_update_battery_level" in called
+    for name in (
+        "_update_state_and_error",
+        "_update_mode_and_fan_speed",
+        "_update_cleaning_stats",
+        "_update_consumables",
+        "decode_status_string",
+        "decode_mode_string",
+    ):
+        assert name not in called
+
+
+async def test_unchanged_state_skips_update(entity):
+    """Test an update with nothing new does not recompute any attribute."""
+    called = _profiled_update(entity)
+
+    assert not any(name.startswith("_update_") for name in called)
+
+
+async def test_changes_missed_between_updates_are_applied(entity):
+    """Test every code changed since the last update is recomputed."""
+    vacuum = entity.vacuum
+    await vacuum.async_update_state(Message(Message.GRATUITOUS_UPDATE, {"dps": {"158": "Quiet"}}))
+    await vacuum.async_update_state(Message(Message.GRATUITOUS_UPDATE, {"dps": {"177": 2}}))
+
+    entity.update_entity_values()
+
+    assert entity._attr_fan_speed == "Pure"
+    assert entity._attr_error_code == 2
+    assert entity._attr_battery_level == 80
+
+
+async def test_unchanged_state_is_not_written(entity):
+    """Test a push that changes nothing visible does not write the state."""
+    vacuum = entity.vacuum
+    entity.async_write_ha_state = MagicMock()
+    entity._handle_coordinator_update()
+    assert entity.async_write_ha_state.call_count == 1
+
+    # DPS 160 is the locate switch, which the entity does not show
+    await vacuum.async_update_state(Message(Message.GRATUITOUS_UPDATE, {"dps": {"160": True}}))
+    entity._handle_coordinator_update()
+
+    assert entity.async_write_ha_state.call_count == 1
+    assert entity.suppressed_writes == 1
+
+    await vacuum.async_update_state(Message(Message.GRATUITOUS_UPDATE, {"dps": {"163": 50}}))
+    entity._handle_coordinator_update()
+
+    assert entity.async_write_ha_state.call_count == 2
+    assert entity.suppressed_writes == 1
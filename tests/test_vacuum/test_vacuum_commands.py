@@ -7,11 +7,11 @@ from custom_components.robovac.vacuum import RoboVacEntity
 
 
 @pytest.mark.asyncio
-async def test_async_locate(mock_robovac, mock_vacuum_data):
+async def test_async_locate(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_locate method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Initialize the entity's tuyastatus attribute
         mock_robovac._dps = {"103": False}
@@ -38,11 +38,11 @@ async def test_async_locate(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_return_to_base(mock_robovac, mock_vacuum_data):
+async def test_async_return_to_base(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_return_to_base method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         await entity.async_return_to_base()
@@ -52,11 +52,11 @@ async def test_async_return_to_base(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_start(mock_robovac, mock_vacuum_data):
+async def test_async_start(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_start method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         await entity.async_start()
@@ -67,11 +67,13 @@ async def test_async_start(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_start_model_specific(mock_robovac, mock_vacuum_data, mock_l60, mock_l60_data):
+async def test_async_start_model_specific(
+    mock_coordinator, mock_robovac, mock_vacuum_data, mock_l60, mock_l60_data
+):
     """Test that async_start uses the correct code for different models."""
     # Test with standard model (should use code "5")
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         await entity.async_start()
         mock_robovac.async_set.assert_called_once_with({"5": "auto"})
         mock_robovac.async_set.reset_mock()
@@ -79,8 +81,8 @@ async def test_async_start_model_specific(mock_robovac, mock_vacuum_data, mock_l
     # Test with L60 model (should use code "152")
     # Mock should return "152" for the MODE code
     mock_l60.getDpsCodes.return_value = {"MODE": "152"}
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_l60):
-        entity = RoboVacEntity(mock_l60_data)
+    with patch.object(mock_coordinator, "vacuum", mock_l60):
+        entity = RoboVacEntity(mock_coordinator, mock_l60_data)
         await entity.async_start()
         # This will fail with the current implementation because it always uses code "5"
         # The fix will make it use "152" for L60 models
@@ -88,11 +90,11 @@ async def test_async_start_model_specific(mock_robovac, mock_vacuum_data, mock_l
 
 
 @pytest.mark.asyncio
-async def test_async_pause(mock_robovac, mock_vacuum_data):
+async def test_async_pause(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_pause method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         await entity.async_pause()
@@ -102,11 +104,11 @@ async def test_async_pause(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_stop(mock_robovac, mock_vacuum_data):
+async def test_async_stop(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_stop method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Mock the async_return_to_base method
         with patch.object(entity, "async_return_to_base") as mock_return:
@@ -118,11 +120,11 @@ async def test_async_stop(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_clean_spot(mock_robovac, mock_vacuum_data):
+async def test_async_clean_spot(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_clean_spot method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         await entity.async_clean_spot()
@@ -132,11 +134,11 @@ async def test_async_clean_spot(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_set_fan_speed(mock_robovac, mock_vacuum_data):
+async def test_async_set_fan_speed(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_set_fan_speed method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Test cases for fan speed conversion
         test_cases = [
@@ -158,11 +160,11 @@ async def test_async_set_fan_speed(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_send_command(mock_robovac, mock_vacuum_data):
+async def test_async_send_command(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test the async_send_command method."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Test edge clean command
         await entity.async_send_command("edgeClean")
@@ -222,45 +224,68 @@ async def test_async_send_command(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_async_update(mock_robovac, mock_vacuum_data):
-    """Test the async_update method."""
+async def test_handle_coordinator_update(mock_coordinator, mock_robovac, mock_vacuum_data):
+    """Test the entity updates from the coordinator without polling the vacuum."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
+        entity.async_write_ha_state = MagicMock()
+        mock_robovac._dps = {"163": 75}
 
         # Act - normal update
-        await entity.async_update()
+        entity._handle_coordinator_update()
 
         # Assert
-        mock_robovac.async_get.assert_called_once()
+        assert entity._attr_battery_level == 75
+        entity.async_write_ha_state.assert_called_once()
+        mock_robovac.async_get.assert_not_called()
 
         # Reset mock
-        mock_robovac.async_get.reset_mock()
+        entity.async_write_ha_state.reset_mock()
 
         # Test with unsupported model
         entity.error_code = "UNSUPPORTED_MODEL"
-        await entity.async_update()
-        mock_robovac.async_get.assert_not_called()
+        entity._handle_coordinator_update()
+        entity.async_write_ha_state.assert_not_called()
 
         # Reset error code
         entity.error_code = None
 
         # Test with empty IP address
         entity._attr_ip_address = ""
-        await entity.async_update()
+        entity._handle_coordinator_update()
         assert entity.error_code == "IP_ADDRESS"
+        entity.async_write_ha_state.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_coordinator_update_failures(mock_coordinator, mock_robovac, mock_vacuum_data):
+    """Test repeated failed polls mark the vacuum as disconnected."""
+    # Arrange
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
+        entity.async_write_ha_state = MagicMock()
+        mock_coordinator.last_update_success = False
+
+        # Act
+        for _ in range(3):
+            entity._handle_coordinator_update()
+
+        # Assert
+        assert entity.update_failures == 3
+        assert entity.error_code == "CONNECTION_FAILED"
         mock_robovac.async_get.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_async_will_remove_from_hass(mock_robovac, mock_vacuum_data):
-    """Test the async_will_remove_from_hass method."""
+async def test_async_will_remove_from_hass(mock_coordinator, mock_robovac, mock_vacuum_data):
+    """Test removing the entity leaves the coordinator's vacuum connected."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         await entity.async_will_remove_from_hass()
 
         # Assert
-        mock_robovac.async_disable.assert_called_once()
+        mock_robovac.async_disable.assert_not_called()
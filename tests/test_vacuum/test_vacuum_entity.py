@@ -9,11 +9,11 @@ from custom_components.robovac.vacuums.base import TuyaCodes
 
 
 @pytest.mark.asyncio
-async def test_activity_property_none(mock_robovac, mock_vacuum_data):
+async def test_activity_property_none(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns None when tuya_state is None."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.tuya_state = None
 
         # Act
@@ -24,11 +24,11 @@ async def test_activity_property_none(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_error(mock_robovac, mock_vacuum_data):
+async def test_activity_property_error(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns ERROR when error_code is set."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.tuya_state = "Cleaning"
         entity.error_code = "E001"
 
@@ -40,11 +40,11 @@ async def test_activity_property_error(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_docked(mock_robovac, mock_vacuum_data):
+async def test_activity_property_docked(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns DOCKED when state is Charging or completed."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Test for "Charging" state
         entity.tuya_state = "Charging"
@@ -67,11 +67,11 @@ async def test_activity_property_docked(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_returning(mock_robovac, mock_vacuum_data):
+async def test_activity_property_returning(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns RETURNING when state is Recharge."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.tuya_state = "Recharge"
         entity.error_code = 0
 
@@ -83,11 +83,11 @@ async def test_activity_property_returning(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_idle(mock_robovac, mock_vacuum_data):
+async def test_activity_property_idle(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns IDLE when state is Sleeping or standby."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.error_code = 0
 
         # Test for "Sleeping" state
@@ -110,11 +110,11 @@ async def test_activity_property_idle(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_paused(mock_robovac, mock_vacuum_data):
+async def test_activity_property_paused(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns PAUSED when state is Paused."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.tuya_state = "Paused"
         entity.error_code = 0
 
@@ -126,11 +126,11 @@ async def test_activity_property_paused(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_activity_property_cleaning(mock_robovac, mock_vacuum_data):
+async def test_activity_property_cleaning(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test activity property returns CLEANING for other states."""
     # Arrange
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
         entity.tuya_state = "Cleaning"
         entity.error_code = 0
 
@@ -142,7 +142,7 @@ async def test_activity_property_cleaning(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_update_entity_values(mock_robovac, mock_vacuum_data):
+async def test_update_entity_values(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test update_entity_values correctly sets entity attributes."""
     # Arrange
     mock_robovac._dps = {
@@ -153,8 +153,8 @@ async def test_update_entity_values(mock_robovac, mock_vacuum_data):
         TuyaCodes.FAN_SPEED: "Standard",
     }
 
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         # Act
         entity.update_entity_values()
@@ -168,7 +168,7 @@ async def test_update_entity_values(mock_robovac, mock_vacuum_data):
 
 
 @pytest.mark.asyncio
-async def test_fan_speed_formatting(mock_robovac, mock_vacuum_data):
+async def test_fan_speed_formatting(mock_coordinator, mock_robovac, mock_vacuum_data):
     """Test fan speed formatting in update_entity_values."""
     # Arrange
     test_cases = [
@@ -178,8 +178,8 @@ async def test_fan_speed_formatting(mock_robovac, mock_vacuum_data):
         ("Standard", "Standard"),  # No change
     ]
 
-    with patch("custom_components.robovac.vacuum.RoboVac", return_value=mock_robovac):
-        entity = RoboVacEntity(mock_vacuum_data)
+    with patch.object(mock_coordinator, "vacuum", mock_robovac):
+        entity = RoboVacEntity(mock_coordinator, mock_vacuum_data)
 
         for input_speed, expected_output in test_cases:
             # Setup